@@ -1,6 +1,11 @@
+import argparse
+
 import numpy as np
 import matplotlib.pyplot as plt
 
+from pk_modell import (ZIELBEREICH, EinKompartimentModell, Gabe, KompartimentModell, Messung, Population, TdmGitter,
+                       optimiere_dosierung, regelmaessige_gaben, simuliere_population)
+
 # Gegebene Werte
 body_weight = 70  # kg
 Vd = 0.7 * body_weight  # Verteilungsvolumen in L
@@ -12,49 +17,111 @@ dose_maintenance = 1250  # Erhaltungsdosis in mg
 t_inf = 3  # Infusionsdauer in Stunden
 t_dosage_interval = 24  # Dosierungsintervall in Stunden
 treatment_duration = 7 * 24  # Behandlungsdauer in Stunden
-dt = 0.5  # Zeitschritt in Stunden
-
-# Zeitpunkte und initiale Konzentration
-time_points = np.arange(0, treatment_duration + dt, dt)  # in Stunden
-plasma_concentration = np.zeros_like(time_points, dtype=float)
-
-# Initialisierung: Lade-Dosis
-plasma_concentration[0] = dose_loading / Vd  # Initialkonzentration nach Lade-Dosis
-A = dose_loading  # Anfangsmenge in mg
-
-# Liste zur Verfolgung der Endzeiten laufender Infusionen
-infusions = []
-
-for i in range(1, len(time_points)):
-    t = time_points[i]
-
-    # Entfernen abgeschlossener Infusionen
-    infusions = [end_time for end_time in infusions if t < end_time]
-
-    # Berechnung der aktuellen Infusionsrate (mg/h)
-    infusion_rate = (dose_maintenance / t_inf) * len(infusions)
-
-    # Berechnung der Elimination und Infusion
-    # Formel für kontinuierliche Infusion unter Berücksichtigung der Elimination:
-    # A(t) = A(t-Δt) * exp(-kel * Δt) + (Infusionsrate / kel) * (1 - exp(-kel * Δt))
-    A = A * np.exp(-kel * dt) + (infusion_rate / kel) * (1 - np.exp(-kel * dt))
-
-    # Aktualisierung der Plasmakonzentration
-    plasma_concentration[i] = A / Vd
-
-    # Überprüfung, ob eine neue Erhaltungsdosis verabreicht wird
-    # Verwendung von np.isclose zur Berücksichtigung von Rundungsfehlern
-    if np.isclose(t % t_dosage_interval, 0, atol=dt / 2):
-        infusions.append(t + t_inf)  # Hinzufügen der Endzeit der neuen Infusion
-
-# Ergebnis plotten
-plt.figure(figsize=(12, 6))
-plt.plot(time_points, plasma_concentration, label="Vancomycin-Plasmaspiegel", color='b')
-plt.xlabel("Zeit (Stunden)")
-plt.ylabel("Plasmaspiegel (mg/L)")
-plt.title("Pharmakokinetische Simulation der Vancomycin-Plasmaspiegel über 7 Tage")
-plt.axhline(y=15, color='r', linestyle='--', label='Therapeutischer Bereich (15-20 mg/L)')
-plt.axhline(y=20, color='r', linestyle='--')
-plt.legend()
-plt.grid()
-plt.show()
+Q = 6.5  # Interkompartimentelle Clearance in L/h (typischer Literaturwert für Vancomycin)
+V2 = 38.4  # Peripheres Verteilungsvolumen in L (typischer Literaturwert für Vancomycin)
+dt = 0.5  # Rasterweite der Darstellung in Stunden (die Rechnung ist davon unabhängig)
+
+
+def messung(text):
+    """
+    Liest einen gemessenen Spiegel im Format 'Stunde:mg/L', z. B. '47.5:14.2'.
+    """
+    try:
+        zeit, konzentration = text.split(':')
+        return Messung(float(zeit), float(konzentration.replace(',', '.')))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Spiegel als 'Stunde:mg/L' angeben, nicht '{text}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vancomycin-Plasmaspiegel für einen Patienten oder eine Population.")
+    parser.add_argument('--population', type=int, metavar='N',
+                        help="Zusätzlich N virtuelle Patienten (Gewicht, Kreatinin-Clearance, Vd streuend) simulieren")
+    parser.add_argument('--prozesse', type=int, help="Prozesse für die Populationssimulation (Standard: einer)")
+    parser.add_argument('--seed', type=int, help="Startwert für die gezogene Population")
+    parser.add_argument('--spiegel', type=messung, action='append', default=[], metavar='STUNDE:MG/L',
+                        help="Gemessener Spiegel (mehrfach möglich); kel und Vd werden daran individuell angepasst")
+    parser.add_argument('--zwei-kompartimente', action='store_true',
+                        help="Zum Vergleich mit Zwei-Kompartiment-Modell rechnen (zentrales Volumen = Vd, Q und V2 "
+                             "aus der Literatur)")
+    parser.add_argument('--optimiere', action='store_true',
+                        help="Beste Dosierschemata für den Zielbereich suchen und das beste mit darstellen")
+    args = parser.parse_args()
+
+    modell = EinKompartimentModell(kel, Vd)
+
+    # Lade-Dosis als Bolus bei t = 0, danach Erhaltungsdosen als Infusion alle 24 h
+    gaben = [Gabe(0, dose_loading)] + regelmaessige_gaben(dose_maintenance, t_dosage_interval, t_inf,
+                                                           beginn=t_dosage_interval, ende=treatment_duration)
+
+    if args.spiegel:
+        # Bayes-Anpassung: Populationswerte als Prior, gemessene Spiegel als Likelihood über dem Parametergitter
+        ergebnis = TdmGitter(CrCl, Vd).anpasse(gaben, args.spiegel)
+        modell = ergebnis.modell
+        cl_unten, _, cl_oben = ergebnis.quantile('clearance')
+        vd_unten, _, vd_oben = ergebnis.quantile('vd')
+        print(f"Individuelle Parameter (MAP, 90-%-Intervall): Clearance {modell.clearance:.2f} L/h "
+              f"({cl_unten:.2f}-{cl_oben:.2f}), Vd {modell.vd:.1f} L ({vd_unten:.1f}-{vd_oben:.1f}), "
+              f"Halbwertszeit {modell.halbwertszeit:.1f} h")
+
+    # Plasmaspiegel exakt auf dem gewünschten Raster (geschlossene Lösung zwischen den Gaben)
+    time_points = np.arange(0, treatment_duration + dt, dt)  # in Stunden
+    plasma_concentration = modell.konzentration(gaben, time_points)
+
+    # Ergebnis plotten
+    if args.population:
+        fig, (oben, unten) = plt.subplots(2, 1, figsize=(12, 9), sharex=True)
+    else:
+        fig, oben = plt.subplots(figsize=(12, 6))
+    oben.plot(time_points, plasma_concentration, color='b',
+              label="Vancomycin-Plasmaspiegel" + (" (angepasst an Messungen)" if args.spiegel else ""))
+    if args.zwei_kompartimente:
+        # Gleiche Clearance und zentrales Volumen, zusätzlich Umverteilung in ein peripheres Kompartiment
+        zwei = KompartimentModell.zwei_kompartimente(modell.clearance, modell.vd, Q, V2)
+        oben.plot(time_points, zwei.konzentration(gaben, time_points), color='m', linestyle='-.',
+                  label=f"Zwei-Kompartiment-Modell (Q {Q:g} L/h, V2 {V2:g} L)")
+    if args.spiegel:
+        oben.scatter([m.zeit for m in args.spiegel], [m.konzentration for m in args.spiegel], color='k', zorder=3,
+                     label="Gemessene Spiegel")
+    if args.optimiere:
+        # Steady-State-Formeln über das ganze Raster Dosis × Intervall × Infusionsdauer
+        vorschlaege = optimiere_dosierung(modell, ZIELBEREICH)
+        print(f"{'Dosis':>7}{'Intervall':>11}{'Dauer':>7}{'Tal':>8}{'Spitze':>8}{'AUC24':>8}{'Ladedosis':>11}"
+              f"{'über':>7}")
+        for v in vorschlaege:
+            print(f"{v.dosis:>5.0f}mg{v.intervall:>10.0f}h{v.dauer:>6.1f}h{v.talspiegel:>8.1f}{v.spitzenspiegel:>8.1f}"
+                  f"{v.auc24:>8.0f}{v.ladedosis:>9.0f}mg{v.ladedauer:>6.1f}h")
+        bestes = vorschlaege[0]
+        oben.plot(time_points, modell.konzentration(bestes.gaben(treatment_duration), time_points), color='g',
+                  label=f"Vorschlag: {bestes.ladedosis:.0f} mg über {bestes.ladedauer:g} h, dann {bestes.dosis:.0f} mg über {bestes.dauer:g} h "
+                        f"alle {bestes.intervall:g} h")
+    oben.set_ylabel("Plasmaspiegel (mg/L)")
+    oben.set_title("Pharmakokinetische Simulation der Vancomycin-Plasmaspiegel über 7 Tage")
+    oben.axhline(y=15, color='r', linestyle='--', label='Therapeutischer Bereich (15-20 mg/L)')
+    oben.axhline(y=20, color='r', linestyle='--')
+    oben.legend()
+    oben.grid()
+
+    if args.population:
+        # Dasselbe Schema für die ganze Population: Anteil der Patienten im Zielbereich über die Zeit
+        population = Population.ziehe(args.population, seed=args.seed)
+        ergebnis = simuliere_population(population, gaben, time_points, ZIELBEREICH, prozesse=args.prozesse)
+        unten.stackplot(time_points, ergebnis.anteil_darunter * 100, ergebnis.anteil_im_bereich * 100,
+                        ergebnis.anteil_darueber * 100, colors=['#9ecae1', '#31a354', '#fc9272'],
+                        labels=['unter 15 mg/L', 'im Zielbereich', 'über 20 mg/L'])
+        unten.set_ylabel("Anteil der Patienten (%)")
+        unten.set_title(f"Population: {len(population)} virtuelle Patienten")
+        unten.set_ylim(0, 100)
+        unten.legend(loc='upper right')
+        unten.grid()
+        ende = ergebnis.anteil_im_bereich[-1] * 100
+        print(f"{len(population)} Patienten: am Ende {ende:.1f} % im Zielbereich, "
+              f"maximal {ergebnis.anteil_im_bereich.max() * 100:.1f} %")
+        unten.set_xlabel("Zeit (Stunden)")
+    else:
+        oben.set_xlabel("Zeit (Stunden)")
+    plt.show()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,22 @@
-import pandas as pd
-from tabulate import tabulate  # Für eine bessere Tabellenanzeige
+from ze_daten import HANDELSNAMEN_SPALTE
+from ze_index import OPS_KODE, SuchFehler, ist_ops_kode
+from ze_suche import SuchMaschine
 
 
 def load_data(file_path):
     """
-    Lädt die Excel-Tabelle in einen pandas DataFrame.
+    Lädt die Excel-Tabelle über die Suchmaschine (siehe ze_suche).
+    Die Stammtabelle enthält eine Zeile pro Eintrag, die durch '|' getrennten Handelsnamen
+    liegen in einer eigenen Synonymtabelle; das Ergebnis wird in '.ze_cache' zwischengespeichert.
 
     :param file_path: Pfad zur Excel-Datei.
-    :return: pandas DataFrame.
+    :return: SuchMaschine.
     """
     try:
-        df = pd.read_excel(file_path, engine='openpyxl')
-        return df
+        maschine = SuchMaschine(file_path)
+        if HANDELSNAMEN_SPALTE not in maschine.bestand().df.columns:
+            print(f"Spalte '{HANDELSNAMEN_SPALTE}' nicht gefunden.")
+        return maschine
     except FileNotFoundError:
         print(f"Datei nicht gefunden: {file_path}")
         return None
@@ -20,52 +25,29 @@ def load_data(file_path):
         return None
 
 
-def preprocess_data(df):
-    """
-    Bereitet die Daten vor, indem Mehrfacheinträge in Handelsnamen aufgeteilt und Leerzeichen entfernt werden.
-
-    :param df: pandas DataFrame.
-    :return: Vorgebereiteter DataFrame.
-    """
-    # Entfernen von führenden/trailenden Leerzeichen in den Spaltennamen
-    df.columns = df.columns.str.strip()
-
-    # Entfernen von führenden/trailenden Leerzeichen in allen Zellen (nur für Strings)
-    df = df.applymap(lambda x: x.strip() if isinstance(x, str) else x)
-
-    return df
-
-
-def split_trade_names(df):
-    """
-    Teilt die Handelsnamen in separate Zeilen auf, wenn sie durch '|' getrennt sind.
-
-    :param df: pandas DataFrame.
-    :return: DataFrame mit aufgeteilten Handelsnamen.
-    """
-    spalte = 'Handelsnamen | Alternativbezeichnung, Synonym'
-    if spalte in df.columns:
-        df[spalte] = df[spalte].str.split('|')
-        df = df.explode(spalte)
-        # Entfernen von führenden/trailenden Leerzeichen nach dem Split
-        df[spalte] = df[spalte].str.strip()
-    else:
-        print(f"Spalte '{spalte}' nicht gefunden.")
-    return df
-
-
-def get_medication_info(df, ops_text):
+def get_medication_info(maschine, ops_text):
     """
     Gibt alle Informationen zu einem gegebenen OPS-Text zurück (teilweise Übereinstimmung).
+    Sieht die Eingabe wie ein OPS-Kode aus ('6-002.p1', '8-810.*', '6-002.p1..p9'),
+    wird zuerst im OPS-Kode-Index gesucht.
 
-    :param df: pandas DataFrame.
-    :param ops_text: Der eingegebene OPS-Text (teilweise oder vollständige Angabe).
-    :return: Gefilterter DataFrame mit den relevanten Informationen.
+    :param maschine: SuchMaschine mit geladener ZE-Liste.
+    :param ops_text: Der eingegebene OPS-Text oder OPS-Kode (teilweise oder vollständige Angabe).
+    :return: Gefilterter DataFrame mit den relevanten Informationen (eine Zeile pro Eintrag).
     """
+    if ist_ops_kode(ops_text):
+        try:
+            filtered_df = maschine.ergebnisse(ops_text, modus=OPS_KODE)
+        except SuchFehler as e:
+            print(e)
+            return None
+        if not filtered_df.empty:
+            return filtered_df
+
     spalte = 'OPS-Text'
-    if spalte in df.columns:
-        # Filtern nach teilweiser Übereinstimmung des OPS-Texts (nicht case-sensitiv)
-        filtered_df = df[df[spalte].str.contains(ops_text, case=False, na=False)]
+    if not maschine.fehlende_spalten([spalte]):
+        # Filtern nach teilweiser Übereinstimmung des OPS-Texts (nicht case-sensitiv) über den Suchindex
+        filtered_df = maschine.ergebnisse(ops_text, [spalte])
     else:
         print(f"Spalte '{spalte}' nicht gefunden.")
         return None
@@ -94,7 +76,9 @@ def display_information(filtered_df):
 
         display_df = filtered_df[relevante_spalten]
 
-        # Anzeige als Tabelle mit tabulate für bessere Lesbarkeit
+        # Anzeige als Tabelle mit tabulate für bessere Lesbarkeit (erst bei Bedarf importiert)
+        from tabulate import tabulate
+
         print("\nGefundene Einträge:")
         print(tabulate(display_df, headers='keys', tablefmt='fancy_grid', showindex=False))
     else:
@@ -105,20 +89,14 @@ def main():
     # === Hier ist Ihr Dateipfad integriert ===
     file_path = r'C:\Users\hamad\OneDrive\Desktop\ZE Liste.xlsx'
 
-    # Laden der Daten
-    df = load_data(file_path)
-    if df is None:
+    # Laden der Daten (Stamm- und Synonymtabelle, Suchindizes)
+    maschine = load_data(file_path)
+    if maschine is None:
         return
 
-    # Datenvorbereitung
-    df = preprocess_data(df)
-
-    # Aufteilen der Handelsnamen
-    df = split_trade_names(df)
-
     while True:
         # Eingabe des OPS-Texts
-        ops_text = input("Geben Sie den OPS-Text ein (oder 'exit' zum Beenden): ").strip()
+        ops_text = input("Geben Sie den OPS-Text oder OPS-Kode ein (oder 'exit' zum Beenden): ").strip()
         if ops_text.lower() == 'exit':
             print("Programm beendet.")
             break
@@ -127,7 +105,7 @@ def main():
             continue
 
         # Abrufen der Informationen
-        filtered_df = get_medication_info(df, ops_text)
+        filtered_df = get_medication_info(maschine, ops_text)
 
         # Anzeigen der Informationen
         display_information(filtered_df)
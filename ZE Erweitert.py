@@ -1,17 +1,24 @@
-import pandas as pd
-from tabulate import tabulate  # Für eine bessere Tabellenanzeige
+import numpy as np
+
+from ze_daten import HANDELSNAMEN_SPALTE
+from ze_index import OPS_KODE, SuchFehler
+from ze_suche import SuchMaschine
 
 
 def load_data(file_path):
     """
-    Lädt die Excel-Tabelle in einen pandas DataFrame.
+    Lädt die Excel-Tabelle über die Suchmaschine (siehe ze_suche).
+    Die Stammtabelle enthält eine Zeile pro Eintrag, die durch '|' getrennten Handelsnamen
+    liegen in einer eigenen Synonymtabelle; das Ergebnis wird in '.ze_cache' zwischengespeichert.
 
     :param file_path: Pfad zur Excel-Datei.
-    :return: pandas DataFrame.
+    :return: SuchMaschine.
     """
     try:
-        df = pd.read_excel(file_path, engine='openpyxl')
-        return df
+        maschine = SuchMaschine(file_path)
+        if HANDELSNAMEN_SPALTE not in maschine.bestand().df.columns:
+            print(f"Spalte '{HANDELSNAMEN_SPALTE}' nicht gefunden.")
+        return maschine
     except FileNotFoundError:
         print(f"Datei nicht gefunden: {file_path}")
         return None
@@ -20,79 +27,43 @@ def load_data(file_path):
         return None
 
 
-def preprocess_data(df):
-    """
-    Bereitet die Daten vor, indem Mehrfacheinträge in Handelsnamen aufgeteilt und Leerzeichen entfernt werden.
-
-    :param df: pandas DataFrame.
-    :return: Vorgebereiteter DataFrame.
-    """
-    # Entfernen von führenden/trailenden Leerzeichen in den Spaltennamen
-    df.columns = df.columns.str.strip()
-
-    # Entfernen von führenden/trailenden Leerzeichen in allen String-Zellen
-    str_cols = df.select_dtypes(include=['object']).columns
-    df[str_cols] = df[str_cols].apply(lambda x: x.str.strip())
-
-    return df
-
-
-def split_trade_names(df):
-    """
-    Teilt die Handelsnamen in separate Zeilen auf, wenn sie durch '|' getrennt sind.
-
-    :param df: pandas DataFrame.
-    :return: DataFrame mit aufgeteilten Handelsnamen.
-    """
-    spalte = 'Handelsnamen | Alternativbezeichnung, Synonym'
-    if spalte in df.columns:
-        df[spalte] = df[spalte].str.split('|')
-        df = df.explode(spalte)
-        # Entfernen von führenden/trailenden Leerzeichen nach dem Split
-        df[spalte] = df[spalte].str.strip()
-    else:
-        print(f"Spalte '{spalte}' nicht gefunden.")
-    return df
-
-
-def get_medication_info(df, ops_text=None, handelsname=None):
+def get_medication_info(maschine, ops_text=None, handelsname=None, ops_kode=None):
     """
-    Gibt alle Informationen zu einem gegebenen OPS-Text oder Handelsnamen zurück (teilweise Übereinstimmung).
+    Gibt alle Informationen zu einem gegebenen OPS-Text, Handelsnamen oder OPS-Kode zurück (teilweise Übereinstimmung).
+    Handelsnamen werden in der Synonymtabelle gesucht und über die Zeilennummer der Stammtabelle
+    zugeordnet; jeder Eintrag erscheint daher höchstens einmal.
 
-    :param df: pandas DataFrame.
+    :param maschine: SuchMaschine mit geladener ZE-Liste.
     :param ops_text: Der eingegebene OPS-Text (teilweise oder vollständige Angabe).
     :param handelsname: Der eingegebene Handelsname (teilweise oder vollständige Angabe).
+    :param ops_kode: OPS-Kode ('6-002.p1'), Kodegruppe ('6-002', '8-810.*') oder Bereich ('6-002.p1..p9').
     :return: Gefilterter DataFrame mit den relevanten Informationen.
     """
+    bestand = maschine.bestand()
+    zeilen = np.zeros(0, dtype=np.int64)
+
+    if ops_kode:
+        try:
+            zeilen = np.union1d(zeilen, maschine.suche(ops_kode, modus=OPS_KODE, bestand=bestand).zeilen)
+        except SuchFehler as e:
+            print(e)
+
     if ops_text:
         spalte = 'OPS-Text'
-        if spalte in df.columns:
-            filtered_df_ops = df[df[spalte].str.contains(ops_text, case=False, na=False)]
+        if not maschine.fehlende_spalten([spalte], bestand):
+            zeilen = np.union1d(zeilen, maschine.suche(ops_text, [spalte], bestand=bestand).zeilen)
         else:
             print(f"Spalte '{spalte}' nicht gefunden.")
-            filtered_df_ops = pd.DataFrame()
-    else:
-        filtered_df_ops = pd.DataFrame()
 
     if handelsname:
-        spalte = 'Handelsnamen | Alternativbezeichnung, Synonym'
-        if spalte in df.columns:
-            filtered_df_handelsname = df[df[spalte].str.contains(handelsname, case=False, na=False)]
+        spalte = HANDELSNAMEN_SPALTE
+        if not maschine.fehlende_spalten([spalte], bestand):
+            # Kombiniere die beiden Suchen mit einer logischen OR-Bedingung
+            zeilen = np.union1d(zeilen, maschine.suche(handelsname, [spalte], bestand=bestand).zeilen)
         else:
             print(f"Spalte '{spalte}' nicht gefunden.")
-            filtered_df_handelsname = pd.DataFrame()
-    else:
-        filtered_df_handelsname = pd.DataFrame()
-
-    if ops_text and handelsname:
-        # Kombiniere die beiden Filter mit einer logischen OR-Bedingung
-        filtered_df = pd.concat([filtered_df_ops, filtered_df_handelsname]).drop_duplicates()
-    elif ops_text:
-        filtered_df = filtered_df_ops
-    elif handelsname:
-        filtered_df = filtered_df_handelsname
-    else:
-        filtered_df = pd.DataFrame()
+
+    filtered_df = bestand.modell.eintraege(zeilen)
 
     if filtered_df.empty:
         search_field = []
@@ -100,6 +71,8 @@ def get_medication_info(df, ops_text=None, handelsname=None):
             search_field.append(f"OPS-Text '{ops_text}'")
         if handelsname:
             search_field.append(f"Handelsname '{handelsname}'")
+        if ops_kode:
+            search_field.append(f"OPS-Kode '{ops_kode}'")
         search_description = " und ".join(search_field)
         print(f"Keine Einträge für den/die {search_description} gefunden.")
         return None
@@ -124,7 +97,9 @@ def display_information(filtered_df):
 
         display_df = filtered_df[relevante_spalten]
 
-        # Anzeige als Tabelle mit tabulate für bessere Lesbarkeit
+        # Anzeige als Tabelle mit tabulate für bessere Lesbarkeit (erst bei Bedarf importiert)
+        from tabulate import tabulate
+
         print("\nGefundene Einträge:")
         print(tabulate(display_df, headers='keys', tablefmt='fancy_grid', showindex=False))
     else:
@@ -135,35 +110,40 @@ def main():
     # === Hier ist Ihr Dateipfad integriert ===
     file_path = r'C:\Users\hamad\OneDrive\Desktop\ZE Liste.xlsx'
 
-    # Laden der Daten
-    df = load_data(file_path)
-    if df is None:
+    # Laden der Daten (Stamm- und Synonymtabelle, Suchindizes)
+    maschine = load_data(file_path)
+    if maschine is None:
         return
 
-    # Datenvorbereitung
-    df = preprocess_data(df)
-
-    # Aufteilen der Handelsnamen
-    df = split_trade_names(df)
-
     while True:
         print("\nWählen Sie die Suchoption:")
         print("1. OPS-Text")
         print("2. Handelsname | Alternativbezeichnung, Synonym")
         print("3. Beide")
         print("4. Beenden")
+        print("5. OPS-Kode (z. B. 6-002.p1, 8-810.* oder 6-002.p1..p9)")
 
         auswahl = input("Geben Sie die Nummer Ihrer Wahl ein: ").strip()
 
         if auswahl == '4' or auswahl.lower() == 'exit':
             print("Programm beendet.")
             break
-        elif auswahl not in ['1', '2', '3']:
-            print("Ungültige Auswahl. Bitte wählen Sie eine der Optionen 1, 2, 3 oder 4.")
+        elif auswahl not in ['1', '2', '3', '5']:
+            print("Ungültige Auswahl. Bitte wählen Sie eine der Optionen 1, 2, 3, 4 oder 5.")
             continue
 
         ops_text = None
         handelsname = None
+        ops_kode = None
+
+        if auswahl == '5':
+            ops_kode = input("Geben Sie den OPS-Kode, eine Kodegruppe oder einen Bereich ein: ").strip()
+            if ops_kode.lower() == 'exit':
+                print("Programm beendet.")
+                break
+            elif ops_kode == '':
+                print("Bitte geben Sie einen gültigen OPS-Kode ein.")
+                continue
 
         if auswahl in ['1', '3']:
             ops_text = input("Geben Sie den OPS-Text ein (teilweise oder vollständig): ").strip()
@@ -185,7 +165,7 @@ def main():
                 handelsname = None
 
         # Abrufen der Informationen
-        filtered_df = get_medication_info(df, ops_text, handelsname)
+        filtered_df = get_medication_info(maschine, ops_text, handelsname, ops_kode)
 
         # Anzeigen der Informationen
         display_information(filtered_df)
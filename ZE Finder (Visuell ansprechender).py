@@ -1,17 +1,27 @@
-import pandas as pd
-from tabulate import tabulate
+import queue
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, messagebox
-import os
+
+from ze_index import LITERAL, MODI, SuchFehler
+from ze_suche import RELEVANTE_SPALTEN, SUCHSPALTEN, SuchMaschine, teile_spalten
+
+# Wartezeit nach dem letzten Tastendruck, bevor die Live-Suche startet
+LIVE_VERZOEGERUNG_MS = 250
+# Zeilen pro Seite in der Treeview; nur die aktuelle Seite wird eingefügt
+SEITENGROESSE = 200
+# Abstand, in dem der Tk-Hauptthread nach fertigen Hintergrundsuchen schaut
+ABFRAGE_MS = 30
 
 
 def lade_excel_datei(pfad):
     """
-    Lädt die Excel-Datei und gibt den DataFrame zurück.
+    Lädt die Excel-Datei über die Suchmaschine und gibt sie zurück.
     """
+    maschine = SuchMaschine(pfad)
     try:
-        df = pd.read_excel(pfad)
-        return df
+        maschine.bestand()
+        return maschine
     except FileNotFoundError:
         messagebox.showerror("Dateifehler", f"Die Datei wurde nicht gefunden:\n{pfad}")
         return None
@@ -20,66 +30,159 @@ def lade_excel_datei(pfad):
         return None
 
 
-def suche_daten(df, suchbegriff):
+def suche_daten(maschine, suchbegriff, modus=LITERAL, inkrementell=None):
     """
     Sucht nach dem Suchbegriff in den Spalten 'OPS-Text' und 'Handelsnamen'.
+    Gesucht wird im vorberechneten, normalisierten Suchindex (Groß-/Kleinschreibung und Umlaute egal).
+    Der Suchbegriff wird wörtlich genommen, sofern kein anderer Modus aus MODI gewählt ist.
+    Mit einer InkrementellenSuche wird, wo möglich, nur das vorherige Ergebnis weiter eingegrenzt.
+
+    Läuft im Such-Thread und zeigt daher selbst keine Meldungen an.
+
+    :return: Tupel (Datenbestand, Trefferzeilen der Stammtabelle).
+    :raises SuchFehler: Bei ungültigen Suchbegriffen.
     """
-    suchbegriff = suchbegriff.lower()
-    suchspalten = ['OPS-Text', 'Handelsnamen']
+    bestand = maschine.bestand()
+    return bestand, maschine.suche(suchbegriff, SUCHSPALTEN, modus, inkrementell, bestand).zeilen
 
-    fehlende_spalten = [spalte for spalte in suchspalten if spalte not in df.columns]
-    if fehlende_spalten:
-        messagebox.showerror("Spaltenfehler",
-                             f"Die folgenden erforderlichen Spalten fehlen in der Excel-Datei:\n{', '.join(fehlende_spalten)}")
-        return pd.DataFrame()
 
-    mask = df[suchspalten].astype(str).apply(lambda x: x.str.lower().str.contains(suchbegriff, na=False)).any(axis=1)
-    ergebnisse = df[mask]
-    return ergebnisse
+class SuchArbeiter:
+    """
+    Führt Suchen in einem Hintergrund-Thread aus, damit das Fenster bedienbar bleibt.
 
+    Tk darf nur vom Hauptthread aus benutzt werden: Der Such-Thread legt sein
+    Ergebnis in eine Queue, die der Hauptthread per ``after`` abholt. Angezeigt
+    wird nur das Ergebnis der jeweils letzten Anfrage; ältere Anfragen, die
+    noch warten, werden gar nicht erst ausgeführt. Alle Suchen laufen
+    nacheinander im selben Thread, eine InkrementelleSuche wird also nie
+    gleichzeitig benutzt.
 
-def zeige_ergebnisse(ergebnisse, tree, relevante_spalten):
+    :param root: Tk-Hauptfenster.
     """
-    Zeigt die Suchergebnisse in der Treeview an.
+
+    def __init__(self, root):
+        self.root = root
+        self._fertig = None
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ze-suche')
+        self._ergebnisse = queue.Queue()
+        self._nummer = 0
+        self._offen = 0
+        self._abfrage = None
+
+    def starte(self, fertig, funktion, *argumente):
+        """
+        Reiht eine Suche ein; eine noch wartende ältere Suche verfällt damit.
+
+        :param fertig: Wird im Hauptthread mit (Ergebnis, Fehler) aufgerufen.
+        :param funktion: Im Such-Thread auszuführende Funktion.
+        """
+        self._fertig = fertig
+        self._nummer += 1
+        self._offen += 1
+        self._pool.submit(self._fuehre_aus, self._nummer, funktion, argumente)
+        if self._abfrage is None:
+            self._abfrage = self.root.after(ABFRAGE_MS, self._hole_ergebnisse)
+
+    def _fuehre_aus(self, nummer, funktion, argumente):
+        if nummer != self._nummer:
+            self._ergebnisse.put((nummer, None, None))
+            return
+        try:
+            self._ergebnisse.put((nummer, funktion(*argumente), None))
+        except Exception as e:
+            self._ergebnisse.put((nummer, None, e))
+
+    def _hole_ergebnisse(self):
+        self._abfrage = None
+        while True:
+            try:
+                nummer, ergebnis, fehler = self._ergebnisse.get_nowait()
+            except queue.Empty:
+                break
+            self._offen -= 1
+            if nummer == self._nummer:
+                self._fertig(ergebnis, fehler)
+        if self._offen:
+            self._abfrage = self.root.after(ABFRAGE_MS, self._hole_ergebnisse)
+
+
+class ErgebnisSeiten:
     """
-    # Lösche vorherige Einträge
-    for item in tree.get_children():
-        tree.delete(item)
-
-    if ergebnisse.empty:
-        messagebox.showinfo("Keine Ergebnisse", "Keine passenden Einträge gefunden.")
-    else:
-        # Überprüfen, welche relevanten Spalten vorhanden sind
-        vorhandene_spalten = [spalte for spalte in relevante_spalten if spalte in ergebnisse.columns]
-        fehlende_spalten = [spalte for spalte in relevante_spalten if spalte not in ergebnisse.columns]
-        if fehlende_spalten:
-            messagebox.showwarning("Spaltenwarnung",
-                                   f"Die folgenden Spalten fehlen in den Daten und werden nicht angezeigt:\n{', '.join(fehlende_spalten)}")
+    Blättert seitenweise durch die Trefferzeilen einer Suche.
 
-        # Definiere die Spalten der Treeview
-        tree["columns"] = vorhandene_spalten
-        for col in vorhandene_spalten:
-            tree.heading(col, text=col)
-            tree.column(col, width=100, anchor='center')
+    Gehalten werden nur die Zeilennummern; erst beim Anzeigen einer Seite
+    werden deren höchstens ``seitengroesse`` Zeilen aus der Stammtabelle
+    geholt und als Werte-Array in die Treeview eingefügt.
 
-        # Füge die Daten zur Treeview hinzu
-        for _, row in ergebnisse[vorhandene_spalten].iterrows():
-            tree.insert("", "end", values=list(row))
+    :param tree: Treeview für die Ergebnisse.
+    :param relevante_spalten: Gewünschte Spalten in Anzeigereihenfolge.
+    :param seitengroesse: Zeilen pro Seite.
+    """
+
+    def __init__(self, tree, relevante_spalten, seitengroesse=SEITENGROESSE):
+        self.tree = tree
+        self.relevante_spalten = relevante_spalten
+        self.seitengroesse = seitengroesse
+        self.bestand = None
+        self.zeilen = ()
+        self.spalten = []
+        self.seite = 0
+
+    def __len__(self):
+        return len(self.zeilen)
+
+    @property
+    def seiten(self):
+        return max(1, -(-len(self.zeilen) // self.seitengroesse))
+
+    def setze(self, bestand, zeilen):
+        """
+        Übernimmt ein neues Suchergebnis und zeigt die erste Seite an.
+
+        :return: Liste der gewünschten Spalten, die in den Daten fehlen.
+        """
+        self.bestand = bestand
+        self.zeilen = zeilen
+        vorhandene_spalten, fehlende_spalten = teile_spalten(bestand.df, self.relevante_spalten)
+        if vorhandene_spalten != self.spalten:
+            self.spalten = vorhandene_spalten
+            self.tree["columns"] = vorhandene_spalten
+            for col in vorhandene_spalten:
+                self.tree.heading(col, text=col)
+                self.tree.column(col, width=100, anchor='center')
+        self.zeige(0)
+        return fehlende_spalten
+
+    def leere(self):
+        self.zeilen = ()
+        self.seite = 0
+        self.tree.delete(*self.tree.get_children())
+
+    def zeige(self, seite):
+        """
+        Ersetzt den Inhalt der Treeview durch die angegebene Seite.
+        """
+        self.seite = min(max(seite, 0), self.seiten - 1)
+        self.tree.delete(*self.tree.get_children())
+        if not len(self.zeilen):
+            return
+        start = self.seite * self.seitengroesse
+        teil = self.bestand.modell.eintraege(self.zeilen[start:start + self.seitengroesse])[self.spalten]
+        werte = teil.astype(object).where(teil.notna(), '').to_numpy()
+        for zeile in werte.tolist():
+            self.tree.insert("", "end", values=zeile)
+        self.tree.yview_moveto(0)
 
+    def blaettere(self, schritt):
+        self.zeige(self.seite + schritt)
 
-def start_suche(df, tree, eingabe, relevante_spalten):
-    """
-    Startet die Suche und zeigt die Ergebnisse an.
-    """
-    suchbegriff = eingabe.get().strip()
-    if suchbegriff.lower() == 'exit':
-        root.quit()
-        return
-    if suchbegriff == "":
-        messagebox.showwarning("Eingabefehler", "Bitte geben Sie einen gültigen Suchbegriff ein.")
-        return
-    ergebnisse = suche_daten(df, suchbegriff)
-    zeige_ergebnisse(ergebnisse, tree, relevante_spalten)
+    def beschreibung(self):
+        if not len(self.zeilen):
+            return "Keine Ergebnisse gefunden."
+        start = self.seite * self.seitengroesse
+        ende = min(start + self.seitengroesse, len(self.zeilen))
+        return (f"{len(self.zeilen)} Einträge gefunden. Seite {self.seite + 1} von {self.seiten} "
+                f"(Einträge {start + 1}–{ende}).")
 
 
 # Hauptfenster erstellen
@@ -91,10 +194,12 @@ root.resizable(False, False)
 # Excel-Dateipfad
 excel_pfad = r"C:\Users\hamad\OneDrive\Desktop\ZE Liste.xlsx"
 
-# Daten laden
-df = lade_excel_datei(excel_pfad)
+# Daten laden und Suchindex einmalig aufbauen; Änderungen an der Datei werden im Hintergrund nachgeladen
+maschine = lade_excel_datei(excel_pfad)
+if maschine is not None:
+    maschine.beobachte()
 
-if df is None:
+if maschine is None:
     root.destroy()  # Beende die Anwendung, wenn die Datei nicht geladen werden kann
 else:
     # Suchbereich
@@ -107,16 +212,36 @@ else:
     eingabe = ttk.Entry(frame_search, width=50)
     eingabe.pack(side='left', fill='x', expand=True, padx=(0, 10))
 
-    button_suchen = ttk.Button(frame_search, text="Suchen",
-                               command=lambda: start_suche(df, tree, eingabe, relevante_spalten))
+    modus_auswahl = ttk.Combobox(frame_search, values=list(MODI.values()), state='readonly', width=18)
+    modus_auswahl.set(MODI[LITERAL])
+    modus_auswahl.pack(side='left', padx=(0, 10))
+
+    button_suchen = ttk.Button(frame_search, text="Suchen", command=lambda: start_suche())
     button_suchen.pack(side='left')
 
+    live_aktiv = tk.BooleanVar(value=False)
+    check_live = ttk.Checkbutton(frame_search, text="Live-Suche", variable=live_aktiv)
+    check_live.pack(side='left', padx=(10, 0))
+
+    # Statusleiste
+    status = ttk.Label(root, text="Geben Sie einen Suchbegriff ein und klicken Sie auf 'Suchen'.", relief='sunken',
+                       anchor='w')
+    status.pack(side='bottom', fill='x')
+
+    # Blättern zwischen den Ergebnisseiten
+    frame_seiten = ttk.Frame(root, padding=(10, 0))
+    frame_seiten.pack(side='bottom', fill='x')
+    button_zurueck = ttk.Button(frame_seiten, text="◀ Zurück", command=lambda: blaettere(-1))
+    button_zurueck.pack(side='left')
+    button_weiter = ttk.Button(frame_seiten, text="Weiter ▶", command=lambda: blaettere(1))
+    button_weiter.pack(side='left', padx=(10, 0))
+
     # Treeview für Ergebnisse
     frame_results = ttk.Frame(root, padding="10")
     frame_results.pack(fill='both', expand=True)
 
     # Definiere die relevanten Spalten
-    relevante_spalten = ['ZE', 'OPS', 'OPS-Text', 'Handelsnamen', 'Wirkstoffklasse', 'Infos', 'Betrag']
+    relevante_spalten = RELEVANTE_SPALTEN
 
     tree = ttk.Treeview(frame_results, columns=relevante_spalten, show='headings')
     tree.pack(side='left', fill='both', expand=True)
@@ -131,10 +256,7 @@ else:
         tree.heading(spalte, text=spalte)
         tree.column(spalte, width=100, anchor='center')
 
-    # Statusleiste
-    status = ttk.Label(root, text="Geben Sie einen Suchbegriff ein und klicken Sie auf 'Suchen'.", relief='sunken',
-                       anchor='w')
-    status.pack(side='bottom', fill='x')
+    seiten = ErgebnisSeiten(tree, relevante_spalten)
 
 
     # Funktion zur Aktualisierung der Statusleiste
@@ -142,38 +264,61 @@ else:
         status.config(text=message)
 
 
-    # Aktualisiere die Statusleiste nach der Suche
-    def zeige_ergebnisse(ergebnisse, tree, relevante_spalten):
-        # Lösche vorherige Einträge
-        for item in tree.get_children():
-            tree.delete(item)
-
-        if ergebnisse.empty:
-            messagebox.showinfo("Keine Ergebnisse", "Keine passenden Einträge gefunden.")
-            update_status("Keine Ergebnisse gefunden.")
-        else:
-            # Überprüfen, welche relevanten Spalten vorhanden sind
-            vorhandene_spalten = [spalte for spalte in relevante_spalten if spalte in ergebnisse.columns]
-            fehlende_spalten = [spalte for spalte in relevante_spalten if spalte not in ergebnisse.columns]
-            if fehlende_spalten:
-                messagebox.showwarning("Spaltenwarnung",
-                                       f"Die folgenden Spalten fehlen in den Daten und werden nicht angezeigt:\n{', '.join(fehlende_spalten)}")
-
-            # Definiere die Spalten der Treeview
-            tree["columns"] = vorhandene_spalten
-            for col in vorhandene_spalten:
-                tree.heading(col, text=col)
-                tree.column(col, width=100, anchor='center')
+    def aktualisiere_seitenknoepfe():
+        button_zurueck.state(['!disabled'] if seiten.seite > 0 else ['disabled'])
+        button_weiter.state(['!disabled'] if seiten.seite < seiten.seiten - 1 else ['disabled'])
+
+
+    def blaettere(schritt):
+        seiten.blaettere(schritt)
+        aktualisiere_seitenknoepfe()
+        update_status(seiten.beschreibung())
+
+
+    def zeige_ergebnisse(ergebnis, fehler, hinweis=True):
+        """
+        Zeigt das Ergebnis einer Hintergrundsuche an (läuft im Tk-Hauptthread).
+        """
+        if fehler is not None:
+            seiten.leere()
+            aktualisiere_seitenknoepfe()
+            if isinstance(fehler, SuchFehler):
+                messagebox.showerror("Suchfehler", str(fehler))
+            else:
+                messagebox.showerror("Fehler", f"Ein Fehler ist aufgetreten:\n{fehler}")
+            update_status("Suche fehlgeschlagen.")
+            return
+
+        bestand, zeilen = ergebnis
+        fehlende_spalten = seiten.setze(bestand, zeilen)
+        aktualisiere_seitenknoepfe()
+        update_status(seiten.beschreibung())
+        if not len(zeilen):
+            if hinweis:
+                messagebox.showinfo("Keine Ergebnisse", "Keine passenden Einträge gefunden.")
+        elif fehlende_spalten:
+            messagebox.showwarning("Spaltenwarnung",
+                                   f"Die folgenden Spalten fehlen in den Daten und werden nicht angezeigt:\n{', '.join(fehlende_spalten)}")
+
+
+    arbeiter = SuchArbeiter(root)
 
-            # Füge die Daten zur Treeview hinzu
-            for _, row in ergebnisse[vorhandene_spalten].iterrows():
-                tree.insert("", "end", values=list(row))
 
-            update_status(f"{len(ergebnisse)} Einträge gefunden.")
+    def starte_hintergrundsuche(suchbegriff, inkrementell=None):
+        fehlende_spalten = maschine.fehlende_spalten(SUCHSPALTEN)
+        if fehlende_spalten:
+            messagebox.showerror("Spaltenfehler",
+                                 f"Die folgenden erforderlichen Spalten fehlen in der Excel-Datei:\n{', '.join(fehlende_spalten)}")
+            return
+        modus = next(schluessel for schluessel, text in MODI.items() if text == modus_auswahl.get())
+        update_status(f"Suche nach '{suchbegriff}' ...")
+        # Live-Suchen melden fehlende Treffer nur in der Statusleiste
+        hinweis = inkrementell is None
+        arbeiter.starte(lambda ergebnis, fehler: zeige_ergebnisse(ergebnis, fehler, hinweis), suche_daten,
+                        maschine, suchbegriff, modus, inkrementell)
 
 
-    # Aktualisiere die 'zeige_ergebnisse' Funktion
-    def start_suche(df, tree, eingabe, relevante_spalten):
+    def start_suche():
         suchbegriff = eingabe.get().strip()
         if suchbegriff.lower() == 'exit':
             root.quit()
@@ -181,9 +326,40 @@ else:
         if suchbegriff == "":
             messagebox.showwarning("Eingabefehler", "Bitte geben Sie einen gültigen Suchbegriff ein.")
             return
-        ergebnisse = suche_daten(df, suchbegriff)
-        zeige_ergebnisse(ergebnisse, tree, relevante_spalten)
+        starte_hintergrundsuche(suchbegriff)
+
+
+    # Live-Suche: sucht kurz nach dem letzten Tastendruck und grenzt dabei das vorherige Ergebnis weiter ein
+    live_suche = maschine.live_suche(SUCHSPALTEN)
+    geplante_suche = None
+
+
+    def plane_live_suche(event=None):
+        global geplante_suche
+        if not live_aktiv.get():
+            return
+        # Noch ausstehende Suche verwerfen, damit schnelles Tippen nur eine Suche auslöst
+        if geplante_suche is not None:
+            root.after_cancel(geplante_suche)
+        geplante_suche = root.after(LIVE_VERZOEGERUNG_MS, fuehre_live_suche_aus)
+
+
+    def fuehre_live_suche_aus():
+        global geplante_suche
+        geplante_suche = None
+        suchbegriff = eingabe.get().strip()
+        if suchbegriff == "":
+            seiten.leere()
+            aktualisiere_seitenknoepfe()
+            update_status("Geben Sie einen Suchbegriff ein.")
+            return
+        starte_hintergrundsuche(suchbegriff, live_suche)
+
 
+    eingabe.bind('<KeyRelease>', plane_live_suche)
+    eingabe.bind('<Return>', lambda event: start_suche())
+    modus_auswahl.bind('<<ComboboxSelected>>', plane_live_suche)
+    aktualisiere_seitenknoepfe()
 
     # Starte die GUI
     root.mainloop()
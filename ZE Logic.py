@@ -1,14 +1,15 @@
-import pandas as pd
-from tabulate import tabulate
+from ze_index import FUZZY, LITERAL, OPS_KODE, SuchFehler, ist_ops_kode
+from ze_suche import RELEVANTE_SPALTEN, SUCHSPALTEN, SuchMaschine, teile_spalten
 
 
 def lade_excel_datei(pfad):
     """
-    Lädt die Excel-Datei und gibt den DataFrame zurück.
+    Lädt die Excel-Datei über die Suchmaschine und gibt sie zurück.
     """
+    maschine = SuchMaschine(pfad)
     try:
-        df = pd.read_excel(pfad)
-        return df
+        maschine.bestand()
+        return maschine
     except FileNotFoundError:
         print(f"Die Datei wurde nicht gefunden: {pfad}")
         return None
@@ -17,29 +18,25 @@ def lade_excel_datei(pfad):
         return None
 
 
-def suche_daten(df, suchbegriff):
+def suche_daten(maschine, suchbegriff, modus=LITERAL):
     """
     Sucht nach dem Suchbegriff in den Spalten 'OPS-Text' und 'Handelsnamen'.
+    Gesucht wird im vorberechneten, normalisierten Suchindex (Groß-/Kleinschreibung und Umlaute egal).
+    Der Suchbegriff wird wörtlich genommen, sofern kein anderer Modus aus ze_index.MODI gewählt ist.
     """
-    # Konvertiere Suchbegriff zu Kleinbuchstaben für eine case-insensitive Suche
-    suchbegriff = suchbegriff.lower()
+    import pandas as pd
 
-    # Überprüfe, welche Spalten durchsucht werden sollen
-    suchspalten = ['OPS-Text', 'Handelsnamen']
-
-    # Prüfe, ob die Suchspalten im DataFrame vorhanden sind
-    fehlende_spalten = [spalte for spalte in suchspalten if spalte not in df.columns]
+    # Prüfe, ob die Suchspalten vorhanden sind
+    fehlende_spalten = maschine.fehlende_spalten(SUCHSPALTEN)
     if fehlende_spalten:
         print(f"Die folgenden erforderlichen Spalten fehlen in der Excel-Datei: {', '.join(fehlende_spalten)}")
         return pd.DataFrame()  # Leerer DataFrame
 
-    # Erstelle eine Maske für Zeilen, die den Suchbegriff enthalten
-    mask = df[suchspalten].astype(str).apply(lambda x: x.str.lower().str.contains(suchbegriff, na=False)).any(axis=1)
-
-    # Filtere den DataFrame
-    ergebnisse = df[mask]
-
-    return ergebnisse
+    try:
+        return maschine.ergebnisse(suchbegriff, SUCHSPALTEN, modus)
+    except SuchFehler as e:
+        print(e)
+        return pd.DataFrame()
 
 
 def zeige_ergebnisse(ergebnisse):
@@ -49,18 +46,15 @@ def zeige_ergebnisse(ergebnisse):
     if ergebnisse.empty:
         print("Keine passenden Einträge gefunden.")
     else:
-        # Definiere die relevanten Spalten
-        relevante_spalten = ['ZE', 'OPS', 'OPS-Text', 'Handelsnamen', 'Wirkstoffklasse', 'Infos', 'Betrag']
-
-        # Überprüfen, ob die Spalten existieren
-        vorhandene_spalten = [spalte for spalte in relevante_spalten if spalte in ergebnisse.columns]
-
-        fehlende_spalten = [spalte for spalte in relevante_spalten if spalte not in ergebnisse.columns]
+        # Überprüfen, welche der relevanten Spalten existieren
+        vorhandene_spalten, fehlende_spalten = teile_spalten(ergebnisse, RELEVANTE_SPALTEN)
         if fehlende_spalten:
             print(
                 f"Die folgenden Spalten fehlen in den Daten und werden nicht angezeigt: {', '.join(fehlende_spalten)}")
 
-        # Bereite die Daten für die tabulate-Bibliothek vor
+        # Bereite die Daten für die tabulate-Bibliothek vor (erst bei Bedarf importiert)
+        from tabulate import tabulate
+
         tabelle = ergebnisse[vorhandene_spalten]
 
         # Zeige die Tabelle an
@@ -69,19 +63,29 @@ def zeige_ergebnisse(ergebnisse):
 
 def main():
     excel_pfad = r"C:\Users\hamad\OneDrive\Desktop\ZE Liste.xlsx"
-    df = lade_excel_datei(excel_pfad)
+    maschine = lade_excel_datei(excel_pfad)
 
-    if df is not None:
+    if maschine is not None:
         while True:
             suchbegriff = input(
-                "Geben Sie einen Teil des OPS-Textes oder Handelsnamens ein (oder 'exit' zum Beenden): ").strip()
+                "Geben Sie einen Teil des OPS-Textes oder Handelsnamens oder einen OPS-Kode ein "
+                "(oder 'exit' zum Beenden): ").strip()
             if suchbegriff.lower() == 'exit':
                 print("Programm wird beendet.")
                 break
             if suchbegriff == "":
                 print("Bitte geben Sie einen gültigen Suchbegriff ein.")
                 continue
-            ergebnisse = suche_daten(df, suchbegriff)
+            # Eingaben wie '6-002.p1' oder '8-810.*' zuerst als OPS-Kode suchen
+            ergebnisse = suche_daten(maschine, suchbegriff, OPS_KODE) if ist_ops_kode(suchbegriff) else None
+            if ergebnisse is None or ergebnisse.empty:
+                ergebnisse = suche_daten(maschine, suchbegriff)
+            if ergebnisse.empty:
+                # Kein wörtlicher Treffer: ähnliche Handelsnamen vorschlagen (Tippfehler)
+                vorschlaege = maschine.vorschlaege(suchbegriff)
+                if vorschlaege:
+                    print(f"Meinten Sie: {', '.join(vorschlaege)}?")
+                    ergebnisse = suche_daten(maschine, suchbegriff, FUZZY)
             zeige_ergebnisse(ergebnisse)
             print("\n")  # Neue Zeile für bessere Lesbarkeit
 
@@ -0,0 +1,113 @@
+"""
+Lasttest für die Such-API (ze_api.py).
+
+Startet den Server als eigenen Prozess (oder nutzt mit ``--port`` einen
+laufenden), öffnet mehrere Keep-Alive-Verbindungen und schickt eine feste
+Mischung aus Suchanfragen, so schnell der Server antwortet. Ausgegeben werden
+Anfragen pro Sekunde sowie Median und 95. Perzentil der Antwortzeit.
+
+Der Client läuft auf derselben Maschine und konkurriert um die CPU; die
+Zahlen sind also eher eine Untergrenze.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/bench_api.py --verbindungen 16 --dauer 10
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from urllib.parse import quote
+
+PROJEKT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ANFRAGEN = ['/search?q=' + quote(q) for q in ('gemcitabin', 'eculizumab', 'soliris', 'immunglobulin', 'faktor',
+                                               'vfend', 'mg bis unter', 'xylophon')]
+ANFRAGEN += ['/search?q=gem&mode=praefix', '/search?q=Remicaid&mode=fuzzy', '/search?q=gemcitabin&format=csv']
+
+
+async def lies_antwort(reader):
+    """
+    Liest eine Antwort (Content-Length oder chunked) und liefert den Status.
+    """
+    kopf = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    felder = {z.partition(':')[0].lower(): z.partition(':')[2].strip() for z in kopf[1:] if z}
+    if 'content-length' in felder:
+        await reader.readexactly(int(felder['content-length']))
+    else:
+        while True:
+            laenge = int((await reader.readuntil(b'\r\n')).strip(), 16)
+            await reader.readexactly(laenge + 2)
+            if laenge == 0:
+                break
+    return int(kopf[0].split(' ')[1])
+
+
+async def client(port, nummer, ende, zeiten, fehler):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    i = nummer
+    while time.perf_counter() < ende:
+        pfad = ANFRAGEN[i % len(ANFRAGEN)]
+        i += 1
+        start = time.perf_counter()
+        writer.write(f"GET {pfad} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode('latin-1'))
+        status = await lies_antwort(reader)
+        zeiten.append(time.perf_counter() - start)
+        if status != 200:
+            fehler.append(status)
+    writer.close()
+
+
+async def last(port, verbindungen, dauer):
+    zeiten, fehler = [], []
+    ende = time.perf_counter() + dauer
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, i, ende, zeiten, fehler) for i in range(verbindungen)))
+    return zeiten, fehler, time.perf_counter() - start
+
+
+async def warte_auf_server(port, zeitlimit=120):
+    ende = time.monotonic() + zeitlimit
+    while time.monotonic() < ende:
+        try:
+            _, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"Server auf Port {port} antwortet nicht")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pfad', default='ZE Liste.xlsx')
+    parser.add_argument('--port', type=int, help="Laufenden Server nutzen statt einen zu starten")
+    parser.add_argument('--verbindungen', type=int, default=16)
+    parser.add_argument('--dauer', type=float, default=10.0, help="Sekunden je Durchlauf")
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if port is None:
+        port = 8597
+        server = subprocess.Popen([sys.executable, 'ze_api.py', '--datei', os.path.abspath(args.pfad),
+                                   '--port', str(port)], cwd=PROJEKT, stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(warte_auf_server(port))
+        asyncio.run(last(port, args.verbindungen, 1.0))  # Aufwärmen: Cache füllen
+        zeiten, fehler, dauer = asyncio.run(last(port, args.verbindungen, args.dauer))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    zeiten.sort()
+    print(f"{len(zeiten)} Anfragen über {args.verbindungen} Verbindungen in {dauer:.1f} s, {len(fehler)} Fehler")
+    print(f"Durchsatz: {len(zeiten) / dauer:.0f} Anfragen/s")
+    print(f"Antwortzeit: p50 {zeiten[len(zeiten) // 2] * 1000:.2f} ms, "
+          f"p95 {zeiten[int(len(zeiten) * 0.95)] * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
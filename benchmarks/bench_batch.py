@@ -0,0 +1,80 @@
+"""
+Misst die Stapelzuordnung (ze_batch) an einer synthetischen Fall-Liste.
+
+Die Liste besteht aus OPS-Kodes der ZE-Liste (teils ohne Punkt und
+Bindestrich, teils als Unterkode eines '*'-Kodes, teils unbekannt) und aus
+Handelsnamen als Freitext, verteilt auf Fälle zu je etwa zehn Positionen. Zum
+Vergleich wird ein Teil der Zeilen einzeln über den Index gesucht, so wie
+bisher über den ``input()``-Dialog.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/bench_batch.py --zeilen 100000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ze_batch import fasse_zusammen, ordne_zu  # noqa: E402
+from ze_suche import SuchMaschine  # noqa: E402
+
+
+def erzeuge_faelle(stamm, zeilen, seed=0):
+    """
+    Erzeugt eine Fall-Liste mit OPS-Kodes und Freitext aus der ZE-Liste.
+    """
+    rng = np.random.default_rng(seed)
+    kodes = stamm['OPS'].dropna().astype(str).to_numpy()
+    kodes = np.array([k.replace('*', rng.choice(list('0123456789abc'))) for k in kodes], dtype=object)
+    namen = stamm['Handelsnamen'].dropna().astype(str).str.split(',').explode().str.strip()
+    namen = namen.str.replace('®', '', regex=False).unique()
+
+    ops = rng.choice(kodes, zeilen).astype(object)
+    ohne_punkt = rng.random(zeilen) < 0.3
+    ops[ohne_punkt] = [k.replace('-', '').replace('.', '') for k in ops[ohne_punkt]]
+    unbekannt = rng.random(zeilen) < 0.05
+    ops[unbekannt] = '9-999.99'
+    text = rng.choice(namen, zeilen).astype(object)
+    ist_text = rng.random(zeilen) < 0.3
+    ops[ist_text] = None
+    text[~ist_text] = None
+    return pd.DataFrame({'Fall': np.sort(rng.integers(0, max(zeilen // 10, 1), zeilen)).astype(str),
+                         'OPS': ops, 'Medikament': text})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pfad', default='ZE Liste.xlsx')
+    parser.add_argument('--zeilen', type=int, default=100000)
+    parser.add_argument('--einzeln', type=int, default=2000, help="Zeilen für den Vergleich mit Einzelsuchen")
+    args = parser.parse_args()
+
+    modell = SuchMaschine(args.pfad).bestand().modell
+    faelle = erzeuge_faelle(modell.stamm, args.zeilen)
+
+    start = time.perf_counter()
+    ergebnis = ordne_zu(faelle, modell, 'OPS', 'Medikament')
+    zuordnung = time.perf_counter() - start
+    zusammenfassung = fasse_zusammen(ergebnis, 'Fall')
+    gesamt = time.perf_counter() - start
+    print(f"{len(faelle)} Zeilen, {len(zusammenfassung)} Fälle: Zuordnung {zuordnung:.2f} s, "
+          f"mit Fall-Summen {gesamt:.2f} s ({len(faelle) / gesamt:,.0f} Zeilen/s)")
+    print(ergebnis['Status'].value_counts().to_string())
+
+    # Bisheriger Weg: jede Zeile einzeln suchen (OPS-Kode bzw. Text im Index)
+    probe = faelle.head(args.einzeln)
+    start = time.perf_counter()
+    for ops, text in zip(probe['OPS'], probe['Medikament']):
+        begriff = ops if isinstance(ops, str) else text
+        modell.eintraege(modell.suche(begriff))
+    einzeln = (time.perf_counter() - start) / len(probe) * len(faelle)
+    print(f"Einzelsuchen (hochgerechnet auf {len(faelle)} Zeilen): {einzeln:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""
+Vergleicht die bisherige Zeitschritt-Schleife aus ``Kinetik.py`` mit dem
+ereignisgesteuerten Modell aus ``pk_modell``.
+
+Für verschiedene Behandlungsdauern und Rasterweiten werden Laufzeit und
+größte Abweichung von der exakten Lösung ausgegeben. Die Schleife erfasst
+eine Infusion erst ab dem nächsten Zeitschritt und beendet sie einen Schritt
+zu früh; ihr Fehler hängt daher von der Rasterweite ab.
+
+Anschließend wird dasselbe Schema für Populationen virtueller Patienten
+gerechnet (``simuliere_population``), seriell und mit Prozess-Pool, und die
+Dosisoptimierung (``optimiere_dosierung``) auf dem Standard- und einem feinen
+Raster gemessen. Zuletzt wird ein Patient mit abweichenden Parametern
+schrittweise an 1 bis 6 gemessene Spiegel angepasst (``TdmGitter``) und
+``KompartimentModell`` (Matrixexponentiale je Schrittweite) mit dem
+geschlossenen Ein-Kompartiment-Modell verglichen, für einen Patienten und die
+Population, dazu das Zwei-Kompartiment-Modell.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/bench_kinetik.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pk_modell  # noqa: E402
+
+from pk_modell import (EinKompartimentModell, Gabe, KompartimentModell, Messung, Population,  # noqa: E402
+                       TdmGitter, ereignisplan, konzentrationen, optimiere_dosierung, regelmaessige_gaben,
+                       simuliere_population)
+
+# Parameter wie in Kinetik.py
+VD = 0.7 * 70
+KEL = 30 / 1000 * 60 / VD
+LADEDOSIS = 1500
+ERHALTUNGSDOSIS = 1250
+INFUSIONSDAUER = 3
+INTERVALL = 24
+
+
+def zeitschritt_simulation(dauer, dt):
+    """
+    Die bisherige Schleife aus Kinetik.py (unverändert bis auf die Parameter).
+    """
+    time_points = np.arange(0, dauer + dt, dt)
+    plasma_concentration = np.zeros_like(time_points, dtype=float)
+    plasma_concentration[0] = LADEDOSIS / VD
+    A = LADEDOSIS
+    infusions = []
+    for i in range(1, len(time_points)):
+        t = time_points[i]
+        infusions = [end_time for end_time in infusions if t < end_time]
+        infusion_rate = (ERHALTUNGSDOSIS / INFUSIONSDAUER) * len(infusions)
+        A = A * np.exp(-KEL * dt) + (infusion_rate / KEL) * (1 - np.exp(-KEL * dt))
+        plasma_concentration[i] = A / VD
+        if np.isclose(t % INTERVALL, 0, atol=dt / 2):
+            infusions.append(t + INFUSIONSDAUER)
+    return time_points, plasma_concentration
+
+
+def schema(dauer):
+    return [Gabe(0, LADEDOSIS)] + regelmaessige_gaben(ERHALTUNGSDOSIS, INTERVALL, INFUSIONSDAUER,
+                                                       beginn=INTERVALL, ende=dauer)
+
+
+def ereignis_simulation(dauer, dt):
+    modell = EinKompartimentModell(KEL, VD)
+    gaben = schema(dauer)
+    time_points = np.arange(0, dauer + dt, dt)
+    return time_points, modell.konzentration(gaben, time_points)
+
+
+def zeit(funktion, *argumente, wiederholungen=3):
+    bestes = float('inf')
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        ergebnis = funktion(*argumente)
+        bestes = min(bestes, time.perf_counter() - start)
+    return bestes, ergebnis
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tage', type=int, nargs='+', default=[7, 90])
+    parser.add_argument('--raster', type=float, nargs='+', default=[0.5, 0.05, 0.005], help="Rasterweiten in h")
+    parser.add_argument('--patienten', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--prozesse', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(f"{'Tage':>5}{'dt [h]':>8}{'Punkte':>10}{'Schleife [ms]':>15}{'Ereignisse [ms]':>17}{'Faktor':>9}"
+          f"{'Fehler Schleife [mg/L]':>24}")
+    for tage in args.tage:
+        for dt in args.raster:
+            dauer = tage * 24
+            t_schleife, (_, schleife) = zeit(zeitschritt_simulation, dauer, dt, wiederholungen=1)
+            t_ereignis, (punkte, exakt) = zeit(ereignis_simulation, dauer, dt)
+            print(f"{tage:>5}{dt:>8}{len(punkte):>10}{t_schleife * 1000:>15.1f}{t_ereignis * 1000:>17.2f}"
+                  f"{t_schleife / t_ereignis:>9.0f}{np.abs(schleife - exakt).max():>24.3f}")
+
+    # Population: 7 Tage im Raster von 0,5 h
+    gaben = schema(7 * 24)
+    zeiten = np.arange(0, 7 * 24 + 0.5, 0.5)
+    print(f"\n{'Patienten':>10}{'seriell [s]':>13}{f'{args.prozesse} Prozesse [s]':>18}{'max. im Zielbereich':>22}")
+    for anzahl in args.patienten:
+        population = Population.ziehe(anzahl, seed=0)
+        t_seriell, ergebnis = zeit(simuliere_population, population, gaben, zeiten, wiederholungen=1)
+        t_pool, _ = zeit(lambda: simuliere_population(population, gaben, zeiten, prozesse=args.prozesse),
+                         wiederholungen=1)
+        print(f"{anzahl:>10}{t_seriell:>13.2f}{t_pool:>18.2f}{ergebnis.anteil_im_bereich.max():>22.1%}")
+
+    # Dosisoptimierung für den Patienten aus Kinetik.py
+    modell = EinKompartimentModell(KEL, VD)
+    raster = {'Standard': {}, 'fein': {'dosen': np.arange(100.0, 4001.0, 25.0), 'dauern': np.arange(0.5, 6.01, 0.25),
+                                       'intervalle': np.arange(6.0, 48.1, 2.0)}}
+    print(f"\n{'Raster':>10}{'Schemata':>10}{'Optimierung [ms]':>18}  bestes Schema")
+    for name, optionen in raster.items():
+        dauer, vorschlaege = zeit(lambda: optimiere_dosierung(modell, **optionen), wiederholungen=20)
+        schemata = np.prod([len(optionen.get(a, getattr(pk_modell, a.upper()))) for a in ('dosen', 'intervalle',
+                                                                                           'dauern')])
+        bestes = vorschlaege[0]
+        print(f"{name:>10}{schemata:>10}{dauer * 1000:>18.2f}  {bestes.dosis:.0f} mg / {bestes.intervall:g} h "
+              f"über {bestes.dauer:g} h (Tal {bestes.talspiegel:.1f} mg/L, AUC24 {bestes.auc24:.0f})")
+
+    # Bayes-TDM: Talspiegel vor jeder Gabe, 5 % Messrauschen; Prior sind die Werte aus Kinetik.py
+    wahr = EinKompartimentModell.aus_clearance(2.6, 40.0)
+    gaben = schema(7 * 24)
+    zeiten = np.arange(1, 7) * INTERVALL - 0.5
+    gemessen = wahr.konzentration(gaben, zeiten) * (1 + 0.05 * np.random.default_rng(0).standard_normal(len(zeiten)))
+    dauer, gitter = zeit(TdmGitter, KEL * VD, VD)
+    print(f"\nTDM: Gitter mit {len(gitter)} Punkten in {dauer * 1000:.1f} ms; wahr: CL {wahr.clearance:.2f} L/h, "
+          f"Vd {wahr.vd:.1f} L")
+    print(f"{'Spiegel':>8}{'Anpassung [ms]':>16}{'CL (MAP)':>10}{'Vd (MAP)':>10}")
+    for anzahl in range(1, len(zeiten) + 1):
+        messungen = [Messung(t, c) for t, c in zip(zeiten[:anzahl], gemessen[:anzahl])]
+        dauer, ergebnis = zeit(gitter.anpasse, gaben, messungen, wiederholungen=5)
+        print(f"{anzahl:>8}{dauer * 1000:>16.1f}{ergebnis.modell.clearance:>10.2f}{ergebnis.modell.vd:>10.1f}")
+
+    # Kompartimentmodelle: 7 Tage im Raster von 0,5 h; Fehler gegen die geschlossene Lösung
+    gaben = schema(7 * 24)
+    zeiten = np.arange(0, 7 * 24 + 0.5, 0.5)
+    print(f"\n{'Modell':>22}{'Patienten':>11}{'Matrix [ms]':>13}{'geschlossen [ms]':>18}{'Fehler [mg/L]':>15}")
+    for anzahl in [1] + args.patienten[:1]:
+        population = Population.ziehe(anzahl, seed=0)
+        if anzahl == 1:
+            geschlossen = EinKompartimentModell(KEL, VD)
+            t_geschlossen, exakt = zeit(geschlossen.konzentration, gaben, zeiten)
+            erzeuge = lambda: KompartimentModell.ein_kompartiment(KEL, VD)  # noqa: E731
+        else:
+            plan = ereignisplan(gaben)
+            t_geschlossen, exakt = zeit(konzentrationen, population.kel, population.vd, plan, zeiten)
+            erzeuge = lambda: KompartimentModell.ein_kompartiment(population.kel, population.vd)  # noqa: E731
+        # Jede Wiederholung mit neuem Modell, d. h. einschließlich der Matrixexponentiale
+        t_matrix, matrix = zeit(lambda: erzeuge().konzentration(gaben, zeiten))
+        print(f"{'Ein-Kompartiment':>22}{anzahl:>11}{t_matrix * 1000:>13.1f}{t_geschlossen * 1000:>18.1f}"
+              f"{np.abs(matrix - exakt).max():>15.1e}")
+        t_zwei, _ = zeit(lambda: KompartimentModell.zwei_kompartimente(population.clearance, population.vd, 6.5, 38.4)
+                         .konzentration(gaben, zeiten))
+        print(f"{'Zwei-Kompartiment':>22}{anzahl:>11}{t_zwei * 1000:>13.1f}{'-':>18}{'-':>15}")
+
+
+if __name__ == '__main__':
+    main()
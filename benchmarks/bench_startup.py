@@ -0,0 +1,88 @@
+"""
+Misst Start- und Importzeit der Einmal-Suche ``ze_search.py``.
+
+Jeder Durchlauf startet einen neuen Interpreter, so wie ein Aufruf von der
+Kommandozeile. Gemessen werden die Wanduhrzeit des ganzen Aufrufs und – per
+``python -X importtime`` – die teuersten Importe. Zum Vergleich läuft
+dieselbe Suche über ``SuchMaschine`` (lädt pandas).
+
+Der erste Aufruf legt bei Bedarf den Snapshot an und wird nicht gewertet.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/bench_startup.py --suchbegriff vancomycin
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+PROJEKT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MASCHINE = ("import sys; from ze_suche import SuchMaschine; "
+            "print(len(SuchMaschine(sys.argv[1]).ergebnisse(sys.argv[2])))")
+
+
+def starte(befehl):
+    """
+    Führt einen Befehl im Projektverzeichnis aus und liefert (Sekunden, stderr).
+    """
+    start = time.perf_counter()
+    ergebnis = subprocess.run(befehl, cwd=PROJEKT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return time.perf_counter() - start, ergebnis.stderr
+
+
+def miss(befehl, wiederholungen):
+    """
+    Startet den Befehl mehrfach und liefert Median und bestes Ergebnis in ms.
+    """
+    starte(befehl)
+    zeiten = sorted(starte(befehl)[0] * 1000 for _ in range(wiederholungen))
+    return zeiten[len(zeiten) // 2], zeiten[0]
+
+
+def importe(befehl, anzahl):
+    """
+    Die teuersten Module (kumulierte Importzeit) aus ``-X importtime``.
+    """
+    _, stderr = starte([befehl[0], '-X', 'importtime'] + befehl[1:])
+    module = []
+    for zeile in stderr.splitlines():
+        # Format: "import time: <selbst µs> | <kumuliert µs> | <eingerückter Modulname>"
+        if not zeile.startswith('import time:') or 'cumulative' in zeile:
+            continue
+        _, kumuliert, name = zeile.split('|')
+        module.append((int(kumuliert), name.strip()))
+    return sorted(module, reverse=True)[:anzahl]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pfad', default='ZE Liste.xlsx')
+    parser.add_argument('--suchbegriff', default='vancomycin')
+    parser.add_argument('--wiederholungen', type=int, default=10)
+    parser.add_argument('--module', type=int, default=12, help="Anzahl der angezeigten Importe")
+    args = parser.parse_args()
+    pfad = os.path.abspath(args.pfad)
+
+    befehle = {
+        'python (leer)': [sys.executable, '-c', 'pass'],
+        'import numpy': [sys.executable, '-c', 'import numpy'],
+        'import pandas': [sys.executable, '-c', 'import pandas'],
+        'ze_search.py': [sys.executable, 'ze_search.py', '--datei', pfad, args.suchbegriff],
+        'SuchMaschine': [sys.executable, '-c', MASCHINE, pfad, args.suchbegriff],
+    }
+    print(f"{'Aufruf':<16}{'Median [ms]':>14}{'bestes [ms]':>14}")
+    for name, befehl in befehle.items():
+        median, bestes = miss(befehl, args.wiederholungen)
+        print(f"{name:<16}{median:>14.0f}{bestes:>14.0f}")
+
+    print("\nTeuerste Importe von ze_search.py (kumuliert):")
+    for kumuliert, name in importe(befehle['ze_search.py'], args.module):
+        print(f"{kumuliert / 1000:>10.1f} ms  {name}")
+    geladen = {name for _, name in importe(befehle['ze_search.py'], 10 ** 6)}
+    print(f"\npandas importiert: {'ja' if 'pandas' in geladen else 'nein'}")
+
+
+if __name__ == '__main__':
+    main()
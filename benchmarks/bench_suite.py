@@ -0,0 +1,347 @@
+"""
+Messreihe für Laden, Vorbereiten und Suchen an synthetisch vergrößerten ZE-Listen.
+
+Aus ``ZE Liste.xlsx`` entstehen Arbeitsmappen mit dem 1-, 10- und 100-fachen
+Umfang (jede Kopie mit eigenen ZE-Nummern, OPS-Kodes, Texten und
+Handelsnamen, damit Index und Synonymtabelle mitwachsen). Für jede Größe
+werden in einem eigenen Prozess gemessen:
+
+- ``lade_excel``: Excel-Datei parsen (``ze_daten.lade_ze_liste`` ohne Cache)
+- ``lade_excel_datei_kalt`` / ``_warm``: ``lade_excel_datei`` aus ``ZE Logic.py``
+  ohne bzw. mit vorhandenem Snapshot
+- ``preprocess_data``: ``ze_daten.bereite_vor`` (Bereinigen, Aufteilen, Kategorien)
+- ``split_trade_names``: ``ze_daten.teile_auf`` der Handelsnamen
+- ``baue_index``: ``ze_modell.baue_modell`` mit allen Suchindizes
+- ``suche_<modus>``: Suche im Index samt Einträgen, je Modus eine feste Anfragemischung
+- ``suche_daten`` / ``get_medication_info``: Einstiegspunkte aus ``ZE Logic.py``
+  und ``ZE.py`` mit leerem Ergebnis-Cache
+
+Je Stufe stehen Median (p50), 95. Perzentil (p95) und Spitzenspeicher im
+Ergebnis. Der Spitzenspeicher ist der größte Zuwachs eines Aufrufs über den
+Stand unmittelbar davor, also ohne die rund 120 MB für pandas, NumPy und
+openpyxl: unter Linux die höchste RSS während des Aufrufs
+(``/proc/self/clear_refs``) abzüglich der RSS vorher, sonst die Spitze der
+Python-Allokationen (``tracemalloc``, ohne pandas' Arrow-Puffer).
+
+Die Ausgabe ist JSON (``--ausgabe``); mit ``--vergleich`` wird eine frühere
+Ausgabe, z. B. vom vorherigen Commit, Stufe für Stufe gegenübergestellt.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/bench_suite.py --ausgabe bench.json
+    python benchmarks/bench_suite.py --faktoren 1 10 --vergleich bench.json
+"""
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+PROJEKT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJEKT)
+
+import ze_daten  # noqa: E402
+from ze_index import FUZZY, LITERAL, OPS_KODE, PRAEFIX, REGEX, WORT, SuchFehler  # noqa: E402
+from ze_modell import baue_modell  # noqa: E402
+from ze_snapshot import CACHE_VERZEICHNIS  # noqa: E402
+from ze_suche import FUZZYSPALTEN, SUCHSPALTEN  # noqa: E402
+
+FAKTOREN = (1, 10, 100)
+# Spalte und Trennzeichen der Handelsnamen in der ZE-Liste
+NAMEN_SPALTE = 'Handelsnamen'
+NAMEN_TRENNZEICHEN = ','
+# Anfragen je Modus in der Mischung
+ANFRAGEN_JE_MODUS = 40
+# Verschlechterung des Medians, ab der ``--vergleich`` eine Stufe markiert (relativ und absolut)
+SCHWELLE = 0.10
+SCHWELLE_MS = 1.0
+
+
+def lade_skript(datei, name):
+    """
+    Importiert ein Skript mit Leerzeichen im Dateinamen (z. B. 'ZE Logic.py') als Modul.
+    """
+    spec = importlib.util.spec_from_file_location(name, os.path.join(PROJEKT, datei))
+    modul = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modul)
+    return modul
+
+
+def vergroessere(df, faktor, seed=0):
+    """
+    Vervielfacht die ZE-Liste; Kopie i erhält eigene ZE-Nummern, OPS-Kodes, Texte und Handelsnamen.
+    """
+    rng = np.random.default_rng(seed)
+    kopien = [df]
+    for i in range(1, faktor):
+        kopie = df.copy()
+        kennung = f'{i:03d}'
+        kopie['ZE'] = kopie['ZE'].astype(str) + f'-{kennung}'
+        # Gültige, aber neue OPS-Kodes: eigene Kodestelle je Kopie (die ZE-Liste nutzt nur x-00x und x-8xx)
+        stelle = f'{(100 + i) % 1000:03d}'
+        kopie['OPS'] = kopie['OPS'].astype(str).str.replace(r'^(\d)-\d{3}', rf'\g<1>-{stelle}', regex=True)
+        kopie['OPS-Text'] = kopie['OPS-Text'].astype(str) + f' (Variante {kennung})'
+        # Handelsnamen mit Silbe je Kopie, damit Synonyme und Fuzzy-Namen wachsen
+        silbe = ''.join(rng.choice(list('bdfgklmnprstvz'), 2)) + rng.choice(list('aeiou'))
+        kopie[NAMEN_SPALTE] = kopie[NAMEN_SPALTE].astype(str).str.replace(r'([^,]+)', rf'\1{silbe}', regex=True)
+        kopien.append(kopie)
+    return pd.concat(kopien, ignore_index=True)
+
+
+def schreibe_mappe(df, pfad):
+    """
+    Schreibt eine Tabelle zeilenweise (openpyxl write-only) als Excel-Datei.
+    """
+    import openpyxl
+
+    mappe = openpyxl.Workbook(write_only=True)
+    blatt = mappe.create_sheet()
+    blatt.append(list(df.columns))
+    for zeile in df.astype(object).itertuples(index=False):
+        blatt.append([None if isinstance(w, float) and np.isnan(w) else w for w in zeile])
+    mappe.save(pfad)
+
+
+def erzeuge_mappen(quelle, faktoren, verzeichnis):
+    """
+    Legt die vergrößerten Arbeitsmappen an (oder nutzt vorhandene, die neuer als die Quelle sind).
+
+    :return: Dictionary Faktor -> Pfad.
+    """
+    os.makedirs(verzeichnis, exist_ok=True)
+    basis = None
+    pfade = {}
+    for faktor in faktoren:
+        pfad = os.path.join(verzeichnis, f'ZE Liste x{faktor}.xlsx')
+        if not os.path.exists(pfad) or os.path.getmtime(pfad) < os.path.getmtime(quelle):
+            if basis is None:
+                basis = pd.read_excel(quelle, engine='openpyxl')
+            print(f"Erzeuge {pfad} ...", file=sys.stderr, flush=True)
+            schreibe_mappe(vergroessere(basis, faktor), pfad)
+        pfade[faktor] = pfad
+    return pfade
+
+
+def anfragemischung(df, seed=0):
+    """
+    Feste Anfragen je Suchmodus, aus den Daten gezogen (mit einigen Fehlgriffen).
+    """
+    rng = np.random.default_rng(seed)
+    namen = df[NAMEN_SPALTE].dropna().astype(str).str.split(NAMEN_TRENNZEICHEN).explode().str.strip()
+    namen = namen[namen.str.len() >= 5].unique()
+    woerter = df['OPS-Text'].dropna().astype(str).str.findall(r'[A-Za-zÄÖÜäöüß]{6,}').explode().dropna().unique()
+    kodes = df['OPS'].dropna().astype(str).unique()
+    n = ANFRAGEN_JE_MODUS
+
+    def ziehe(werte, anzahl):
+        return [str(w) for w in rng.choice(werte, anzahl)]
+
+    def tippfehler(name):
+        stelle = int(rng.integers(1, len(name) - 1))
+        return name[:stelle] + name[stelle + 1] + name[stelle] + name[stelle + 2:]
+
+    fehlgriffe = ['xylophon', 'qqqzzz', 'mg bis unterx']
+    return {
+        LITERAL: ziehe(namen, n // 2) + ziehe(woerter, n // 2 - 3) + fehlgriffe,
+        PRAEFIX: [w[:4] for w in ziehe(namen, n)],
+        WORT: ziehe(woerter, n),
+        REGEX: [f'{w[:3]}.*{w[-2:]}' for w in ziehe(woerter, n // 2)] + [r'\d+ mg bis unter \d+'] * (n // 2),
+        FUZZY: [tippfehler(w) for w in ziehe(namen, n)],
+        OPS_KODE: ziehe(kodes, n // 2) + [k[:5] for k in ziehe(kodes, n // 4)]
+                  + [k.split('.')[0] + '.*' for k in ziehe(kodes, n // 4)],
+    }
+
+
+def _rss_spitze_zuruecksetzen():
+    # Setzt VmHWM zurück (Linux >= 4.0); False, wenn das nicht geht
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _status_bytes(feld):
+    # Wert aus /proc/self/status in Bytes, z. B. 'VmRSS' (aktuell) oder 'VmHWM' (Spitze)
+    with open('/proc/self/status') as f:
+        for zeile in f:
+            if zeile.startswith(feld + ':'):
+                return int(zeile.split()[1]) * 1024
+    return None
+
+
+def miss(funktion, argumente_liste, mit_rss):
+    """
+    Ruft die Funktion für jede Argumentliste einmal auf.
+
+    :return: Dictionary mit n, p50_ms, p95_ms, max_ms und spitze_mb (größter Zuwachs über den Stand vor
+        einem Aufruf).
+    """
+    zeiten = []
+    spitze = 0
+    for argumente in argumente_liste:
+        if mit_rss:
+            _rss_spitze_zuruecksetzen()
+            vorher = _status_bytes('VmRSS')
+        start = time.perf_counter()
+        funktion(*argumente)
+        zeiten.append(time.perf_counter() - start)
+        if mit_rss:
+            spitze = max(spitze, _status_bytes('VmHWM') - vorher)
+    if not mit_rss:
+        # Eigener Durchlauf, weil tracemalloc die Zeiten verfälschen würde
+        tracemalloc.start()
+        for argumente in argumente_liste[:1]:
+            funktion(*argumente)
+        spitze = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    zeiten_ms = np.array(zeiten) * 1000
+    return {'n': len(zeiten), 'p50_ms': round(float(np.percentile(zeiten_ms, 50)), 4),
+            'p95_ms': round(float(np.percentile(zeiten_ms, 95)), 4), 'max_ms': round(float(zeiten_ms.max()), 4),
+            'spitze_mb': round(spitze / 1024 ** 2, 2)}
+
+
+def miss_groesse(pfad, wiederholungen):
+    """
+    Misst alle Stufen für eine Arbeitsmappe (läuft in einem eigenen Prozess).
+    """
+    mit_rss = _rss_spitze_zuruecksetzen()
+    logic = lade_skript('ZE Logic.py', 'ze_logic')
+    ze = lade_skript('ZE.py', 'ze_cli')
+    cache = os.path.join(os.path.dirname(pfad), CACHE_VERZEICHNIS)
+    stufen = {}
+    laeufe = [()] * wiederholungen
+
+    df = ze_daten.lade_ze_liste(pfad, cache_nutzen=False)
+    stufen['lade_excel'] = miss(lambda: ze_daten.lade_ze_liste(pfad, cache_nutzen=False), laeufe, mit_rss)
+
+    def lade_kalt():
+        shutil.rmtree(cache, ignore_errors=True)
+        logic.lade_excel_datei(pfad)
+
+    stufen['lade_excel_datei_kalt'] = miss(lade_kalt, laeufe, mit_rss)
+    stufen['lade_excel_datei_warm'] = miss(lambda: logic.lade_excel_datei(pfad), laeufe, mit_rss)
+
+    stufen['preprocess_data'] = miss(lambda: ze_daten.bereite_vor(df, NAMEN_SPALTE, NAMEN_TRENNZEICHEN), laeufe,
+                                     mit_rss)
+    codes, werte = ze_daten.bereinige_spalten(df)[NAMEN_SPALTE]
+    stufen['split_trade_names'] = miss(lambda: ze_daten.teile_auf(codes, werte, NAMEN_TRENNZEICHEN), laeufe, mit_rss)
+    stufen['baue_index'] = miss(lambda: baue_modell(df, suchspalten=SUCHSPALTEN, fuzzy_spalten=FUZZYSPALTEN), laeufe,
+                                mit_rss)
+
+    maschine = logic.lade_excel_datei(pfad)
+    modell = maschine.bestand().modell
+    mischung = anfragemischung(df)
+
+    def suche(begriff, modus):
+        try:
+            modell.eintraege(modell.suche(begriff, SUCHSPALTEN, modus))
+        except SuchFehler:
+            pass
+
+    for modus, anfragen in mischung.items():
+        stufen[f'suche_{modus}'] = miss(suche, [(a, modus) for a in anfragen], mit_rss)
+
+    def suche_daten(begriff, modus):
+        maschine.cache.leeren()
+        logic.suche_daten(maschine, begriff, modus)
+
+    def get_medication_info(begriff):
+        maschine.cache.leeren()
+        ze.get_medication_info(maschine, begriff)
+
+    alle = [(a, m) for m, anfragen in mischung.items() if m != OPS_KODE for a in anfragen]
+    # Die Einstiegspunkte melden Fehlgriffe per print
+    with contextlib.redirect_stdout(io.StringIO()):
+        stufen['suche_daten'] = miss(suche_daten, alle, mit_rss)
+        stufen['get_medication_info'] = miss(get_medication_info,
+                                             [(a,) for a in mischung[LITERAL] + mischung[OPS_KODE]], mit_rss)
+
+    return {'zeilen': len(df), 'datei_mb': round(os.path.getsize(pfad) / 1024 ** 2, 2),
+            'speicher': 'rss' if mit_rss else 'tracemalloc', 'stufen': stufen}
+
+
+def git_stand():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJEKT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def vergleiche(alt, neu):
+    """
+    Gibt je Größe und Stufe p50/p95 alt -> neu auf stderr aus und markiert Verschlechterungen über
+    ``SCHWELLE`` bzw. ``SCHWELLE_MS``.
+    """
+    print(f"\nVergleich mit {alt.get('commit')} ({alt.get('zeitpunkt')}):", file=sys.stderr)
+    print(f"{'Faktor':>6}  {'Stufe':<26}{'p50 alt':>11}{'p50 neu':>11}{'p95 alt':>11}{'p95 neu':>11}", file=sys.stderr)
+    for faktor, groesse in neu['groessen'].items():
+        vorher = alt['groessen'].get(faktor)
+        if vorher is None:
+            continue
+        for stufe, werte in groesse['stufen'].items():
+            alte = vorher['stufen'].get(stufe)
+            if alte is None:
+                continue
+            langsamer = werte['p50_ms'] > alte['p50_ms'] * (1 + SCHWELLE) \
+                and werte['p50_ms'] - alte['p50_ms'] > SCHWELLE_MS
+            markierung = '  <-- langsamer' if langsamer else ''
+            print(f"{faktor:>6}  {stufe:<26}{alte['p50_ms']:>11.2f}{werte['p50_ms']:>11.2f}"
+                  f"{alte['p95_ms']:>11.2f}{werte['p95_ms']:>11.2f}{markierung}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pfad', default='ZE Liste.xlsx', help="Vorlage für die synthetischen Arbeitsmappen")
+    parser.add_argument('--faktoren', type=int, nargs='+', default=list(FAKTOREN))
+    parser.add_argument('--wiederholungen', type=int, default=3, help="Durchläufe der Lade- und Vorbereitungsstufen")
+    parser.add_argument('--daten', default=os.path.join(tempfile.gettempdir(), 'ze_bench'),
+                        help="Verzeichnis der synthetischen Arbeitsmappen (werden wiederverwendet)")
+    parser.add_argument('--ausgabe', help="JSON-Datei für die Ergebnisse (Standard: Ausgabe auf stdout)")
+    parser.add_argument('--vergleich', help="Frühere JSON-Ausgabe zum Gegenüberstellen")
+    parser.add_argument('--einzeln', help=argparse.SUPPRESS)  # interner Aufruf für eine Größe
+    args = parser.parse_args()
+
+    if args.einzeln:
+        print(json.dumps(miss_groesse(args.einzeln, args.wiederholungen)))
+        return
+
+    pfade = erzeuge_mappen(os.path.abspath(args.pfad), args.faktoren, args.daten)
+    ergebnis = {'commit': git_stand(), 'zeitpunkt': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(), 'pandas': pd.__version__, 'numpy': np.__version__,
+                'plattform': platform.platform(), 'groessen': {}}
+    for faktor, pfad in pfade.items():
+        print(f"Messe x{faktor} ...", file=sys.stderr, flush=True)
+        # Eigener Prozess je Größe: Speicherspitzen und Caches beeinflussen sich nicht
+        lauf = subprocess.run([sys.executable, os.path.abspath(__file__), '--einzeln', pfad,
+                               '--wiederholungen', str(args.wiederholungen)],
+                              cwd=PROJEKT, capture_output=True, text=True, check=True)
+        ergebnis['groessen'][str(faktor)] = json.loads(lauf.stdout)
+
+    text = json.dumps(ergebnis, indent=2, ensure_ascii=False)
+    if args.ausgabe:
+        with open(args.ausgabe, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.vergleich:
+        with open(args.vergleich, encoding='utf-8') as f:
+            vergleiche(json.load(f), ergebnis)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Vergleicht den Trigramm-Index mit dem bisherigen linearen Durchsuchen.
+
+Die ZE-Liste wird dazu vervielfacht (jede Kopie erhält eine eigene
+Kennung im OPS-Text), um zusammengeführte Listen mehrerer Jahre samt
+Synonymtabellen nachzubilden.
+
+Aufruf (aus dem Projektverzeichnis):
+    python benchmarks/bench_trigram.py --faktor 300
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ze_daten import lade_ze_liste  # noqa: E402
+from ze_index import SuchIndex, normalisiere  # noqa: E402
+
+SUCHSPALTEN = ['OPS-Text', 'Handelsnamen']
+ANFRAGEN = ['eculizumab', 'soliris', 'gemcitabin', 'immunglobulin', 'mg bis unter', 'gerinnungsfaktor',
+            'xylophon', 'ze']
+
+
+def vervielfache(df, faktor):
+    """
+    Erzeugt eine um den Faktor vergrößerte Tabelle mit unterscheidbaren Kopien.
+    """
+    kopien = []
+    for i in range(faktor):
+        kopie = df.copy()
+        kopie['OPS-Text'] = kopie['OPS-Text'].fillna('') + f' [Kopie {i:05d}]'
+        kopien.append(kopie)
+    return pd.concat(kopien, ignore_index=True)
+
+
+def suche_linear(df, suchbegriff):
+    """
+    Die bisherige Suche aus ``suche_daten``.
+    """
+    suchbegriff = suchbegriff.lower()
+    mask = df[SUCHSPALTEN].astype(str).apply(lambda x: x.str.lower().str.contains(suchbegriff, na=False)).any(axis=1)
+    return df[mask]
+
+
+def miss(funktion, wiederholungen):
+    """
+    Führt eine Funktion mehrfach aus und liefert die beste Laufzeit in ms.
+    """
+    beste = float('inf')
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        funktion()
+        beste = min(beste, time.perf_counter() - start)
+    return beste * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pfad', default='ZE Liste.xlsx')
+    parser.add_argument('--faktor', type=int, default=300)
+    parser.add_argument('--wiederholungen', type=int, default=5)
+    args = parser.parse_args()
+
+    df = vervielfache(lade_ze_liste(args.pfad), args.faktor)
+    start = time.perf_counter()
+    index = SuchIndex(df, SUCHSPALTEN)
+    aufbau = time.perf_counter() - start
+    print(f"{len(df)} Zeilen, Indexaufbau {aufbau:.2f} s, Index {index.speicherbedarf() / 1024 ** 2:.1f} MB\n")
+
+    print(f"{'Anfrage':<20}{'Treffer':>10}{'linear [ms]':>14}{'Durchlauf [ms]':>16}{'Trigramm [ms]':>15}")
+    for anfrage in ANFRAGEN:
+        begriff = normalisiere(anfrage)
+        treffer = len(index.suche(anfrage))
+        linear = miss(lambda: suche_linear(df, anfrage), args.wiederholungen)
+        durchlauf = miss(lambda: [s._durchsuche(begriff) for s in index.spalten.values()], args.wiederholungen)
+        trigramm = miss(lambda: index.suche(anfrage), args.wiederholungen)
+        print(f"{anfrage:<20}{treffer:>10}{linear:>14.1f}{durchlauf:>16.2f}{trigramm:>15.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,750 @@
+"""
+Ereignisgesteuertes Ein-Kompartiment-Modell für Bolus- und Infusionsgaben.
+
+Statt in festen Zeitschritten zu rechnen, springt das Modell von Ereignis zu
+Ereignis (Bolus, Beginn und Ende einer Infusion) und nutzt dazwischen die
+geschlossene Lösung der Ein-Kompartiment-Kinetik mit Elimination erster
+Ordnung::
+
+    A(t) = A(τ) · e^(-k·(t-τ)) + R/k · (1 - e^(-k·(t-τ)))
+
+(A: Menge im Körper in mg, R: aktuelle Infusionsrate in mg/h, τ: letztes
+Ereignis). Die Konzentrationen auf einem beliebigen Zeitraster entstehen
+danach in einem einzigen NumPy-Durchgang. Sie sind exakt, unabhängig von der
+Rasterweite, und Gaben müssen nicht auf Rasterpunkten liegen.
+
+Typische Nutzung::
+
+    modell = EinKompartimentModell.aus_clearance(clearance=1.8, vd=49)
+    gaben = [Gabe(0, 1500)] + regelmaessige_gaben(1250, intervall=24, dauer=3, beginn=24, ende=168)
+    konzentration = modell.konzentration(gaben, np.linspace(0, 168, 2000))
+
+Für Dosierentscheidungen rechnet ``simuliere_population`` dasselbe Schema für
+eine gezogene ``Population`` virtueller Patienten als Matrix Patienten ×
+Zeitpunkte (blockweise, optional auf mehrere Prozesse verteilt) und zählt je
+Zeitpunkt, wie viele Patienten im Zielbereich liegen.
+
+Für Arzneistoffe mit ausgeprägter Verteilungsphase beschreibt
+``KompartimentModell`` beliebige lineare Kompartimentmodelle über ihre
+Ratenmatrix (z. B. ``KompartimentModell.zwei_kompartimente``). Die
+Matrixexponentiale werden je Schrittweite einmal berechnet und danach für alle
+Schritte und Patienten wiederverwendet; das Ein-Kompartiment-Modell ist darin
+als 1×1-Matrix enthalten und liefert dieselben Werte.
+"""
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+# Therapeutischer Zielbereich in mg/L
+ZIELBEREICH = (15.0, 20.0)
+
+
+@dataclass(frozen=True)
+class Gabe:
+    """
+    Eine Gabe: Bolus (``dauer`` 0) oder Infusion mit konstanter Rate über ``dauer`` Stunden.
+
+    :param zeit: Beginn in Stunden.
+    :param dosis: Dosis in mg.
+    :param dauer: Infusionsdauer in Stunden; 0 für einen Bolus.
+    """
+    zeit: float
+    dosis: float
+    dauer: float = 0.0
+
+
+def regelmaessige_gaben(dosis, intervall, dauer=0.0, beginn=0.0, ende=None, anzahl=None):
+    """
+    Gaben in festem Abstand, z. B. 1250 mg über 3 h alle 24 h.
+
+    :param dosis: Dosis je Gabe in mg.
+    :param intervall: Abstand zwischen zwei Gaben in Stunden.
+    :param dauer: Infusionsdauer in Stunden (0: Bolus).
+    :param beginn: Zeitpunkt der ersten Gabe in Stunden.
+    :param ende: Letzter möglicher Beginn (ausschließlich) in Stunden.
+    :param anzahl: Anzahl der Gaben; statt oder zusätzlich zu ``ende``.
+    :return: Liste von Gaben.
+    :raises ValueError: Wenn weder ``ende`` noch ``anzahl`` angegeben ist.
+    """
+    if ende is None and anzahl is None:
+        raise ValueError("Entweder 'ende' oder 'anzahl' angeben")
+    if ende is not None:
+        # Ganzzahlig zählen statt Gleitkommazeiten zu vergleichen
+        bis_ende = max(0, math.ceil((ende - beginn) / intervall - 1e-9))
+        anzahl = bis_ende if anzahl is None else min(anzahl, bis_ende)
+    return [Gabe(beginn + i * intervall, dosis, dauer) for i in range(anzahl)]
+
+
+def ereignisplan(gaben):
+    """
+    Zeitpunkte, an denen sich etwas ändert, mit Bolus und Infusionsrate.
+
+    Boli und Infusionsbeginne/-enden zum selben Zeitpunkt werden
+    zusammengefasst; überlappende Infusionen addieren ihre Raten. Der Plan
+    hängt nur vom Dosierschema ab, nicht vom Patienten.
+
+    :param gaben: Iterierbare Gaben.
+    :return: Tupel (zeiten, bolus, raten) als NumPy-Arrays: Ereigniszeit, dort
+        gegebener Bolus (mg) und Infusionsrate (mg/h) ab diesem Zeitpunkt.
+    :raises ValueError: Bei negativer Infusionsdauer.
+    """
+    gaben = list(gaben)
+    beginn = np.array([g.zeit for g in gaben], dtype=np.float64)
+    dosis = np.array([g.dosis for g in gaben], dtype=np.float64)
+    dauer = np.array([g.dauer for g in gaben], dtype=np.float64)
+    if np.any(dauer < 0):
+        raise ValueError("Infusionsdauer darf nicht negativ sein")
+    infusion = dauer > 0
+    rate = np.divide(dosis, dauer, out=np.zeros_like(dosis), where=infusion)
+
+    # Ereignisse: jeder Beginn (Bolus oder Ratenanstieg), jedes Infusionsende (Ratenabfall)
+    zeiten = np.concatenate([beginn, beginn[infusion] + dauer[infusion]])
+    boli = np.concatenate([np.where(infusion, 0.0, dosis), np.zeros(infusion.sum())])
+    aenderungen = np.concatenate([rate, -rate[infusion]])
+    zeiten, position = np.unique(zeiten, return_inverse=True)
+    bolus = np.zeros(len(zeiten))
+    np.add.at(bolus, position, boli)
+    raten = np.zeros(len(zeiten))
+    np.add.at(raten, position, aenderungen)
+    raten = np.cumsum(raten)
+    # Rundungsreste nach dem Ende aller Infusionen entfernen
+    raten[np.abs(raten) <= 1e-12 * max(rate.max(initial=0.0), 1.0)] = 0.0
+    return zeiten, bolus, raten
+
+
+class EinKompartimentModell:
+    """
+    Ein-Kompartiment-Modell mit Elimination erster Ordnung.
+
+    :param kel: Eliminationskonstante in 1/h.
+    :param vd: Verteilungsvolumen in L.
+    """
+
+    def __init__(self, kel, vd):
+        if kel <= 0 or vd <= 0:
+            raise ValueError("Eliminationskonstante und Verteilungsvolumen müssen positiv sein")
+        self.kel = float(kel)
+        self.vd = float(vd)
+
+    @classmethod
+    def aus_clearance(cls, clearance, vd):
+        """
+        Modell aus Clearance (L/h) und Verteilungsvolumen (L).
+        """
+        return cls(clearance / vd, vd)
+
+    @property
+    def clearance(self):
+        return self.kel * self.vd
+
+    @property
+    def halbwertszeit(self):
+        return math.log(2) / self.kel
+
+    def ereignisse(self, gaben):
+        """
+        Zustand des Modells unmittelbar nach jedem Ereignis (siehe ``ereignisplan``).
+
+        :param gaben: Iterierbare Gaben.
+        :return: Tupel (zeiten, mengen, raten) als NumPy-Arrays: Ereigniszeit,
+            Menge im Körper (mg) und Infusionsrate (mg/h) direkt danach.
+        """
+        zeiten, bolus, raten = ereignisplan(gaben)
+
+        # Mengen von Ereignis zu Ereignis: eine geschlossene Formel je Abschnitt
+        faktoren = np.exp(-self.kel * np.diff(zeiten)).tolist()
+        zufluss = (raten[:-1] / self.kel).tolist()
+        mengen = bolus.tolist()
+        for i in range(1, len(mengen)):
+            mengen[i] += mengen[i - 1] * faktoren[i - 1] + zufluss[i - 1] * (1.0 - faktoren[i - 1])
+        return zeiten, np.array(mengen), raten
+
+    def menge(self, gaben, zeiten):
+        """
+        Menge im Körper (mg) zu beliebigen Zeitpunkten.
+
+        Zum Zeitpunkt einer Gabe ist der Bolus bereits enthalten. Vor der ersten Gabe ist die Menge 0.
+
+        :param gaben: Iterierbare Gaben.
+        :param zeiten: Zeitpunkte in Stunden (beliebige Form, muss nicht sortiert sein).
+        :return: NumPy-Array in der Form von ``zeiten``.
+        """
+        zeiten = np.asarray(zeiten, dtype=np.float64)
+        ereignis_zeiten, mengen, raten = self.ereignisse(gaben)
+        ergebnis = np.zeros(zeiten.shape)
+        if not len(ereignis_zeiten):
+            return ergebnis
+        letzte = np.searchsorted(ereignis_zeiten, zeiten, side='right') - 1
+        nach_beginn = letzte >= 0
+        j = letzte[nach_beginn]
+        abfall = np.exp(-self.kel * (zeiten[nach_beginn] - ereignis_zeiten[j]))
+        ergebnis[nach_beginn] = mengen[j] * abfall + raten[j] / self.kel * (1.0 - abfall)
+        return ergebnis
+
+    def konzentration(self, gaben, zeiten):
+        """
+        Plasmakonzentration (mg/L) zu beliebigen Zeitpunkten (siehe ``menge``).
+        """
+        return self.menge(gaben, zeiten) / self.vd
+
+    def steady_state(self, dosis, intervall, dauer=0.0):
+        """
+        Talspiegel, Spitzenspiegel und AUC24 im Steady State, geschlossen berechnet.
+
+        Alle Argumente dürfen NumPy-Arrays sein und werden gegeneinander
+        gebroadcastet, z. B. Dosen × Intervalle × Infusionsdauern. Die Spitze
+        liegt am Ende der Infusion, der Talspiegel unmittelbar vor der nächsten
+        Gabe::
+
+            C_max = D/V · (1 - e^(-k·T))/(k·T) / (1 - e^(-k·τ))
+            C_min = C_max · e^(-k·(τ-T))
+            AUC24 = D · 24/τ / CL
+
+        :param dosis: Dosis je Gabe in mg.
+        :param intervall: Dosierungsintervall τ in Stunden.
+        :param dauer: Infusionsdauer T in Stunden (0: Bolus); sollte nicht länger als τ sein.
+        :return: Tupel (talspiegel, spitzenspiegel, auc24) in mg/L bzw. mg·h/L.
+        """
+        dosis, intervall, dauer = (np.asarray(x, dtype=np.float64) for x in (dosis, intervall, dauer))
+        k = self.kel
+        kt = k * dauer
+        # (1 - e^(-kT))/(kT), für den Bolus (T = 0) der Grenzwert 1
+        infusionsanteil = np.divide(-np.expm1(-kt), kt, out=np.ones(np.broadcast(kt).shape), where=kt > 0)
+        spitze = dosis / self.vd * infusionsanteil / -np.expm1(-k * intervall)
+        tal = spitze * np.exp(-k * (intervall - dauer))
+        auc24 = dosis * (24.0 / intervall) / self.clearance
+        return tal, spitze, auc24
+
+
+# Populationssimulation: typische Werte und Variabilität (Variationskoeffizient, log-normal)
+GEWICHT_MEDIAN = 75.0  # kg
+GEWICHT_CV = 0.2
+CRCL_MEDIAN = 60.0  # Kreatinin-Clearance in mL/min
+CRCL_CV = 0.5
+VD_PRO_KG = 0.7  # L/kg
+VD_CV = 0.2
+CL_PRO_CRCL = 60 / 1000  # Vancomycin-Clearance in L/h je mL/min Kreatinin-Clearance (wie Kinetik.py)
+CL_CV = 0.25
+# Höchstzahl Patienten × Zeitpunkte je Block; begrenzt den Speicher (8 Byte je Wert und Zwischenergebnis)
+BLOCK_ELEMENTE = 2_000_000
+
+
+def _lognormal(rng, median, cv, anzahl):
+    sigma = math.sqrt(math.log1p(cv ** 2))
+    return median * np.exp(sigma * rng.standard_normal(anzahl))
+
+
+@dataclass(frozen=True, eq=False)
+class Population:
+    """
+    Virtuelle Patienten: je Patient Gewicht, Kreatinin-Clearance, Vancomycin-Clearance und Verteilungsvolumen.
+
+    Alle Felder sind NumPy-Arrays gleicher Länge.
+    """
+    gewicht: np.ndarray  # kg
+    crcl: np.ndarray  # mL/min
+    clearance: np.ndarray  # L/h
+    vd: np.ndarray  # L
+
+    @classmethod
+    def ziehe(cls, anzahl, seed=None, gewicht=GEWICHT_MEDIAN, crcl=CRCL_MEDIAN):
+        """
+        Zieht eine log-normal verteilte Population um die angegebenen Mediane.
+
+        Das Verteilungsvolumen skaliert mit dem Gewicht, die Clearance mit der
+        Kreatinin-Clearance; beide streuen zusätzlich von Patient zu Patient.
+
+        :param anzahl: Anzahl der Patienten.
+        :param seed: Startwert des Zufallsgenerators (für reproduzierbare Läufe).
+        :param gewicht: Median des Gewichts in kg.
+        :param crcl: Median der Kreatinin-Clearance in mL/min.
+        """
+        rng = np.random.default_rng(seed)
+        gewichte = _lognormal(rng, gewicht, GEWICHT_CV, anzahl)
+        crcls = _lognormal(rng, crcl, CRCL_CV, anzahl)
+        vd = VD_PRO_KG * gewichte * _lognormal(rng, 1.0, VD_CV, anzahl)
+        clearance = CL_PRO_CRCL * crcls * _lognormal(rng, 1.0, CL_CV, anzahl)
+        return cls(gewichte, crcls, clearance, vd)
+
+    @property
+    def kel(self):
+        return self.clearance / self.vd
+
+    def __len__(self):
+        return len(self.vd)
+
+
+@dataclass(frozen=True, eq=False)
+class PopulationsErgebnis:
+    """
+    Anzahl der Patienten unter, in und über dem Zielbereich zu jedem Zeitpunkt.
+    """
+    zeiten: np.ndarray
+    patienten: int
+    darunter: np.ndarray
+    im_bereich: np.ndarray
+    darueber: np.ndarray
+
+    @property
+    def anteil_im_bereich(self):
+        return self.im_bereich / self.patienten
+
+    @property
+    def anteil_darunter(self):
+        return self.darunter / self.patienten
+
+    @property
+    def anteil_darueber(self):
+        return self.darueber / self.patienten
+
+
+def konzentrationen(kel, vd, plan, zeiten):
+    """
+    Konzentrationsmatrix (Patienten × Zeitpunkte) für ein gemeinsames Dosierschema.
+
+    Der Ereignisplan ist für alle Patienten gleich; die Mengen an den
+    Ereignissen entstehen für alle Patienten zugleich, die Zeitpunkte werden
+    in einem Durchgang ausgewertet.
+
+    :param kel: Eliminationskonstanten (1/h), ein Wert je Patient.
+    :param vd: Verteilungsvolumina (L), ein Wert je Patient.
+    :param plan: Ergebnis von ``ereignisplan``.
+    :param zeiten: Zeitpunkte in Stunden (eindimensional).
+    :return: NumPy-Array der Form (Patienten, Zeitpunkte) in mg/L.
+    """
+    kel = np.asarray(kel, dtype=np.float64)[:, None]
+    vd = np.asarray(vd, dtype=np.float64)[:, None]
+    zeiten = np.asarray(zeiten, dtype=np.float64)
+    ereignis_zeiten, bolus, raten = plan
+    ergebnis = np.zeros((len(kel), len(zeiten)))
+    if not len(ereignis_zeiten):
+        return ergebnis
+
+    faktoren = np.exp(-kel * np.diff(ereignis_zeiten))
+    zufluss = raten / kel
+    mengen = np.empty((len(kel), len(ereignis_zeiten)))
+    mengen[:, 0] = bolus[0]
+    for i in range(1, len(ereignis_zeiten)):
+        mengen[:, i] = (mengen[:, i - 1] * faktoren[:, i - 1] + zufluss[:, i - 1] * (1.0 - faktoren[:, i - 1])
+                        + bolus[i])
+
+    letzte = np.searchsorted(ereignis_zeiten, zeiten, side='right') - 1
+    nach_beginn = letzte >= 0
+    j = letzte[nach_beginn]
+    abfall = np.exp(-kel * (zeiten[nach_beginn] - ereignis_zeiten[j]))
+    ergebnis[:, nach_beginn] = (mengen[:, j] * abfall + zufluss[:, j] * (1.0 - abfall)) / vd
+    return ergebnis
+
+
+def _zaehle_block(kel, vd, plan, zeiten, untergrenze, obergrenze):
+    # Ein Block Patienten; läuft auch in den Prozessen des Pools
+    matrix = konzentrationen(kel, vd, plan, zeiten)
+    darunter = np.count_nonzero(matrix < untergrenze, axis=0)
+    darueber = np.count_nonzero(matrix > obergrenze, axis=0)
+    return darunter, len(kel) - darunter - darueber, darueber
+
+
+def simuliere_population(population, gaben, zeiten, zielbereich=ZIELBEREICH, prozesse=None,
+                         block_elemente=BLOCK_ELEMENTE):
+    """
+    Simuliert dasselbe Dosierschema für alle Patienten und zählt sie je Zeitpunkt gegen den Zielbereich.
+
+    Die Patienten werden in Blöcken gerechnet, sodass höchstens
+    ``block_elemente`` Konzentrationen gleichzeitig im Speicher liegen; die
+    Blöcke können auf mehrere Prozesse verteilt werden.
+
+    :param population: Population.
+    :param gaben: Iterierbare Gaben (für alle Patienten gleich).
+    :param zeiten: Zeitpunkte in Stunden.
+    :param zielbereich: Tupel (untere, obere Grenze) in mg/L, Grenzen eingeschlossen.
+    :param prozesse: Anzahl Prozesse (None oder 1: im aufrufenden Prozess).
+    :param block_elemente: Höchstzahl Patienten × Zeitpunkte je Block.
+    :return: PopulationsErgebnis.
+    """
+    zeiten = np.asarray(zeiten, dtype=np.float64)
+    plan = ereignisplan(gaben)
+    untergrenze, obergrenze = zielbereich
+    blockgroesse = max(1, block_elemente // max(len(zeiten), len(plan[0]), 1))
+    kel, vd = population.kel, population.vd
+    bloecke = [(kel[start:start + blockgroesse], vd[start:start + blockgroesse], plan, zeiten, untergrenze,
+                obergrenze) for start in range(0, len(population), blockgroesse)]
+
+    if prozesse is not None and prozesse > 1 and len(bloecke) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(prozesse) as pool:
+            teile = list(pool.map(_zaehle_block, *zip(*bloecke)))
+    else:
+        teile = [_zaehle_block(*block) for block in bloecke]
+
+    if not teile:
+        leer = np.zeros(len(zeiten), dtype=np.int64)
+        return PopulationsErgebnis(zeiten, 0, leer, leer, leer)
+    darunter, im_bereich, darueber = (np.sum(spalte, axis=0) for spalte in zip(*teile))
+    return PopulationsErgebnis(zeiten, len(population), darunter, im_bereich, darueber)
+
+
+# Dosisoptimierung: durchsuchte Dosen (mg), Intervalle (h) und Infusionsdauern (h)
+DOSEN = np.arange(250.0, 3000.0 + 1, 250.0)
+INTERVALLE = np.array([6.0, 8.0, 12.0, 18.0, 24.0, 36.0, 48.0])
+DAUERN = np.array([1.0, 1.5, 2.0, 3.0, 4.0])
+# AUC24-Zielbereich in mg·h/L (None: ohne AUC-Vorgabe)
+AUC_ZIEL = (400.0, 600.0)
+# Ladedosen werden auf diese Schrittweite (mg) gerundet, ihre Infusionsdauer auf diese (h) aufgerundet
+LADEDOSIS_SCHRITT = 250.0
+LADEDAUER_SCHRITT = 0.5
+# Höchste Infusionsrate in mg/h (Vancomycin: üblicherweise höchstens etwa 1 g/h)
+MAX_RATE = 1000.0
+
+
+@dataclass(frozen=True)
+class Dosierung:
+    """
+    Ein Dosierschema mit seinen Steady-State-Werten.
+    """
+    dosis: float  # mg je Gabe
+    intervall: float  # h
+    dauer: float  # Infusionsdauer in h
+    talspiegel: float  # mg/L
+    spitzenspiegel: float  # mg/L
+    auc24: float  # mg·h/L
+    ladedosis: float  # mg, erreicht den Steady-State-Spitzenspiegel schon mit der ersten Gabe
+    ladedauer: float  # Infusionsdauer der Ladedosis in h
+    abweichung: float  # 0, wenn Talspiegel und AUC24 im Zielbereich liegen
+
+    def gaben(self, ende, beginn=0.0):
+        """
+        Die Gaben dieses Schemas bis ``ende`` (erste Gabe als Ladedosis über ``ladedauer``).
+        """
+        gaben = regelmaessige_gaben(self.dosis, self.intervall, self.dauer, beginn=beginn, ende=ende)
+        if gaben:
+            gaben[0] = Gabe(beginn, self.ladedosis, self.ladedauer)
+        return gaben
+
+
+def _ausserhalb(werte, bereich):
+    # Relativer Abstand zum Bereich (0 innerhalb), in Bereichsbreiten
+    untergrenze, obergrenze = bereich
+    return np.maximum(np.maximum(untergrenze - werte, werte - obergrenze), 0.0) / (obergrenze - untergrenze)
+
+
+def optimiere_dosierung(modell, zielbereich=ZIELBEREICH, auc_ziel=AUC_ZIEL, dosen=DOSEN, intervalle=INTERVALLE,
+                        dauern=DAUERN, anzahl=10, max_rate=MAX_RATE):
+    """
+    Sucht die besten Dosierschemata für einen Patienten über das ganze Raster Dosis × Intervall × Infusionsdauer.
+
+    Jedes Schema wird mit den geschlossenen Steady-State-Formeln bewertet
+    (``EinKompartimentModell.steady_state``), alle zugleich als NumPy-Arrays;
+    simuliert wird nichts. Rangfolge: zuerst die Abweichung von Talspiegel-
+    und AUC24-Zielbereich (0 = beide erfüllt), dann der Abstand des
+    Talspiegels zur Mitte des Zielbereichs, dann die niedrigere Tagesdosis.
+
+    Die Ladedosis läuft höchstens mit ``max_rate`` ein (mit ``max_rate=None``
+    höchstens so schnell wie die Erhaltungsdosis); ihre Infusionsdauer wird
+    dafür verlängert (``Dosierung.ladedauer``).
+
+    :param modell: EinKompartimentModell des Patienten.
+    :param zielbereich: Tupel (untere, obere Grenze) für den Talspiegel in mg/L.
+    :param auc_ziel: Tupel (untere, obere Grenze) für die AUC24 in mg·h/L oder None.
+    :param dosen: Dosen je Gabe in mg.
+    :param intervalle: Dosierungsintervalle in Stunden.
+    :param dauern: Infusionsdauern in Stunden (länger als das Intervall wird übergangen).
+    :param anzahl: Anzahl der zurückgegebenen Schemata.
+    :param max_rate: Höchste Infusionsrate in mg/h (Erhaltungs- und Ladedosis) oder None.
+    :return: Liste von Dosierung, bestes Schema zuerst.
+    """
+    dosis, intervall, dauer = np.meshgrid(np.asarray(dosen, dtype=np.float64),
+                                          np.asarray(intervalle, dtype=np.float64),
+                                          np.asarray(dauern, dtype=np.float64), indexing='ij')
+    zulaessig = dauer <= intervall
+    if max_rate is not None:
+        zulaessig &= dosis <= max_rate * np.maximum(dauer, 0.0)
+    dosis, intervall, dauer = dosis[zulaessig], intervall[zulaessig], dauer[zulaessig]
+
+    tal, spitze, auc24 = modell.steady_state(dosis, intervall, dauer)
+    abweichung = _ausserhalb(tal, zielbereich)
+    if auc_ziel is not None:
+        abweichung = abweichung + _ausserhalb(auc24, auc_ziel)
+    mitte = np.abs(tal - sum(zielbereich) / 2)
+    tagesdosis = dosis * 24.0 / intervall
+    reihenfolge = np.lexsort((tagesdosis, mitte, np.round(abweichung, 9)))[:anzahl]
+
+    # Ladedosis: Akkumulationsfaktor 1/(1 - e^(-kτ)), gerundet
+    ladedosis = dosis / -np.expm1(-modell.kel * intervall)
+    ladedosis = np.maximum(np.round(ladedosis / LADEDOSIS_SCHRITT) * LADEDOSIS_SCHRITT, dosis)
+    # Dauer der Ladedosis, damit ihre Rate die Grenze nicht überschreitet (Bolus bleibt ohne Grenze ein Bolus)
+    ladedauer = ladedosis / max_rate if max_rate is not None else dauer * ladedosis / dosis
+    ladedauer = np.maximum(np.ceil(ladedauer / LADEDAUER_SCHRITT - 1e-9) * LADEDAUER_SCHRITT, dauer)
+    return [Dosierung(float(dosis[i]), float(intervall[i]), float(dauer[i]), float(tal[i]), float(spitze[i]),
+                      float(auc24[i]), float(ladedosis[i]), float(ladedauer[i]), float(abweichung[i]))
+            for i in reihenfolge]
+
+
+# Bayes-TDM: Fehlermodell der Spiegelmessung (additiv in mg/L und proportional)
+MESSFEHLER_ADDITIV = 1.0
+MESSFEHLER_PROPORTIONAL = 0.15
+# Punkte je Achse des Parametergitters und Breite in Standardabweichungen der Prior-Verteilung
+GITTER_PUNKTE = 121
+GITTER_BREITE = 4.0
+
+
+@dataclass(frozen=True)
+class Messung:
+    """
+    Ein gemessener Plasmaspiegel.
+
+    :param zeit: Zeitpunkt der Blutentnahme in Stunden (gleiche Zeitachse wie die Gaben).
+    :param konzentration: Gemessene Konzentration in mg/L.
+    """
+    zeit: float
+    konzentration: float
+
+
+@dataclass(frozen=True, eq=False)
+class TdmErgebnis:
+    """
+    Posterior über dem Parametergitter und die daraus geschätzten individuellen Parameter.
+    """
+    clearance: np.ndarray  # Gitterwerte L/h (flach)
+    vd: np.ndarray  # Gitterwerte L (flach)
+    gewichte: np.ndarray  # Posterior-Wahrscheinlichkeit je Gitterpunkt, Summe 1
+    map_index: int
+
+    @property
+    def modell(self):
+        """
+        EinKompartimentModell mit den MAP-Schätzern (wahrscheinlichster Gitterpunkt).
+        """
+        return EinKompartimentModell.aus_clearance(self.clearance[self.map_index], self.vd[self.map_index])
+
+    def mittelwert(self, groesse):
+        """
+        Posterior-Mittelwert von 'clearance', 'vd' oder 'kel'.
+        """
+        return float(np.dot(self.gewichte, self._werte(groesse)))
+
+    def quantile(self, groesse, anteile=(0.05, 0.5, 0.95)):
+        """
+        Posterior-Quantile von 'clearance', 'vd' oder 'kel' (z. B. 90-%-Intervall und Median).
+        """
+        werte = self._werte(groesse)
+        reihenfolge = np.argsort(werte)
+        kumuliert = np.cumsum(self.gewichte[reihenfolge])
+        stellen = np.minimum(np.searchsorted(kumuliert, anteile), len(werte) - 1)
+        return werte[reihenfolge][stellen]
+
+    def _werte(self, groesse):
+        if groesse == 'kel':
+            return self.clearance / self.vd
+        return getattr(self, groesse)
+
+
+class TdmGitter:
+    """
+    Vorberechnetes Gitter über Clearance × Verteilungsvolumen mit log-normaler Prior-Verteilung.
+
+    Gitter und Prior hängen nur vom Patienten ab und werden einmal angelegt.
+    ``anpasse`` bewertet danach die Messungen für alle Gitterpunkte zugleich
+    mit der geschlossenen Lösung (``konzentrationen``); eine neue Messung
+    kostet nur einen weiteren Durchgang über das Gitter.
+
+    :param clearance: Typische Clearance des Patienten in L/h (Median der Prior-Verteilung).
+    :param vd: Typisches Verteilungsvolumen in L (Median der Prior-Verteilung).
+    :param cv_clearance: Variationskoeffizient der Clearance.
+    :param cv_vd: Variationskoeffizient des Verteilungsvolumens.
+    :param punkte: Punkte je Achse.
+    :param breite: Halbe Gitterbreite in Standardabweichungen (log-Skala).
+    """
+
+    def __init__(self, clearance, vd, cv_clearance=CL_CV, cv_vd=VD_CV, punkte=GITTER_PUNKTE, breite=GITTER_BREITE):
+        sigma_cl = math.sqrt(math.log1p(cv_clearance ** 2))
+        sigma_vd = math.sqrt(math.log1p(cv_vd ** 2))
+        z = np.linspace(-breite, breite, punkte)
+        z_cl, z_vd = (a.ravel() for a in np.meshgrid(z, z, indexing='ij'))
+        self.clearance = clearance * np.exp(sigma_cl * z_cl)
+        self.vd = vd * np.exp(sigma_vd * z_vd)
+        self.kel = self.clearance / self.vd
+        # Log-Prior bis auf eine Konstante; gleichmäßiges Gitter auf der log-Skala
+        self.log_prior = -0.5 * (z_cl ** 2 + z_vd ** 2)
+
+    def __len__(self):
+        return len(self.vd)
+
+    def anpasse(self, gaben, messungen, fehler_additiv=MESSFEHLER_ADDITIV,
+                fehler_proportional=MESSFEHLER_PROPORTIONAL):
+        """
+        Posterior für Clearance und Vd aus gemessenen Spiegeln.
+
+        :param gaben: Tatsächlich verabreichte Gaben.
+        :param messungen: Iterierbare Messungen (ohne Messungen: die Prior-Verteilung).
+        :param fehler_additiv: Additiver Messfehler (Standardabweichung) in mg/L.
+        :param fehler_proportional: Proportionaler Messfehler als Anteil.
+        :return: TdmErgebnis.
+        """
+        messungen = list(messungen)
+        log_posterior = self.log_prior.copy()
+        if messungen:
+            zeiten = np.array([m.zeit for m in messungen], dtype=np.float64)
+            gemessen = np.array([m.konzentration for m in messungen], dtype=np.float64)
+            vorhersage = konzentrationen(self.kel, self.vd, ereignisplan(gaben), zeiten)
+            varianz = fehler_additiv ** 2 + (fehler_proportional * vorhersage) ** 2
+            log_posterior -= 0.5 * np.sum((gemessen - vorhersage) ** 2 / varianz + np.log(varianz), axis=1)
+        gewichte = np.exp(log_posterior - log_posterior.max())
+        gewichte /= gewichte.sum()
+        return TdmErgebnis(self.clearance, self.vd, gewichte, int(np.argmax(log_posterior)))
+
+
+# Mehrkompartiment-Modelle: Padé-Approximation [6/6] der Matrixexponentialfunktion.
+# Matrizen werden vorher durch 2^s geteilt, bis ihre 1-Norm höchstens PADE_NORM beträgt
+# (für [6/6] reicht 0,78 für doppelte Genauigkeit); danach wird s-mal quadriert.
+PADE_KOEFFIZIENTEN = tuple(math.factorial(12 - k) * math.factorial(6)
+                           / (math.factorial(12) * math.factorial(k) * math.factorial(6 - k)) for k in range(7))
+PADE_NORM = 0.5
+# Zeitschritte werden für den Propagator-Cache auf diese Stellen (Stunden) gerundet
+SCHRITT_STELLEN = 9
+
+
+def expm(matrizen):
+    """
+    Matrixexponentialfunktion per Skalieren und Quadrieren mit Padé-Approximation [6/6].
+
+    :param matrizen: Quadratische Matrix oder Stapel von Matrizen (..., n, n).
+    :return: e^M in derselben Form.
+    """
+    a = np.asarray(matrizen, dtype=np.float64)
+    norm = np.abs(a).sum(axis=-2).max(initial=0.0)
+    quadrierungen = max(0, math.ceil(math.log2(norm / PADE_NORM))) if norm > 0 else 0
+    a = a / 2.0 ** quadrierungen
+    c = PADE_KOEFFIZIENTEN
+    einheit = np.broadcast_to(np.eye(a.shape[-1]), a.shape)
+    a2 = a @ a
+    a4 = a2 @ a2
+    a6 = a4 @ a2
+    ungerade = a @ (c[1] * einheit + c[3] * a2 + c[5] * a4)
+    gerade = c[0] * einheit + c[2] * a2 + c[4] * a4 + c[6] * a6
+    ergebnis = np.linalg.solve(gerade - ungerade, gerade + ungerade)
+    for _ in range(quadrierungen):
+        ergebnis = ergebnis @ ergebnis
+    return ergebnis
+
+
+class KompartimentModell:
+    """
+    Lineares Kompartimentmodell dA/dt = K·A + e_zentral·R(t), auch für viele Patienten zugleich.
+
+    Jedes Modell ist eine Ratenmatrix K (1/h) über die Mengen der
+    Kompartimente; gegeben und gemessen wird im zentralen Kompartiment. Der
+    Propagator e^(K·Δt) und das Integral der Infusion über den Schritt
+    entstehen zusammen aus einer erweiterten Matrix::
+
+        expm([[K, e_zentral], [0, 0]]·Δt) = [[e^(K·Δt), ∫₀^Δt e^(K·s)·e_zentral ds], [0, 1]]
+
+    und werden je Schrittweite einmal berechnet und zwischengespeichert. Ein
+    Schritt ist danach ein kleines Matrix-Vektor-Produkt, für alle Patienten
+    des Stapels zugleich.
+
+    :param matrix: Ratenmatrix (n, n) oder Stapel je Patient (Patienten, n, n).
+    :param volumen: Volumen des zentralen Kompartiments in L (Skalar oder je Patient).
+    :param zentral: Index des zentralen Kompartiments.
+    """
+
+    def __init__(self, matrix, volumen, zentral=0):
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.ndim not in (2, 3) or matrix.shape[-1] != matrix.shape[-2]:
+            raise ValueError(f"Ratenmatrix muss die Form (n, n) oder (Patienten, n, n) haben, nicht {matrix.shape}")
+        self.stapel = matrix.ndim == 3
+        self.matrix = matrix if self.stapel else matrix[None]
+        self.volumen = np.broadcast_to(np.asarray(volumen, dtype=np.float64), self.matrix.shape[:1]).copy()
+        if np.any(self.volumen <= 0):
+            raise ValueError("Das zentrale Volumen muss positiv sein")
+        self.zentral = zentral
+        self._propagatoren = {}
+
+    @classmethod
+    def ein_kompartiment(cls, kel, vd):
+        """
+        Ein-Kompartiment-Modell; ``kel`` und ``vd`` als Skalar oder je Patient.
+        """
+        kel = np.asarray(kel, dtype=np.float64)
+        return cls(-kel[..., None, None], vd)
+
+    @classmethod
+    def zwei_kompartimente(cls, clearance, v1, q, v2):
+        """
+        Zwei-Kompartiment-Modell aus Clearance, zentralem Volumen, interkompartimenteller Clearance und peripherem Volumen.
+
+        Alle Werte in L/h bzw. L, als Skalar oder je Patient.
+        """
+        clearance, v1, q, v2 = np.broadcast_arrays(*(np.asarray(x, dtype=np.float64) for x in (clearance, v1, q, v2)))
+        matrix = np.empty(clearance.shape + (2, 2))
+        matrix[..., 0, 0] = -(clearance + q) / v1
+        matrix[..., 0, 1] = q / v2
+        matrix[..., 1, 0] = q / v1
+        matrix[..., 1, 1] = -q / v2
+        return cls(matrix, v1)
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def propagator(self, schritt):
+        """
+        Propagator und Infusionsintegral für eine Schrittweite (zwischengespeichert).
+
+        :param schritt: Schrittweite in Stunden.
+        :return: Tupel (phi, gamma): e^(K·Δt) als (Patienten, n, n) und das Integral
+            für eine Rate von 1 mg/h ins zentrale Kompartiment als (Patienten, n).
+        """
+        schritt = round(float(schritt), SCHRITT_STELLEN)
+        gespeichert = self._propagatoren.get(schritt)
+        if gespeichert is None:
+            anzahl, n, _ = self.matrix.shape
+            erweitert = np.zeros((anzahl, n + 1, n + 1))
+            erweitert[:, :n, :n] = self.matrix
+            erweitert[:, self.zentral, n] = 1.0
+            exponential = expm(erweitert * schritt)
+            gespeichert = self._propagatoren[schritt] = (exponential[:, :n, :n], exponential[:, :n, n])
+        return gespeichert
+
+    def menge(self, gaben, zeiten):
+        """
+        Mengen in allen Kompartimenten zu beliebigen Zeitpunkten.
+
+        Gerechnet wird Schritt für Schritt über die gemeinsame Zeitleiste aus
+        Ereignissen und angefragten Zeitpunkten; zum Zeitpunkt einer Gabe ist der
+        Bolus bereits enthalten.
+
+        :param gaben: Iterierbare Gaben (für alle Patienten gleich).
+        :param zeiten: Zeitpunkte in Stunden (eindimensional).
+        :return: NumPy-Array (Patienten, Zeitpunkte, Kompartimente), ohne Stapel (Zeitpunkte, Kompartimente).
+        """
+        zeiten = np.asarray(zeiten, dtype=np.float64)
+        ereignis_zeiten, bolus, raten = ereignisplan(gaben)
+        leiste = np.union1d(ereignis_zeiten, zeiten)
+        bolus_leiste = np.zeros(len(leiste))
+        bolus_leiste[np.searchsorted(leiste, ereignis_zeiten)] = bolus
+        # Rate ab jedem Punkt der Zeitleiste bis zum nächsten
+        letzte = np.searchsorted(ereignis_zeiten, leiste, side='right') - 1
+        rate_leiste = np.where(letzte >= 0, raten[np.maximum(letzte, 0)], 0.0)
+
+        anzahl, n, _ = self.matrix.shape
+        zustand = np.zeros((anzahl, n))
+        verlauf = np.empty((anzahl, len(leiste), n))
+        schritte = np.diff(leiste).tolist()
+        for i in range(len(leiste)):
+            if i:
+                phi, gamma = self.propagator(schritte[i - 1])
+                zustand = (phi @ zustand[:, :, None])[:, :, 0] + gamma * rate_leiste[i - 1]
+            zustand[:, self.zentral] += bolus_leiste[i]
+            verlauf[:, i] = zustand
+        ergebnis = verlauf[:, np.searchsorted(leiste, zeiten)]
+        return ergebnis if self.stapel else ergebnis[0]
+
+    def konzentration(self, gaben, zeiten):
+        """
+        Konzentration im zentralen Kompartiment (mg/L) zu beliebigen Zeitpunkten (siehe ``menge``).
+
+        :return: NumPy-Array (Patienten, Zeitpunkte), ohne Stapel (Zeitpunkte,).
+        """
+        mengen = self.menge(gaben, zeiten)[..., self.zentral]
+        return mengen / (self.volumen[:, None] if self.stapel else self.volumen[0])
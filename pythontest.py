@@ -1,6 +1,8 @@
 import numpy as np
 import matplotlib.pyplot as plt
 
+from pk_modell import EinKompartimentModell, Gabe, regelmaessige_gaben
+
 # Gegebene Werte
 body_weight = 70  # kg
 Vd = 0.7 * body_weight  # Verteilungsvolumen in L
@@ -13,23 +15,16 @@ t_inf = 20  # Infusionsdauer in Stunden
 t_dosage_interval = 24  # Dosierungsintervall in Stunden
 treatment_duration = 7 * 24  # Behandlungsdauer in Stunden
 
-# Zeitpunkte und initiale Konzentration
-time_points = np.arange(0, treatment_duration + t_dosage_interval, 0.5)  # in Stunden
-plasma_concentration = np.zeros_like(time_points, dtype=float)
-
-# Lade-Dosis initiale Konzentration
-plasma_concentration[0] = dose_loading / Vd  # Initialkonzentration nach Lade-Dosis
+modell = EinKompartimentModell(kel, Vd)
 
-# Pharmakokinetische Simulation für 10 Tage
-for i, t in enumerate(time_points[1:], 1):
-    previous_concentration = plasma_concentration[i - 1] * np.exp(-kel * (t - time_points[i - 1]))
+# Lade-Dosis als Bolus bei t = 0, danach Erhaltungsdosen als Infusion über t_inf Stunden alle 24 h
+gaben = [Gabe(0, dose_loading)] + regelmaessige_gaben(dose_maintenance, t_dosage_interval, t_inf,
+                                                       beginn=t_dosage_interval,
+                                                       ende=treatment_duration + t_dosage_interval)
 
-    if t % t_dosage_interval == 0:
-        # Konzentration durch Erhaltungsdosis nach einer Infusion von 1 Stunde
-        inf_concentration = (dose_maintenance * (1 - np.exp(-kel * t_inf)) / (Vd * t_inf * kel))
-        plasma_concentration[i] = previous_concentration + inf_concentration
-    else:
-        plasma_concentration[i] = previous_concentration
+# Plasmaspiegel exakt auf dem Darstellungsraster (geschlossene Lösung zwischen den Gaben)
+time_points = np.arange(0, treatment_duration + t_dosage_interval, 0.5)  # in Stunden
+plasma_concentration = modell.konzentration(gaben, time_points)
 
 # Ergebnis plotten
 plt.figure(figsize=(12, 6))
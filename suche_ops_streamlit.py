@@ -1,36 +1,200 @@
+import os
+import time
+
 import streamlit as st
-import pandas as pd
 
-def lade_excel_datei(pfad):
+import ze_api
+from ze_index import FUZZY, MODI, SuchFehler
+from ze_katalog import AKTUELL, Katalog, finde_versionen
+from ze_suche import RELEVANTE_SPALTEN, SUCHSPALTEN, teile_spalten
+
+# Zeilen pro Ergebnisseite; nur die aktuelle Seite wird an den Browser geschickt
+SEITENGROESSE = 100
+# Tipppause, nach der die Live-Suche sucht (Streamlit-Dauerangabe, wie LIVE_VERZOEGERUNG_MS im Tk-Finder)
+LIVE_PAUSE = '250ms'
+
+@st.cache_resource
+def hole_katalog(pfad):
+    """
+    Liefert den prozessweiten Katalog, den sich alle Sitzungen teilen: eine Suchmaschine
+    je Version der ZE-Liste ('ZE Liste 2024.xlsx', 'ZE Liste 2025.xlsx', ... neben der
+    Standarddatei). Daten, Suchindex und Ergebnis-Cache existieren damit nur einmal pro Prozess.
+    Ändert sich eine Excel-Datei, wird sie im Hintergrund neu geladen und ausgetauscht;
+    jede Sitzung sieht den neuen Stand beim nächsten Rerun, ohne Neustart von Streamlit.
+    """
+    # Ohne gefundene Datei bleibt die Standarddatei, damit die App den fehlenden Pfad meldet
+    katalog = Katalog(finde_versionen(os.path.dirname(pfad) or '.') or {AKTUELL: pfad})
+    katalog.beobachte()
+    return katalog
+
+@st.cache_resource
+def starte_such_api(_katalog, port):
+    """
+    Startet die HTTP-Such-API (siehe ze_api) einmal pro Prozess im Hintergrund.
+    Sie nutzt dieselben Suchmaschinen wie die App, die Excel-Dateien werden also nicht erneut gelesen.
+    """
+    return ze_api.starte_im_hintergrund(None, port=port, katalog=_katalog)
+
+def lade_datenbestand(katalog, version):
     """
-    Lädt die Excel-Datei und gibt den DataFrame zurück.
+    Liefert den geteilten Datenbestand einer Version der ZE-Liste.
+    Geladen wird nur einmal pro Prozess, ein aktueller Snapshot in '.ze_cache' wird dabei bevorzugt.
     """
     try:
-        df = pd.read_excel(pfad)
-        return df
+        return katalog.bestand(version)
     except FileNotFoundError:
-        st.error(f"Die Datei wurde nicht gefunden: {pfad}")
+        st.error(f"Die Datei wurde nicht gefunden: {katalog.maschine(version).pfad}")
         return None
     except Exception as e:
         st.error(f"Ein Fehler ist aufgetreten: {e}")
         return None
 
-def suche_daten(df, suchbegriff):
+def hole_live_suche(maschine, bestand):
     """
-    Sucht nach dem Suchbegriff in den Spalten 'OPS-Text' und 'Handelsnamen'.
+    Liefert die inkrementelle Suche dieser Sitzung (für die Live-Suche) in der gewählten Version.
     """
-    suchbegriff = suchbegriff.lower()
-    suchspalten = ['OPS-Text', 'Handelsnamen']
+    gespeichert = st.session_state.get('live_suche')
+    if gespeichert is None or gespeichert[0] is not maschine:
+        gespeichert = st.session_state['live_suche'] = (maschine, maschine.live_suche(SUCHSPALTEN, bestand))
+    return gespeichert[1]
 
-    # Überprüfen, ob die Suchspalten vorhanden sind
-    fehlende_spalten = [spalte for spalte in suchspalten if spalte not in df.columns]
+def suche_mit_cache(maschine, bestand, suchbegriff, modus, live=False):
+    """
+    Sucht in 'OPS-Text' und 'Handelsnamen' über die Suchmaschine (mit Ergebnis-Cache).
+    In der Live-Suche wird dabei das vorherige Ergebnis der Sitzung weiter eingegrenzt.
+    Gibt den Cache-Eintrag oder None (bei fehlenden Spalten oder ungültiger Suche) zurück.
+    """
+    fehlende_spalten = maschine.fehlende_spalten(SUCHSPALTEN, bestand)
     if fehlende_spalten:
         st.error(f"Die folgenden erforderlichen Spalten fehlen in der Excel-Datei: {', '.join(fehlende_spalten)}")
-        return pd.DataFrame()
+        return None
+    inkrementell = hole_live_suche(maschine, bestand) if live else None
+    try:
+        return maschine.suche(suchbegriff, SUCHSPALTEN, modus, inkrementell, bestand)
+    except SuchFehler as e:
+        st.error(str(e))
+        return None
+
+def zeige_ergebnisse(maschine, bestand, suchbegriff, modus, live=False):
+    """
+    Zeigt die Treffer einer Suche seitenweise an und bietet CSV/XLSX zum Herunterladen an.
+    An den Browser geht nur die aktuelle Seite; die Dateien werden erst beim Klick auf
+    den Download-Knopf blockweise erzeugt und danach im Ergebnis-Cache gehalten.
+    """
+    eintrag = suche_mit_cache(maschine, bestand, suchbegriff, modus, live)
+    if eintrag is None:
+        return
+    anzahl = len(eintrag.zeilen)
+    if not anzahl:
+        st.info("Keine passenden Einträge gefunden.")
+        return
+
+    st.success(f"{anzahl} Einträge gefunden.")
+    if modus == FUZZY:
+        namen = maschine.vorschlaege(suchbegriff, bestand=bestand)
+        st.caption(f"Meinten Sie: {', '.join(namen)}")
+    # Auswahl der relevanten Spalten
+    vorhandene_spalten, fehlende_spalten = teile_spalten(bestand.df, RELEVANTE_SPALTEN)
+    if fehlende_spalten:
+        st.warning(f"Die folgenden Spalten fehlen in den Daten und werden nicht angezeigt: {', '.join(fehlende_spalten)}")
+
+    # Neue Suche: zurück auf die erste Seite
+    seiten = -(-anzahl // SEITENGROESSE)
+    suche = (maschine.pfad, bestand.version, suchbegriff, modus)
+    if st.session_state.get('seiten_suche') != suche:
+        st.session_state['seiten_suche'] = suche
+        st.session_state['seite'] = 1
+    seite = st.number_input(f"Seite (von {seiten})", min_value=1, max_value=seiten, step=1,
+                            key='seite') if seiten > 1 else 1
+    start = (seite - 1) * SEITENGROESSE
+    ende = min(start + SEITENGROESSE, anzahl)
+
+    # Anzeige der Ergebnisse (nur diese Seite)
+    seite_df = bestand.modell.eintraege(eintrag.zeilen[start:ende])[vorhandene_spalten].reset_index(drop=True)
+    seite_df.index += start + 1
+    st.dataframe(seite_df)
+    st.caption(f"Einträge {start + 1}–{ende} von {anzahl}")
+
+    # Download-Optionen: Dateien erst auf Anfrage erzeugen (einmal pro Suche, dann aus dem Cache)
+    spalte_csv, spalte_xlsx = st.columns(2)
+    spalte_csv.download_button(
+        label="Ergebnisse als CSV herunterladen",
+        data=lambda: maschine.csv(eintrag, vorhandene_spalten, bestand),
+        file_name='ergebnisse.csv',
+        mime='text/csv',
+        on_click='ignore',
+    )
+    spalte_xlsx.download_button(
+        label="Ergebnisse als Excel herunterladen",
+        data=lambda: maschine.xlsx(eintrag, vorhandene_spalten, bestand),
+        file_name='ergebnisse.xlsx',
+        mime='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        on_click='ignore',
+    )
+
+def zeige_aenderungen(katalog, version):
+    """
+    Zeigt neue und entfallene ZE sowie geänderte Beträge gegenüber der vorherigen Version.
+    Die Unterschiede werden beim Laden einmal berechnet und hier nur noch angezeigt.
+    """
+    vorgaenger = katalog.vorgaenger(version)
+    if vorgaenger is None:
+        return
+    try:
+        unterschiede = katalog.diff(vorgaenger, version)
+    except Exception as e:
+        # Eine fehlerhafte ältere Version verhindert nur den Vergleich, nicht die Suche
+        st.warning(f"Änderungen gegenüber {vorgaenger} nicht verfügbar: {e}")
+        return
+    with st.expander(f"Änderungen gegenüber {vorgaenger} ({len(unterschiede)})"):
+        if len(unterschiede):
+            st.dataframe(unterschiede, hide_index=True)
+        else:
+            st.write("Keine neuen oder entfallenen ZE und keine geänderten Beträge.")
 
-    mask = df[suchspalten].astype(str).apply(lambda x: x.str.lower().str.contains(suchbegriff, na=False)).any(axis=1)
-    ergebnisse = df[mask]
-    return ergebnisse
+def zeige_speicherinfo(maschine, katalog):
+    """
+    Zeigt Version und Speicherbedarf der geladenen Datenbestände in der Seitenleiste.
+    """
+    info = maschine.speicherinfo()
+    geladen_um = time.strftime('%d.%m.%Y %H:%M', time.localtime(info['geladen_um']))
+    st.sidebar.write(f"**Datenversion:** {info['version']} (geladen {geladen_um})")
+    if info['ladefehler'] is not None:
+        st.sidebar.warning(f"Die geänderte Excel-Datei konnte nicht geladen werden: {info['ladefehler']}")
+    for version, groesse in info['versionen'].items():
+        st.sidebar.write(f"Version {version}: {groesse / 1024 ** 2:.2f} MB")
+    if info['rss'] is not None:
+        st.sidebar.write(f"Prozess gesamt (RSS): {info['rss'] / 1024 ** 2:.1f} MB")
+    if len(katalog.versionen) > 1:
+        st.sidebar.write(f"Zwischen den Versionen geteilte Texte: {katalog.speicherbedarf()['geteilt'] / 1024 ** 2:.2f} MB")
+    statistik = info['cache']
+    st.sidebar.write(f"Suchcache: {statistik['treffer']} Treffer, {statistik['fehlgriffe']} Fehlgriffe, "
+                     f"{statistik['eintraege']} Einträge ({statistik['bytes'] / 1024 ** 2:.2f} MB)")
+
+@st.fragment
+def suchbereich(maschine, bestand):
+    """
+    Suchfeld, Optionen und Ergebnisse. Als Fragment läuft beim Tippen in der
+    Live-Suche nur dieser Teil der Seite erneut.
+    Mit Live-Suche sucht das Feld nach jeder Tipppause von LIVE_PAUSE (entprellt),
+    ohne Enter oder Klick auf 'Suchen'; dabei wird das vorherige Ergebnis weiter eingegrenzt.
+    """
+    st.subheader("Suche nach OPS-Text oder Handelsnamen")
+    live = st.checkbox("Live-Suche (sucht während der Eingabe, nach einer kurzen Tipppause)")
+    suchbegriff = st.text_input("Suchbegriff (Teil des OPS-Textes oder Handelsnamens, im Modus OPS-Kode "
+                                "z. B. '6-002.p1', '8-810.*' oder '6-002.p1..p9')", key='suchbegriff',
+                                live=LIVE_PAUSE if live else False)
+    modus = st.selectbox("Suchmodus", list(MODI), format_func=MODI.get)
+
+    if st.button("Suchen") or (live and suchbegriff.strip() != ""):
+        if suchbegriff.strip() == "":
+            st.warning("Bitte geben Sie einen gültigen Suchbegriff ein.")
+            st.session_state.pop('aktive_suche', None)
+        else:
+            st.session_state['aktive_suche'] = (suchbegriff, modus, live)
+    # Die Suche bleibt aktiv, bis eine neue gestartet wird (Blättern löst einen Rerun aus)
+    if 'aktive_suche' in st.session_state:
+        zeige_ergebnisse(maschine, bestand, *st.session_state['aktive_suche'])
 
 def main():
     st.title("OPS-Text und Handelsnamen Suche")
@@ -41,47 +205,36 @@ def main():
     st.sidebar.header("Daten laden")
     st.sidebar.write(f"**Aktueller Excel-Pfad:** {excel_pfad}")
 
-    # Daten laden beim Start der Anwendung
-    if 'df' not in st.session_state:
-        df = lade_excel_datei(excel_pfad)
-        st.session_state['df'] = df
-    else:
-        df = st.session_state['df']
+    # Daten einmal pro Prozess laden und zwischen allen Sitzungen teilen
+    katalog = hole_katalog(excel_pfad)
+    version = katalog.neueste
+    if len(katalog.versionen) > 1:
+        version = st.sidebar.selectbox("Katalogversion", katalog.versionen[::-1])
+    maschine = katalog.maschine(version)
+    if st.sidebar.button("ZE-Liste neu laden"):
+        try:
+            maschine.neu_laden()
+        except Exception as e:
+            st.sidebar.error(f"Neu laden fehlgeschlagen: {e}")
+
+    bestand = lade_datenbestand(katalog, version)
+    df = bestand.df if bestand is not None else None
+
+    if bestand is not None:
+        zeige_speicherinfo(maschine, katalog)
+        # Optional: Such-API für andere Systeme aus demselben Prozess (z. B. ZE_API_PORT=8502)
+        api_port = os.environ.get('ZE_API_PORT')
+        if api_port:
+            try:
+                starte_such_api(katalog, int(api_port))
+                st.sidebar.write(f"**Such-API:** http://{ze_api.STANDARD_HOST}:{api_port}/search?q=...")
+            except (OSError, ValueError) as e:
+                st.sidebar.warning(f"Such-API konnte nicht gestartet werden: {e}")
 
     if df is not None:
         st.success("Daten erfolgreich geladen!")
-        st.subheader("Suche nach OPS-Text oder Handelsnamen")
-        suchbegriff = st.text_input("Suchbegriff (Teil des OPS-Textes oder Handelsnamens)")
-
-        if st.button("Suchen"):
-            if suchbegriff.strip() == "":
-                st.warning("Bitte geben Sie einen gültigen Suchbegriff ein.")
-            else:
-                ergebnisse = suche_daten(df, suchbegriff)
-                if not ergebnisse.empty:
-                    st.success(f"{len(ergebnisse)} Einträge gefunden.")
-                    # Auswahl der relevanten Spalten
-                    relevante_spalten = ['ZE', 'OPS', 'OPS-Text', 'Handelsnamen', 'Wirkstoffklasse', 'Infos', 'Betrag']
-                    vorhandene_spalten = [spalte for spalte in relevante_spalten if spalte in ergebnisse.columns]
-                    fehlende_spalten = [spalte for spalte in relevante_spalten if spalte not in ergebnisse.columns]
-
-                    if fehlende_spalten:
-                        st.warning(
-                            f"Die folgenden Spalten fehlen in den Daten und werden nicht angezeigt: {', '.join(fehlende_spalten)}")
-
-                    # Anzeige der Ergebnisse
-                    st.dataframe(ergebnisse[vorhandene_spalten].reset_index(drop=True))
-
-                    # Download-Option
-                    csv = ergebnisse[vorhandene_spalten].to_csv(index=False).encode('utf-8')
-                    st.download_button(
-                        label="Ergebnisse als CSV herunterladen",
-                        data=csv,
-                        file_name='ergebnisse.csv',
-                        mime='text/csv',
-                    )
-                else:
-                    st.info("Keine passenden Einträge gefunden.")
+        zeige_aenderungen(katalog, version)
+        suchbereich(maschine, bestand)
     else:
         st.error("Die Excel-Datei konnte nicht geladen werden. Bitte überprüfen Sie den Pfad und die Datei.")
 
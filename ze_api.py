@@ -0,0 +1,389 @@
+"""
+Lokale HTTP-Schnittstelle für die Suche in der ZE-Liste.
+
+Andere Systeme (Kodier-Arbeitsplatz, Apotheken-Dashboard) fragen die
+ZE-Liste über
+
+    GET /search?q=gemcitabin&mode=literal[&spalte=OPS-Text][&format=csv][&katalog=2024]
+    GET /diff?alt=2024&neu=2025
+    GET /health
+
+ab. Die Antwort ist JSON oder, mit ``format=csv``, eine gestreamte CSV-Datei
+(``Transfer-Encoding: chunked``).
+
+Der Server nutzt nur asyncio aus der Standardbibliothek und eine einzige,
+beim Start vorgeladene ``SuchMaschine``. Die Excel-Datei wird also nie pro
+Anfrage gelesen, und wiederkehrende Suchen kommen samt fertiger JSON-/CSV-Bytes
+aus dem Ergebnis-Cache. Suche, Serialisierung und Versionsvergleich laufen
+in einem kleinen Thread-Pool, nie in der Ereignisschleife: Eine breite oder
+unscharfe Suche (die erste baut das Löschwörterbuch auf), ein großes Ergebnis
+oder das Nachladen einer Excel-Datei hält so die übrigen Verbindungen nicht auf.
+
+Eigenständig starten::
+
+    python ze_api.py --port 8502
+
+Oder aus der Streamlit-App heraus über ``starte_im_hintergrund`` (siehe
+``suche_ops_streamlit.py``, Umgebungsvariable ``ZE_API_PORT``). Dann teilen
+sich App und API dieselbe Suchmaschine.
+
+Mit ``--verzeichnis`` werden alle Versionen der ZE-Liste im Verzeichnis
+geladen (siehe ``ze_katalog``); ``katalog=`` wählt dann die Version, ``/diff``
+liefert die vorberechneten Unterschiede zwischen zwei Versionen.
+
+Wird die Excel-Datei ersetzt, lädt der ``DateiWaechter`` der Suchmaschine sie
+im Hintergrund neu; jede Anfrage nutzt den Bestand, der bei ihrem Eingang
+aktuell war.
+
+Die Last misst ``benchmarks/bench_api.py``.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import sys
+import threading
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from ze_index import LITERAL, MODI, SuchFehler
+from ze_katalog import Katalog
+from ze_suche import SUCHSPALTEN, SuchMaschine
+
+STANDARD_HOST = '127.0.0.1'
+STANDARD_PORT = 8502
+FORMATE = ('json', 'csv')
+MAX_KOPF_BYTES = 16 * 1024
+LEERLAUF_TIMEOUT = 30  # Sekunden, bis eine ruhende Keep-Alive-Verbindung geschlossen wird
+ARBEITS_THREADS = 2  # Threads für Suche, Serialisierung und Laden
+
+
+class AnfrageFehler(Exception):
+    """
+    Fehlerhafte Anfrage; wird mit dem HTTP-Status und einer JSON-Fehlermeldung beantwortet.
+    """
+
+    def __init__(self, status, meldung):
+        super().__init__(meldung)
+        self.status = status
+
+
+def _kopf(status, art, offen, zusatz=''):
+    status = HTTPStatus(status)
+    return (f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: {art}\r\n{zusatz}"
+            f"Connection: {'keep-alive' if offen else 'close'}\r\n\r\n").encode('latin-1')
+
+
+def _antwort(status, koerper, offen=True, art='application/json; charset=utf-8'):
+    return _kopf(status, art, offen, f"Content-Length: {len(koerper)}\r\n") + koerper
+
+
+def _fehler(status, meldung, offen=True):
+    return _antwort(status, json.dumps({'fehler': meldung}, ensure_ascii=False).encode('utf-8'), offen)
+
+
+def _parameter(parameter, name, standard=None):
+    werte = parameter.get(name)
+    return werte[-1] if werte else standard
+
+
+class SuchServer:
+    """
+    asyncio-Server für ``/search``, ``/diff`` und ``/health`` über einer geteilten Suchmaschine.
+
+    :param maschine: SuchMaschine; wird beim Start geladen und kann mit anderen Front-Ends geteilt werden.
+    :param spalten: Standardmäßig durchsuchte Spalten.
+    :param katalog: Optionaler Katalog mehrerer Versionen; ``maschine`` ist dann die Standardversion
+        (None: die neueste).
+    """
+
+    def __init__(self, maschine, spalten=SUCHSPALTEN, katalog=None):
+        self.katalog = katalog
+        self.maschine = maschine if maschine is not None else katalog.maschine()
+        self.spalten = list(spalten)
+        self.anfragen = 0
+        self._pool = concurrent.futures.ThreadPoolExecutor(ARBEITS_THREADS, thread_name_prefix='ze-api')
+
+    async def starte(self, host=STANDARD_HOST, port=STANDARD_PORT):
+        """
+        Lädt den Datenbestand (falls noch nicht geschehen) und öffnet den Port.
+
+        Mit Katalog werden alle Versionen vorab geladen; eine fehlerhafte
+        Version wird gemeldet und beantwortet nur ihre eigenen Anfragen mit einem Fehler.
+
+        :return: asyncio.Server.
+        :raises FileNotFoundError: Wenn die Excel-Datei (der Standardversion) nicht existiert.
+        :raises OSError: Wenn der Port nicht geöffnet werden kann.
+        """
+        if self.katalog is not None:
+            for version, fehler in (await self._im_pool(self.katalog.aktualisiere)).items():
+                print(f"Version {version} der ZE-Liste konnte nicht geladen werden: {fehler}", file=sys.stderr)
+        await self._im_pool(self._bestand, self.maschine)
+        return await asyncio.start_server(self.verbindung, host, port, limit=MAX_KOPF_BYTES)
+
+    async def verbindung(self, reader, writer):
+        """
+        Bedient eine (Keep-Alive-)Verbindung, bis der Client sie schließt.
+        """
+        try:
+            while True:
+                try:
+                    kopf = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), LEERLAUF_TIMEOUT)
+                except asyncio.LimitOverrunError:
+                    writer.write(_fehler(431, "Anfragekopf zu groß", offen=False))
+                    break
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                offen = await self.bearbeite(kopf, writer)
+                await writer.drain()
+                if not offen:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def bearbeite(self, kopf, writer):
+        """
+        Beantwortet eine Anfrage.
+
+        :param kopf: Anfragezeile und Kopfzeilen bis einschließlich der Leerzeile.
+        :param writer: StreamWriter der Verbindung.
+        :return: Ob die Verbindung für weitere Anfragen offen bleibt.
+        """
+        zeilen = kopf.decode('latin-1').split('\r\n')
+        try:
+            methode, ziel, version = zeilen[0].split(' ')
+        except ValueError:
+            writer.write(_fehler(400, "Ungültige Anfragezeile", offen=False))
+            return False
+        felder = {}
+        for zeile in zeilen[1:]:
+            name, _, wert = zeile.partition(':')
+            felder[name.strip().lower()] = wert.strip().lower()
+        if version == 'HTTP/1.1':
+            offen = felder.get('connection') != 'close'
+        else:
+            offen = felder.get('connection') == 'keep-alive'
+        if methode != 'GET' or 'content-length' in felder or 'transfer-encoding' in felder:
+            writer.write(_fehler(405, "Nur GET-Anfragen ohne Inhalt werden unterstützt", offen=False))
+            return False
+
+        self.anfragen += 1
+        adresse = urlsplit(ziel)
+        try:
+            if adresse.path == '/search':
+                offen = await self.suche(parse_qs(adresse.query), writer, offen)
+            elif adresse.path == '/diff':
+                writer.write(_antwort(200, await self._im_pool(self.diff, parse_qs(adresse.query)), offen))
+            elif adresse.path == '/health':
+                writer.write(_antwort(200, await self._im_pool(self.status), offen))
+            else:
+                raise AnfrageFehler(404, f"Unbekannter Pfad: {adresse.path}")
+        except AnfrageFehler as e:
+            writer.write(_fehler(e.status, str(e), offen))
+        except SuchFehler as e:
+            writer.write(_fehler(400, str(e), offen))
+        except FileNotFoundError:
+            writer.write(_fehler(503, f"Die Datei wurde nicht gefunden: {self.maschine.pfad}", offen))
+        except Exception as e:
+            writer.write(_fehler(500, f"Ein Fehler ist aufgetreten: {e}", offen))
+        return offen
+
+    async def suche(self, parameter, writer, offen=True):
+        """
+        Beantwortet ``/search``; alle Prüfungen laufen, bevor die Antwort beginnt.
+
+        :param parameter: Query-Parameter (Name -> Liste von Werten).
+        :param writer: StreamWriter der Verbindung.
+        :param offen: Ob die Verbindung danach offen bleibt.
+        :return: Ob die Verbindung danach offen bleibt (nicht mehr nach einer abgebrochenen CSV-Ausgabe).
+        :raises AnfrageFehler: Bei fehlenden oder ungültigen Parametern.
+        :raises ze_index.SuchFehler: Bei ungültigen regulären Ausdrücken.
+        """
+        maschine = self._maschine(parameter)
+        suchbegriff = _parameter(parameter, 'q', '').strip()
+        modus = _parameter(parameter, 'mode', LITERAL)
+        ausgabe = _parameter(parameter, 'format', 'json')
+        spalten = parameter.get('spalte') or self.spalten
+        if not suchbegriff:
+            raise AnfrageFehler(400, "Parameter 'q' fehlt")
+        if modus not in MODI:
+            raise AnfrageFehler(400, f"Unbekannter Suchmodus '{modus}' (erlaubt: {', '.join(MODI)})")
+        if ausgabe not in FORMATE:
+            raise AnfrageFehler(400, f"Unbekanntes Format '{ausgabe}' (erlaubt: {', '.join(FORMATE)})")
+
+        bestand = await self._im_pool(self._bestand, maschine)
+        fehlende_spalten = maschine.fehlende_spalten(spalten, bestand)
+        if fehlende_spalten:
+            raise AnfrageFehler(400, f"Nicht durchsuchbare Spalten: {', '.join(fehlende_spalten)}")
+        eintrag = await self._im_pool(maschine.suche, suchbegriff, spalten, modus, None, bestand)
+
+        if ausgabe == 'csv':
+            return await self._sende_csv(maschine, eintrag, bestand, writer, offen)
+        kopf = json.dumps({'suchbegriff': suchbegriff, 'modus': modus, 'version': bestand.version,
+                           'treffer': len(eintrag.zeilen)}, ensure_ascii=False)
+        # Die Einträge liegen fertig serialisiert im Cache und werden nur noch angehängt
+        eintraege = await self._im_pool(maschine.json, eintrag, None, bestand)
+        koerper = kopf[:-1].encode('utf-8') + b', "eintraege": ' + eintraege + b'}'
+        writer.write(_antwort(200, koerper, offen))
+        return offen
+
+    def diff(self, parameter):
+        """
+        JSON-Bytes für ``/diff``: neue und entfallene ZE sowie geänderte Beträge zwischen zwei Versionen.
+
+        :param parameter: Query-Parameter ``alt`` und ``neu`` (Standard: vorletzte und neueste Version).
+        :raises AnfrageFehler: Ohne Katalog oder bei unbekannter Version.
+        """
+        if self.katalog is None:
+            raise AnfrageFehler(404, "Kein Katalog mehrerer Versionen geladen (Start mit --verzeichnis)")
+        try:
+            neu = _parameter(parameter, 'neu', self.katalog.neueste)
+            alt = _parameter(parameter, 'alt') or self.katalog.vorgaenger(neu)
+            unterschiede = self.katalog.diff(alt, neu)
+        except KeyError as e:
+            raise AnfrageFehler(400, e.args[0])
+        kopf = json.dumps({'alt': alt, 'neu': neu, 'aenderungen': len(unterschiede)}, ensure_ascii=False)
+        return (kopf[:-1] + ', "eintraege": ' + unterschiede.to_json(orient='records', force_ascii=False) + '}').encode('utf-8')
+
+    async def _im_pool(self, funktion, *argumente):
+        # Blockierende Arbeit außerhalb der Ereignisschleife
+        return await asyncio.get_running_loop().run_in_executor(self._pool, funktion, *argumente)
+
+    def _bestand(self, maschine):
+        # Über den Katalog laden, damit ein neuer Bestand geteilt und verglichen wird
+        if self.katalog is not None:
+            for version, kandidat in self.katalog.maschinen.items():
+                if kandidat is maschine:
+                    return self.katalog.bestand(version)
+        return maschine.bestand()
+
+    def _maschine(self, parameter):
+        # Suchmaschine der angefragten Katalogversion (Parameter 'katalog')
+        version = _parameter(parameter, 'katalog')
+        if version is None:
+            return self.maschine
+        if self.katalog is None:
+            raise AnfrageFehler(400, "Parameter 'katalog' nur mit mehreren Versionen (Start mit --verzeichnis)")
+        try:
+            return self.katalog.maschine(version)
+        except KeyError as e:
+            raise AnfrageFehler(400, e.args[0])
+
+    async def _sende_csv(self, maschine, eintrag, bestand, writer, offen):
+        """
+        Streamt die Treffer als CSV (chunked).
+
+        Ist der Kopf einmal gesendet, kann kein Fehlerstatus mehr folgen: Bricht
+        die Ausgabe ab, wird die Verbindung ohne abschließenden Block
+        geschlossen, sodass der Client die Antwort als unvollständig erkennt.
+
+        :return: Ob die Verbindung offen bleibt.
+        """
+        writer.write(_kopf(200, 'text/csv; charset=utf-8', offen,
+                           'Content-Disposition: attachment; filename="suchergebnisse.csv"\r\n'
+                           'Transfer-Encoding: chunked\r\n'))
+        # Jeder Block wird im Pool erzeugt; None markiert das Ende
+        bloecke = maschine.csv_bloecke(eintrag, bestand=bestand)
+        try:
+            while (block := await self._im_pool(next, bloecke, None)) is not None:
+                if block:
+                    writer.write(b'%x\r\n%b\r\n' % (len(block), block))
+                    await writer.drain()
+        except ConnectionError:
+            return False
+        except Exception as e:
+            print(f"CSV-Ausgabe abgebrochen: {e}", file=sys.stderr)
+            return False
+        finally:
+            bloecke.close()
+        writer.write(b'0\r\n\r\n')
+        return offen
+
+    def status(self):
+        """
+        JSON-Bytes für ``/health``: Datenversion, Zeilen, Anfragen und Cache-Statistik.
+        """
+        bestand = self._bestand(self.maschine)
+        return json.dumps({'status': 'ok', 'version': bestand.version, 'zeilen': len(bestand.df),
+                           'anfragen': self.anfragen, 'cache': self.maschine.cache.statistik()}).encode('utf-8')
+
+
+def starte_im_hintergrund(maschine, host=STANDARD_HOST, port=STANDARD_PORT, katalog=None):
+    """
+    Startet die Such-API in einem Daemon-Thread mit eigener Ereignisschleife.
+
+    Gedacht für die Streamlit-App: App und API teilen sich dieselbe
+    Suchmaschine samt Daten, Index und Ergebnis-Cache.
+
+    :param maschine: Geteilte SuchMaschine.
+    :param host: Adresse, an die der Server gebunden wird.
+    :param port: Port des Servers.
+    :param katalog: Optionaler Katalog mehrerer Versionen (Parameter ``katalog``, Pfad ``/diff``).
+    :return: Der laufende Thread.
+    :raises FileNotFoundError: Wenn die Excel-Datei nicht existiert.
+    :raises OSError: Wenn der Port nicht geöffnet werden kann.
+    """
+    bereit = threading.Event()
+    fehler = []
+
+    async def diene():
+        try:
+            server = await SuchServer(maschine, katalog=katalog).starte(host, port)
+        except BaseException as e:
+            fehler.append(e)
+            return
+        finally:
+            bereit.set()
+        async with server:
+            await server.serve_forever()
+
+    thread = threading.Thread(target=asyncio.run, args=(diene(),), name='ze-api', daemon=True)
+    thread.start()
+    bereit.wait()
+    if fehler:
+        raise fehler[0]
+    return thread
+
+
+async def _diene(maschine, host, port, katalog=None):
+    server = SuchServer(maschine, katalog=katalog)
+    asyncio_server = await server.starte(host, port)
+    bestand = server.maschine.bestand()
+    # Eine geänderte Excel-Datei wird im Hintergrund geladen; Anfragen laufen so lange auf dem alten Stand
+    (katalog or server.maschine).beobachte()
+    versionen = f", Katalog {', '.join(katalog.versionen)}" if katalog is not None else ''
+    print(f"Such-API läuft auf http://{host}:{port}/search?q=... "
+          f"(Datenversion {bestand.version}, {len(bestand.df)} Einträge{versionen})", flush=True)
+    async with asyncio_server:
+        await asyncio_server.serve_forever()
+
+
+def main(argumente=None):
+    parser = argparse.ArgumentParser(description="Lokale HTTP/JSON-Such-API für die ZE-Liste.")
+    parser.add_argument('--datei', default='ZE Liste.xlsx', help="Pfad zur Excel-Datei (Standard: %(default)s)")
+    parser.add_argument('--verzeichnis', help="Alle Versionen 'ZE Liste*.xlsx' aus diesem Verzeichnis laden "
+                                              "(statt --datei)")
+    parser.add_argument('--host', default=STANDARD_HOST, help="Adresse (Standard: %(default)s)")
+    parser.add_argument('--port', type=int, default=STANDARD_PORT, help="Port (Standard: %(default)s)")
+    args = parser.parse_args(argumente)
+
+    try:
+        if args.verzeichnis:
+            asyncio.run(_diene(None, args.host, args.port, Katalog.aus_verzeichnis(args.verzeichnis)))
+        else:
+            asyncio.run(_diene(SuchMaschine(args.datei), args.host, args.port))
+    except FileNotFoundError:
+        print(f"Die Datei wurde nicht gefunden: {args.verzeichnis or args.datei}", file=sys.stderr)
+        return 2
+    except OSError as e:
+        print(f"Der Server konnte nicht gestartet werden: {e}", file=sys.stderr)
+        return 2
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
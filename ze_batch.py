@@ -0,0 +1,308 @@
+"""
+Stapelzuordnung ganzer Fall-Listen zur ZE-Liste.
+
+Statt jeden OPS-Kode bzw. Handelsnamen einzeln im ``input()``-Dialog von
+``ZE Erweitert.py`` einzugeben, wird ein Export (CSV oder Excel) in einem
+Durchgang zugeordnet:
+
+* OPS-Kodes über einen Hash-Join (``DataFrame.merge``) mit den Kodes der
+  ZE-Liste. Verglichen wird ohne Punkt, Bindestrich und Leerzeichen, sodass
+  '6-001.19' und '600119' gleich sind. Kodes mit '*' in der ZE-Liste
+  ('6-001.4*') decken alle Kodes mit diesem Anfang ab; dafür wird je
+  vorkommender Präfixlänge ein weiterer Join gemacht.
+* Freitext (Wirkstoff, Handelsname) über den Suchindex. Jeder verschiedene
+  Begriff wird nur einmal gesucht.
+
+Eine Zeile mit OPS-Kode wird über den Kode zugeordnet, sonst über den Text.
+Gezählt werden verschiedene ZE-Einträge; Folgezeilen der ZE-Liste mit
+demselben ZE (weitere Handelsnamen) zählen nicht doppelt. Der Betrag einer
+Zeile wird nur übernommen, wenn sie genau einem ZE-Eintrag zugeordnet ist
+(z. B. passt 'gemcitabin' auf alle Dosisstufen). Mehrdeutige Zeilen werden
+gezählt, gehen aber nicht in die Summe ein.
+
+Aufruf::
+
+    python ze_batch.py faelle.csv --fall Fallnummer --ops OPS --ausgabe ergebnis.xlsx
+
+Die Laufzeit für große Listen misst ``benchmarks/bench_batch.py``.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from ze_daten import betrag_als_zahl
+from ze_index import LITERAL, MODI, OPS_FREMDZEICHEN, SuchFehler
+from ze_suche import SuchMaschine
+
+# Übliche Spaltennamen in Fall-Exporten, falls keine Spalte angegeben ist
+FALL_SPALTEN = ['Fall', 'Fallnummer', 'Fallnr', 'Fall-ID', 'Fall-Nr.']
+OPS_SPALTEN = ['OPS', 'OPS-Kode', 'OPS-Code', 'Kode', 'Code']
+TEXT_SPALTEN = ['Suchbegriff', 'Handelsname', 'Handelsnamen', 'Medikament', 'Wirkstoff', 'Text']
+# Kodierungen für CSV-Eingaben, in dieser Reihenfolge versucht
+KODIERUNGEN = ('utf-8-sig', 'cp1252')
+
+KEIN_TREFFER = 'kein Treffer'
+EINDEUTIG = 'eindeutig'
+MEHRDEUTIG = 'mehrdeutig'
+UNGUELTIG = 'ungültiger Suchbegriff'
+
+
+def ops_schluessel(werte):
+    """
+    Vergleichsschlüssel für OPS-Kodes wie ``ze_index.ops_schluessel``, aber für eine ganze Spalte.
+
+    :param werte: OPS-Kodes (leere Zellen erlaubt).
+    :return: Series mit Schlüsseln, leere Zellen und Kodes ohne Zeichen als NA.
+    """
+    schluessel = pd.Series(werte, dtype='string').str.lower().str.replace(OPS_FREMDZEICHEN, '', regex=True)
+    return schluessel.mask(schluessel == '')
+
+
+def _erste_vorhandene(df, kandidaten):
+    return next((spalte for spalte in kandidaten if spalte in df.columns), None)
+
+
+def lies_eingabe(pfad):
+    """
+    Liest eine Fall-Liste als CSV (Trennzeichen erkannt, UTF-8 oder Windows-1252) oder Excel.
+
+    Alle Zellen werden als Text gelesen, damit Fallnummern und OPS-Kodes unverändert bleiben.
+    Die Kodierung wird an der ganzen Datei geprüft, nicht nur am Anfang.
+
+    :raises ValueError: Wenn die Datei weder UTF-8 noch Windows-1252 ist.
+    """
+    if os.path.splitext(pfad)[1].lower() in ('.xlsx', '.xlsm', '.xls'):
+        return pd.read_excel(pfad, dtype=str)
+    with open(pfad, 'rb') as f:
+        rohdaten = f.read()
+    for kodierung in KODIERUNGEN:
+        try:
+            text = rohdaten.decode(kodierung)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError(f"{pfad}: Kodierung nicht erkannt (erwartet {' oder '.join(KODIERUNGEN)})")
+    try:
+        trennzeichen = csv.Sniffer().sniff(text[:64 * 1024], delimiters=',;\t').delimiter
+    except csv.Error:
+        trennzeichen = ','
+    return pd.read_csv(io.StringIO(text, newline=''), sep=trennzeichen, dtype=str)
+
+
+def _ops_paare(schluessel, stamm_schluessel):
+    """
+    Hash-Join der Anfrage-Kodes mit den Kodes der Stammtabelle.
+
+    :return: DataFrame mit den Spalten 'eingabe' (Anfragezeile) und 'zeile' (Stammzeile).
+    """
+    anfragen = pd.DataFrame({'eingabe': np.flatnonzero(schluessel.notna().to_numpy()),
+                             'schluessel': schluessel.dropna().to_numpy()})
+    tabelle = pd.DataFrame({'schluessel': stamm_schluessel.to_numpy(), 'zeile': np.arange(len(stamm_schluessel))})
+    tabelle = tabelle.dropna()
+    stern = tabelle['schluessel'].str.endswith('*')
+    paare = [anfragen.merge(tabelle[~stern], on='schluessel')[['eingabe', 'zeile']]]
+
+    # '6-001.4*' deckt alle Kodes ab, die mit '60014' beginnen: ein Join je Präfixlänge
+    praefixe = tabelle[stern].assign(schluessel=tabelle['schluessel'][stern].str.rstrip('*'))
+    laengen = anfragen['schluessel'].str.len()
+    for laenge, gruppe in praefixe.groupby(praefixe['schluessel'].str.len()):
+        kandidaten = anfragen[laengen >= laenge]
+        kandidaten = kandidaten.assign(schluessel=kandidaten['schluessel'].str[:laenge])
+        paare.append(kandidaten.merge(gruppe, on='schluessel')[['eingabe', 'zeile']])
+    return pd.concat(paare, ignore_index=True)
+
+
+def _text_paare(texte, modell, spalten, modus):
+    """
+    Sucht jeden verschiedenen Begriff einmal im Index und verteilt die Treffer auf die Anfragezeilen.
+
+    :return: Tupel (paare, ungueltig): Paare wie bei ``_ops_paare`` und Maske ungültiger Suchbegriffe.
+    """
+    codes, begriffe = pd.factorize(texte, use_na_sentinel=True)
+    treffer = []
+    ungueltig = np.zeros(len(begriffe), dtype=bool)
+    for nummer, begriff in enumerate(begriffe):
+        try:
+            treffer.append(modell.suche(begriff, spalten, modus))
+        except SuchFehler:
+            treffer.append(np.zeros(0, dtype=np.int64))
+            ungueltig[nummer] = True
+    laengen = np.array([len(t) for t in treffer], dtype=np.int64)
+    begriff_paare = pd.DataFrame({
+        'begriff': np.repeat(np.arange(len(begriffe)), laengen),
+        'zeile': np.concatenate(treffer) if treffer else np.zeros(0, dtype=np.int64),
+    })
+    anfragen = pd.DataFrame({'eingabe': np.flatnonzero(codes >= 0), 'begriff': codes[codes >= 0]})
+    paare = anfragen.merge(begriff_paare, on='begriff')[['eingabe', 'zeile']]
+    return paare, np.append(ungueltig, False)[codes]
+
+
+def _ze_eintraege(stamm):
+    """
+    Nummer des ZE-Eintrags je Stammzeile und die Namen der Einträge.
+    """
+    if 'ZE' not in stamm.columns:
+        return np.arange(len(stamm)), np.array([f'Zeile {i}' for i in range(len(stamm))], dtype=object)
+    nummern, namen = pd.factorize(stamm['ZE'].astype(object), use_na_sentinel=True)
+    ohne_ze = np.flatnonzero(nummern < 0)
+    nummern[ohne_ze] = len(namen) + np.arange(len(ohne_ze))
+    namen = np.concatenate([np.asarray(namen, dtype=object).astype(str),
+                            np.array([f'Zeile {i}' for i in ohne_ze], dtype=object)])
+    return nummern, namen
+
+
+def ordne_zu(eingabe, modell, ops_spalte=None, text_spalte=None, modus=LITERAL, suchspalten=None):
+    """
+    Ordnet alle Zeilen einer Fall-Liste in einem Durchgang ZE-Einträgen zu.
+
+    :param eingabe: DataFrame der Fall-Liste.
+    :param modell: ZeModell (bzw. ``Datenbestand.modell``).
+    :param ops_spalte: Spalte mit OPS-Kodes (optional).
+    :param text_spalte: Spalte mit Freitext für den Suchindex (optional).
+    :param modus: Suchmodus für den Freitext aus ``ze_index.MODI``.
+    :param suchspalten: Durchsuchte Spalten für den Freitext (Standard: alle durchsuchbaren).
+    :return: Kopie der Eingabe mit den Spalten 'Treffer' (Anzahl verschiedener ZE-Einträge),
+        'ZE-Einträge', 'ZE-Betrag' und 'Status'.
+    """
+    stamm = modell.stamm
+    anzahl = len(eingabe)
+    paare = [pd.DataFrame({'eingabe': np.zeros(0, dtype=np.int64), 'zeile': np.zeros(0, dtype=np.int64)})]
+    hat_ops = np.zeros(anzahl, dtype=bool)
+    ungueltig = np.zeros(anzahl, dtype=bool)
+
+    if ops_spalte is not None and 'OPS' in stamm.columns:
+        schluessel = ops_schluessel(eingabe[ops_spalte])
+        hat_ops = schluessel.notna().to_numpy()
+        paare.append(_ops_paare(schluessel, ops_schluessel(stamm['OPS'])))
+    if text_spalte is not None:
+        texte = eingabe[text_spalte].astype('string').str.strip()
+        texte = texte.mask(hat_ops | (texte == '').fillna(True).to_numpy())
+        text_paare, ungueltig = _text_paare(texte, modell, suchspalten, modus)
+        paare.append(text_paare)
+
+    # Stammzeilen auf ZE-Einträge abbilden; Zeilen ohne ZE bleiben eigene Einträge
+    ze_nummern, ze_namen = _ze_eintraege(stamm)
+    paare = pd.concat(paare, ignore_index=True)
+    paare = pd.DataFrame({'eingabe': paare['eingabe'].to_numpy(), 'ze': ze_nummern[paare['zeile'].to_numpy()]})
+    paare = paare.drop_duplicates().sort_values(['eingabe', 'ze'])
+    eingabe_nr = paare['eingabe'].to_numpy()
+    ze_nr = paare['ze'].to_numpy()
+    treffer = np.bincount(eingabe_nr, minlength=anzahl)
+
+    # Die Paare sind nach Anfragezeile sortiert: die ZE-Namen jeder Zeile liegen zusammenhängend
+    namen = ze_namen[ze_nr].tolist()
+    grenzen = np.concatenate(([0], np.cumsum(treffer))).tolist()
+    eintraege = np.full(anzahl, None, dtype=object)
+    for i in np.flatnonzero(treffer).tolist():
+        eintraege[i] = '; '.join(namen[grenzen[i]:grenzen[i + 1]])
+    betraege = betrag_als_zahl(stamm['Betrag']) if 'Betrag' in stamm.columns else np.full(len(stamm), np.nan)
+    # Betrag je ZE-Eintrag: der erste vorhandene seiner Zeilen
+    betrag_je_ze = pd.Series(betraege).groupby(ze_nummern).first().reindex(np.arange(len(ze_namen))).to_numpy()
+    betrag = np.full(anzahl, np.nan)
+    eindeutig = treffer[eingabe_nr] == 1
+    betrag[eingabe_nr[eindeutig]] = betrag_je_ze[ze_nr[eindeutig]]
+
+    ergebnis = eingabe.copy()
+    ergebnis['Treffer'] = treffer
+    ergebnis['ZE-Einträge'] = eintraege
+    ergebnis['ZE-Betrag'] = betrag
+    ergebnis['Status'] = np.select([ungueltig, treffer == 1, treffer > 1], [UNGUELTIG, EINDEUTIG, MEHRDEUTIG],
+                                   KEIN_TREFFER)
+    return ergebnis
+
+
+def fasse_zusammen(ergebnis, fall_spalte=None):
+    """
+    Trefferzahlen und Summe der eindeutig zugeordneten Beträge je Fall.
+
+    :param ergebnis: Ergebnis von ``ordne_zu``.
+    :param fall_spalte: Spalte mit der Fallnummer; ohne sie wird die ganze Liste als ein Fall gezählt.
+    :return: DataFrame mit einer Zeile pro Fall.
+    """
+    faelle = ergebnis[fall_spalte] if fall_spalte is not None else pd.Series('Gesamt', index=ergebnis.index)
+    gruppen = pd.DataFrame({
+        'Fall': faelle.to_numpy(),
+        'Positionen': 1,
+        'mit Treffer': (ergebnis['Treffer'] > 0).to_numpy(),
+        'eindeutig': (ergebnis['Status'] == EINDEUTIG).to_numpy(),
+        'mehrdeutig': (ergebnis['Status'] == MEHRDEUTIG).to_numpy(),
+        'Summe Betrag': ergebnis['ZE-Betrag'].to_numpy(),
+    }).groupby('Fall', sort=False, dropna=False)
+    zusammenfassung = gruppen.sum(min_count=0)
+    zusammenfassung['Summe Betrag'] = zusammenfassung['Summe Betrag'].round(2)
+    return zusammenfassung.reset_index()
+
+
+def schreibe_ergebnis(ergebnis, zusammenfassung, pfad):
+    """
+    Schreibt Zuordnung und Fall-Summen.
+
+    Bei '.xlsx' entstehen zwei Tabellenblätter, sonst zwei CSV-Dateien
+    ('<name>.csv' und '<name>_faelle.csv', Trennzeichen ';', Dezimalkomma).
+
+    :return: Liste der geschriebenen Dateien.
+    """
+    basis, endung = os.path.splitext(pfad)
+    if endung.lower() == '.xlsx':
+        with pd.ExcelWriter(pfad, engine='openpyxl') as writer:
+            ergebnis.to_excel(writer, sheet_name='Zuordnung', index=False)
+            zusammenfassung.to_excel(writer, sheet_name='Fälle', index=False)
+        return [pfad]
+    faelle_pfad = f'{basis}_faelle{endung or ".csv"}'
+    for df, ziel in ((ergebnis, pfad), (zusammenfassung, faelle_pfad)):
+        df.to_csv(ziel, sep=';', decimal=',', index=False, encoding='utf-8-sig')
+    return [pfad, faelle_pfad]
+
+
+def main(argumente=None):
+    parser = argparse.ArgumentParser(description="Ordnet eine Fall-Liste (CSV/Excel) in einem Durchgang der ZE-Liste zu.")
+    parser.add_argument('eingabe', help="CSV- oder Excel-Datei mit OPS-Kodes und/oder Suchbegriffen")
+    parser.add_argument('--datei', default='ZE Liste.xlsx', help="Pfad zur ZE-Liste (Standard: %(default)s)")
+    parser.add_argument('--ausgabe', help="Ergebnisdatei (.csv oder .xlsx, Standard: <eingabe>_ZE.csv)")
+    parser.add_argument('--fall', help=f"Spalte mit der Fallnummer (Standard: erste von {', '.join(FALL_SPALTEN)})")
+    parser.add_argument('--ops', help=f"Spalte mit OPS-Kodes (Standard: erste von {', '.join(OPS_SPALTEN)})")
+    parser.add_argument('--text', help=f"Spalte mit Suchbegriffen (Standard: erste von {', '.join(TEXT_SPALTEN)})")
+    parser.add_argument('--modus', choices=list(MODI), default=LITERAL, help="Suchmodus für Freitext")
+    args = parser.parse_args(argumente)
+
+    try:
+        eingabe = lies_eingabe(args.eingabe)
+    except (OSError, ValueError) as e:
+        print(f"Die Eingabedatei konnte nicht gelesen werden: {e}", file=sys.stderr)
+        return 2
+    fall_spalte = args.fall or _erste_vorhandene(eingabe, FALL_SPALTEN)
+    ops_spalte = args.ops or _erste_vorhandene(eingabe, OPS_SPALTEN)
+    text_spalte = args.text or _erste_vorhandene(eingabe, TEXT_SPALTEN)
+    fehlende = [s for s in (args.fall, args.ops, args.text) if s is not None and s not in eingabe.columns]
+    if fehlende or (ops_spalte is None and text_spalte is None):
+        print(f"Spalten nicht gefunden: {', '.join(fehlende) or 'OPS-Kode oder Suchbegriff'} "
+              f"(vorhanden: {', '.join(map(str, eingabe.columns))})", file=sys.stderr)
+        return 2
+
+    try:
+        maschine = SuchMaschine(args.datei)
+        bestand = maschine.bestand()
+    except FileNotFoundError:
+        print(f"Die Datei wurde nicht gefunden: {args.datei}", file=sys.stderr)
+        return 2
+    ergebnis = ordne_zu(eingabe, bestand.modell, ops_spalte, text_spalte, args.modus)
+    zusammenfassung = fasse_zusammen(ergebnis, fall_spalte)
+
+    ausgabe = args.ausgabe or f'{os.path.splitext(args.eingabe)[0]}_ZE.csv'
+    dateien = schreibe_ergebnis(ergebnis, zusammenfassung, ausgabe)
+    status = ergebnis['Status'].value_counts()
+    print(f"{len(ergebnis)} Zeilen zugeordnet: " + ", ".join(f"{anzahl} {name}" for name, anzahl in status.items()))
+    print(f"{len(zusammenfassung)} Fälle, Summe eindeutig zugeordneter Beträge: "
+          f"{zusammenfassung['Summe Betrag'].sum():.2f} €")
+    print(f"Geschrieben: {', '.join(dateien)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
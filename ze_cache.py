@@ -0,0 +1,147 @@
+"""
+Ergebnis-Cache für wiederkehrende Suchanfragen.
+
+Gespeichert werden die Trefferzeilen einer Suche und – sobald einmal erzeugt –
+die fertigen CSV-, XLSX- bzw. JSON-Bytes für Download und Such-API (je Format und
+Ausgabespalten). Der Schlüssel besteht aus
+Datenversion, normalisiertem Suchbegriff, Suchmodus und durchsuchten Spalten. Sobald eine neuere
+Datenversion angefragt wird, wird der gesamte Cache verworfen.
+"""
+import threading
+from collections import OrderedDict
+
+from ze_index import REGEX, normalisiere
+
+
+class CacheEintrag:
+    """
+    Trefferzeilen einer Suche samt optional vorgerenderten CSV-, XLSX- und JSON-Bytes.
+
+    Die Bytes hängen von den ausgegebenen Spalten ab und werden daher je
+    (Format, Spalten) abgelegt; Aufrufer mit anderen Spalten teilen sich nur die Trefferzeilen.
+    """
+    __slots__ = ('zeilen', 'ausgaben')
+
+    def __init__(self, zeilen):
+        self.zeilen = zeilen
+        self.ausgaben = {}  # (Art, Spalten-Tupel) -> Bytes
+
+    def ausgabe(self, art, spalten):
+        """
+        Die vorgerenderten Bytes für ein Format ('csv', 'json', 'xlsx') und Spalten oder None.
+        """
+        return self.ausgaben.get((art, tuple(spalten)))
+
+    def groesse(self):
+        return self.zeilen.nbytes + sum(len(daten) for daten in self.ausgaben.values())
+
+
+class ErgebnisCache:
+    """
+    Threadsicherer LRU-Cache mit Obergrenze für Anzahl und Speicher.
+
+    :param max_eintraege: Maximale Anzahl gespeicherter Suchen.
+    :param max_bytes: Maximaler Speicher für Trefferzeilen und CSV-Bytes.
+    """
+
+    def __init__(self, max_eintraege=256, max_bytes=64 * 1024 ** 2):
+        self.max_eintraege = max_eintraege
+        self.max_bytes = max_bytes
+        self.treffer = 0
+        self.fehlgriffe = 0
+        self._eintraege = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self._sperre = threading.Lock()
+
+    @staticmethod
+    def schluessel(version, suchbegriff, modus, spalten=None):
+        """
+        Bildet den Cache-Schlüssel; reguläre Ausdrücke bleiben unverändert.
+        """
+        begriff = suchbegriff if modus == REGEX else normalisiere(suchbegriff)
+        return version, begriff, modus, None if spalten is None else tuple(spalten)
+
+    def hole(self, version, suchbegriff, modus, spalten=None):
+        """
+        Liefert den Eintrag zu einer Suche oder None.
+
+        :param version: Version des Datenbestands.
+        :param suchbegriff: Suchbegriff wie eingegeben.
+        :param modus: Suchmodus.
+        :param spalten: Durchsuchte Spalten (None für alle).
+        :return: CacheEintrag oder None.
+        """
+        schluessel = self.schluessel(version, suchbegriff, modus, spalten)
+        with self._sperre:
+            self._pruefe_version(version)
+            eintrag = self._eintraege.get(schluessel)
+            if eintrag is None:
+                self.fehlgriffe += 1
+                return None
+            self._eintraege.move_to_end(schluessel)
+            self.treffer += 1
+            return eintrag
+
+    def lege_ab(self, version, suchbegriff, modus, zeilen, spalten=None):
+        """
+        Speichert die Trefferzeilen einer Suche.
+
+        :param version: Version des Datenbestands.
+        :param suchbegriff: Suchbegriff wie eingegeben.
+        :param modus: Suchmodus.
+        :param zeilen: Trefferzeilen (NumPy-Array); wird schreibgeschützt abgelegt.
+        :param spalten: Durchsuchte Spalten (None für alle).
+        :return: Der neue CacheEintrag.
+        """
+        zeilen.setflags(write=False)
+        eintrag = CacheEintrag(zeilen)
+        schluessel = self.schluessel(version, suchbegriff, modus, spalten)
+        with self._sperre:
+            self._pruefe_version(version)
+            alt = self._eintraege.pop(schluessel, None)
+            if alt is not None:
+                self._bytes -= alt.groesse()
+            self._eintraege[schluessel] = eintrag
+            self._bytes += eintrag.groesse()
+            self._raeume_auf()
+        return eintrag
+
+    def setze_ausgabe(self, eintrag, art, spalten, daten):
+        """
+        Hinterlegt die CSV-, JSON- oder XLSX-Bytes zu einem Eintrag und passt die Speicherbilanz an.
+
+        :param art: 'csv', 'json' oder 'xlsx'.
+        :param spalten: Die ausgegebenen Spalten.
+        """
+        with self._sperre:
+            vorher = eintrag.groesse()
+            eintrag.ausgaben[(art, tuple(spalten))] = daten
+            if any(e is eintrag for e in self._eintraege.values()):
+                self._bytes += eintrag.groesse() - vorher
+                self._raeume_auf()
+
+    def leeren(self):
+        with self._sperre:
+            self._eintraege.clear()
+            self._bytes = 0
+
+    def statistik(self):
+        """
+        :return: Dictionary mit Treffern, Fehlgriffen, Einträgen und belegtem Speicher.
+        """
+        with self._sperre:
+            return {'treffer': self.treffer, 'fehlgriffe': self.fehlgriffe,
+                    'eintraege': len(self._eintraege), 'bytes': self._bytes}
+
+    def _pruefe_version(self, version):
+        # Neue Datenversion: alle alten Ergebnisse sind ungültig
+        if self._version is None or version > self._version:
+            self._eintraege.clear()
+            self._bytes = 0
+            self._version = version
+
+    def _raeume_auf(self):
+        while self._eintraege and (len(self._eintraege) > self.max_eintraege or self._bytes > self.max_bytes):
+            _, eintrag = self._eintraege.popitem(last=False)
+            self._bytes -= eintrag.groesse()
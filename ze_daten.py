@@ -0,0 +1,360 @@
+"""
+Laden der ZE-Liste mit spaltenorientiertem Snapshot-Cache.
+
+Beim ersten Laden wird die Excel-Datei mit openpyxl geparst und als Snapshot
+(siehe ``ze_snapshot``) in ``.ze_cache`` neben der Excel-Datei abgelegt. Solange
+sich die Excel-Datei nicht ändert (Änderungszeit, Größe, SHA-256), wird bei
+jedem weiteren Start nur noch der Snapshot eingeblendet. Zahlen, Zeitpunkte
+und Kategorie-Codes bleiben dabei im eingeblendeten Speicher; Textspalten
+werden bei jedem Laden in Python-Strings dekodiert, ihr Aufwand wächst also
+mit Zeilen × Textspalten.
+
+Außerdem liegen hier die Bausteine der Datenvorbereitung (Leerzeichen
+entfernen, Handelsnamen aufteilen, Kategorien bilden). ``bereite_vor`` liefert
+daraus die flache, aufgeteilte Form, ``ze_modell`` die normalisierte.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import ze_snapshot
+from ze_snapshot import CACHE_VERZEICHNIS, SNAPSHOT_VERSION, snapshot_pfad
+
+# Datenvorbereitung: aufzuteilende Handelsnamen-Spalte, ihr Trennzeichen und
+# der Anteil verschiedener Werte, bis zu dem eine Spalte kategorial wird
+HANDELSNAMEN_SPALTE = 'Handelsnamen | Alternativbezeichnung, Synonym'
+HANDELSNAMEN_TRENNZEICHEN = '|'
+KATEGORIE_ANTEIL = 0.5
+# Alles außer Ziffern, Dezimalkomma und Minus in Beträgen wie '15.514,93 €'
+BETRAG_FREMDZEICHEN = r'[^0-9,\-]'
+
+
+def _dataframe_zu_arrays(df):
+    """
+    Zerlegt einen DataFrame in Snapshot-Arrays und Spaltenbeschreibungen.
+    """
+    arrays = {}
+    spalten = []
+    for i, name in enumerate(df.columns):
+        serie = df[name]
+        numpy_dtype = isinstance(serie.dtype, np.dtype)
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            # Nur die Codes und einmal die Kategorien ablegen
+            kategorien = serie.cat.categories
+            arrays[f'{i}.codes'] = serie.cat.codes.to_numpy()
+            puffer, offsets, arten = ze_snapshot.text_zu_arrays(kategorien.tolist())
+            arrays[f'{i}.puffer'] = puffer
+            arrays[f'{i}.offsets'] = offsets
+            arrays[f'{i}.arten'] = arten
+            spalten.append({'name': name, 'art': 'kategorie'})
+        elif numpy_dtype and serie.dtype.kind in 'biuf':
+            arrays[f'{i}.werte'] = serie.to_numpy()
+            spalten.append({'name': name, 'art': 'zahl'})
+        elif numpy_dtype and serie.dtype.kind == 'M':
+            arrays[f'{i}.werte'] = serie.to_numpy().astype('datetime64[ns]').view(np.int64)
+            spalten.append({'name': name, 'art': 'zeit'})
+        else:
+            puffer, offsets, arten = ze_snapshot.text_zu_arrays(serie.tolist(), serie.isna().to_numpy())
+            arrays[f'{i}.puffer'] = puffer
+            arrays[f'{i}.offsets'] = offsets
+            arrays[f'{i}.arten'] = arten
+            spalten.append({'name': name, 'art': 'text'})
+    return arrays, spalten
+
+
+def _arrays_zu_dataframe(arrays, spalten, zeilen):
+    """
+    Setzt einen DataFrame aus eingeblendeten Snapshot-Arrays zusammen.
+
+    Nur Zahlen- und Zeitspalten sowie die Codes von Kategorien verweisen auf
+    die eingeblendeten Arrays. Textspalten (und die Kategorien selbst) werden
+    aus Puffer und Offsets in Python-Objekte dekodiert, also vollständig
+    im Speicher angelegt.
+    """
+    daten = {}
+    for i, spalte in enumerate(spalten):
+        if spalte['art'] == 'kategorie':
+            kategorien = ze_snapshot.arrays_zu_text(arrays[f'{i}.puffer'], arrays[f'{i}.offsets'],
+                                                    arrays[f'{i}.arten'])
+            daten[spalte['name']] = pd.Series(pd.Categorical.from_codes(np.asarray(arrays[f'{i}.codes']),
+                                                                        kategorien))
+        elif spalte['art'] == 'zahl':
+            daten[spalte['name']] = pd.Series(arrays[f'{i}.werte'], copy=False)
+        elif spalte['art'] == 'zeit':
+            daten[spalte['name']] = pd.Series(arrays[f'{i}.werte'].view('datetime64[ns]'))
+        else:
+            werte = ze_snapshot.arrays_zu_text(arrays[f'{i}.puffer'], arrays[f'{i}.offsets'],
+                                               arrays[f'{i}.arten'], leer=np.nan)
+            daten[spalte['name']] = pd.Series(werte, dtype=None if werte else object)
+    index = pd.Index(np.asarray(arrays['index'])) if 'index' in arrays else pd.RangeIndex(zeilen)
+    df = pd.DataFrame(daten)
+    df.index = index
+    return df
+
+
+def schreibe_snapshot(df, pfad, signatur, cache_verzeichnis=None, stufe=None, zusatz=None):
+    """
+    Legt den Snapshot für eine geladene Excel-Datei an.
+
+    :param df: Aus der Excel-Datei gelesener (oder daraus vorbereiteter) DataFrame.
+    :param pfad: Pfad zur Excel-Datei.
+    :param signatur: Signatur der Excel-Datei zum Zeitpunkt des Einlesens.
+    :param cache_verzeichnis: Abweichendes Cache-Verzeichnis.
+    :param stufe: Verarbeitungsstufe, siehe ``snapshot_pfad``.
+    :param zusatz: Weitere NumPy-Arrays, die mit abgelegt werden (Name -> Array).
+    """
+    arrays, spalten = _dataframe_zu_arrays(df)
+    if not df.index.equals(pd.RangeIndex(len(df))):
+        arrays['index'] = df.index.to_numpy()
+    for name, array in (zusatz or {}).items():
+        arrays[f'zusatz.{name}'] = array
+    kopf = {'version': SNAPSHOT_VERSION, 'quelle': signatur, 'spalten': spalten, 'zeilen': len(df)}
+    ze_snapshot.schreibe_snapshot(snapshot_pfad(pfad, cache_verzeichnis, stufe), arrays, kopf)
+
+
+def lese_snapshot(pfad, cache_verzeichnis=None, stufe=None, mit_zusatz=False):
+    """
+    Liest den Snapshot zu einer Excel-Datei, sofern er noch aktuell ist.
+
+    :param pfad: Pfad zur Excel-Datei.
+    :param cache_verzeichnis: Abweichendes Cache-Verzeichnis.
+    :param stufe: Verarbeitungsstufe, siehe ``snapshot_pfad``.
+    :param mit_zusatz: Zusätzlich die mit abgelegten Arrays liefern.
+    :return: DataFrame (bzw. Tupel aus DataFrame und Zusatz-Arrays) oder None,
+        wenn kein gültiger Snapshot existiert.
+    """
+    gelesen = ze_snapshot.lese_snapshot(snapshot_pfad(pfad, cache_verzeichnis, stufe))
+    if gelesen is None:
+        return None
+    kopf, arrays = gelesen
+    if kopf.get('version') != SNAPSHOT_VERSION or not ze_snapshot.signatur_passt(kopf.get('quelle'), pfad):
+        return None
+    df = _arrays_zu_dataframe(arrays, kopf['spalten'], kopf['zeilen'])
+    if not mit_zusatz:
+        return df
+    zusatz = {name[len('zusatz.'):]: array for name, array in arrays.items() if name.startswith('zusatz.')}
+    return df, zusatz
+
+
+def lade_ze_liste(pfad, cache_verzeichnis=None, cache_nutzen=True):
+    """
+    Lädt die ZE-Liste, bevorzugt aus dem Snapshot.
+
+    Ist kein gültiger Snapshot vorhanden, wird die Excel-Datei geparst und der
+    Snapshot neu geschrieben. Kann der Snapshot nicht geschrieben werden
+    (z. B. schreibgeschütztes Verzeichnis), wird trotzdem der geladene
+    DataFrame zurückgegeben.
+
+    :param pfad: Pfad zur Excel-Datei.
+    :param cache_verzeichnis: Abweichendes Cache-Verzeichnis.
+    :param cache_nutzen: Bei False wird immer direkt aus der Excel-Datei gelesen.
+    :return: pandas DataFrame.
+    :raises FileNotFoundError: Wenn die Excel-Datei nicht existiert.
+    """
+    if not os.path.exists(pfad):
+        raise FileNotFoundError(pfad)
+    if not cache_nutzen:
+        return pd.read_excel(pfad, engine='openpyxl')
+
+    df = lese_snapshot(pfad, cache_verzeichnis)
+    if df is not None:
+        return df
+
+    signatur = ze_snapshot.datei_signatur(pfad)
+    df = pd.read_excel(pfad, engine='openpyxl')
+    try:
+        schreibe_snapshot(df, pfad, signatur, cache_verzeichnis)
+    except OSError:
+        pass
+    return df
+
+
+def _bereinige_werte(werte):
+    """
+    Entfernt Leerzeichen am Rand von Texten; andere Werte bleiben unverändert.
+    """
+    return np.array([w.strip() if isinstance(w, str) else w for w in werte.tolist()], dtype=object)
+
+
+def _faktorisiere(serie):
+    """
+    Zerlegt eine Textspalte in Codes und bereinigte, eindeutige Werte.
+
+    Die Bereinigung läuft nur über die verschiedenen Werte, nicht über jede Zelle.
+    Leere Zellen erhalten den Code -1.
+    """
+    codes, werte = pd.factorize(serie, use_na_sentinel=True)
+    # Werte, die sich nur durch Leerzeichen unterschieden haben, zusammenlegen
+    neue_codes, bereinigt = pd.factorize(_bereinige_werte(werte), use_na_sentinel=True)
+    codes = np.where(codes >= 0, np.append(neue_codes, -1)[codes], -1)
+    return codes, np.asarray(bereinigt, dtype=object)
+
+
+def _als_spalte(codes, werte, index):
+    """
+    Baut aus Codes und Werten eine Spalte; bei wenigen verschiedenen Werten kategorial.
+    """
+    if len(codes) and len(werte) <= KATEGORIE_ANTEIL * len(codes) \
+            and all(isinstance(w, str) for w in werte):
+        return pd.Series(pd.Categorical.from_codes(codes, werte), index=index)
+    zellen = np.append(werte, np.nan).astype(object)[codes]
+    return pd.Series(zellen, index=index, dtype=None if len(zellen) else object)
+
+
+def bereinige_spalten(df):
+    """
+    Entfernt Leerzeichen in Spaltennamen und Textzellen.
+
+    :param df: DataFrame wie aus der Excel-Datei gelesen (wird nicht verändert).
+    :return: Dictionary Spaltenname -> (codes, werte) für Textspalten bzw. NumPy-Array sonst.
+    """
+    spalten = {}
+    for name in df.columns:
+        serie = df[name]
+        if pd.api.types.is_object_dtype(serie.dtype) or pd.api.types.is_string_dtype(serie.dtype):
+            spalten[str(name).strip()] = _faktorisiere(serie)
+        else:
+            spalten[str(name).strip()] = serie.to_numpy()
+    return spalten
+
+
+def teile_auf(codes, werte, trennzeichen=HANDELSNAMEN_TRENNZEICHEN):
+    """
+    Teilt eine faktorisierte Textspalte am Trennzeichen auf.
+
+    Jeder verschiedene Wert wird nur einmal aufgeteilt; leere Zellen ergeben
+    genau einen leeren Teil.
+
+    :param codes: Codes der Spalte (-1 für leer).
+    :param werte: Bereinigte, eindeutige Werte.
+    :param trennzeichen: Trennzeichen.
+    :return: Tupel (zeilen, teil_codes, teil_werte): Ausgangszeile und Code jedes Teils.
+    """
+    teile = [w.split(trennzeichen) if isinstance(w, str) else [w] for w in werte] + [[np.nan]]
+    laengen = np.array([len(t) for t in teile], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(laengen)[:-1]))
+    teil_codes, teil_werte = _faktorisiere(pd.Series([t for liste in teile for t in liste], dtype=object))
+
+    pro_zeile = laengen[codes]
+    zeilen = np.repeat(np.arange(len(codes)), pro_zeile)
+    versatz = np.arange(len(zeilen)) - np.repeat(np.cumsum(pro_zeile) - pro_zeile, pro_zeile)
+    return zeilen, teil_codes[starts[codes][zeilen] + versatz], teil_werte
+
+
+def baue_dataframe(spalten, index):
+    """
+    Setzt bereinigte Spalten (siehe ``bereinige_spalten``) wieder zu einem DataFrame zusammen.
+
+    :param spalten: Dictionary wie von ``bereinige_spalten``.
+    :param index: Index des Ergebnisses.
+    :return: DataFrame.
+    """
+    daten = {}
+    for name, inhalt in spalten.items():
+        if isinstance(inhalt, tuple):
+            daten[name] = _als_spalte(inhalt[0], inhalt[1], index)
+        else:
+            daten[name] = pd.Series(inhalt, index=index)
+    return pd.DataFrame(daten, index=index)
+
+
+def bereite_vor(df, spalte=HANDELSNAMEN_SPALTE, trennzeichen=HANDELSNAMEN_TRENNZEICHEN):
+    """
+    Gemeinsame Datenvorbereitung in einem Durchgang, ohne Python-Aufruf pro Zelle.
+
+    Entfernt führende/nachfolgende Leerzeichen in Spaltennamen und allen
+    Textzellen (Zahlen in gemischten Spalten bleiben erhalten), teilt die
+    Handelsnamen-Spalte am Trennzeichen in eigene Zeilen auf und wandelt
+    Textspalten mit wenigen verschiedenen Werten in kategoriale Spalten um.
+    Der Index der Ausgangszeilen bleibt nach dem Aufteilen erhalten.
+
+    Jede Textspalte wird zuerst faktorisiert; Bereinigen und Aufteilen
+    betreffen dann nur die verschiedenen Werte, die Zeilen selbst werden
+    ausschließlich über NumPy-Indizes vervielfacht. Ohne vervielfachte Zeilen
+    kommt ``ze_modell.ZeModell`` aus.
+
+    :param df: DataFrame wie aus der Excel-Datei gelesen (wird nicht verändert).
+    :param spalte: Aufzuteilende Spalte; fehlt sie, wird nicht aufgeteilt.
+    :param trennzeichen: Trennzeichen zwischen mehreren Handelsnamen.
+    :return: Vorbereiteter DataFrame.
+    """
+    spalten = bereinige_spalten(df)
+    if not (spalte in spalten and isinstance(spalten[spalte], tuple)):
+        return baue_dataframe(spalten, df.index)
+
+    positionen, teil_codes, teil_werte = teile_auf(*spalten[spalte], trennzeichen)
+    for name, inhalt in spalten.items():
+        if name == spalte:
+            spalten[name] = (teil_codes, teil_werte)
+        elif isinstance(inhalt, tuple):
+            spalten[name] = (inhalt[0][positionen], inhalt[1])
+        else:
+            spalten[name] = inhalt[positionen]
+    return baue_dataframe(spalten, df.index[positionen])
+
+
+def lade_vorbereitet(pfad, cache_verzeichnis=None, cache_nutzen=True):
+    """
+    Lädt die ZE-Liste bereits vorbereitet (siehe ``bereite_vor``).
+
+    Das Ergebnis wird als eigener Snapshot neben dem der Rohdaten abgelegt und
+    gilt, solange sich die Excel-Datei nicht ändert.
+
+    :param pfad: Pfad zur Excel-Datei.
+    :param cache_verzeichnis: Abweichendes Cache-Verzeichnis.
+    :param cache_nutzen: Bei False wird immer neu gelesen und vorbereitet.
+    :return: Vorbereiteter DataFrame.
+    :raises FileNotFoundError: Wenn die Excel-Datei nicht existiert.
+    """
+    if not os.path.exists(pfad):
+        raise FileNotFoundError(pfad)
+    if not cache_nutzen:
+        return bereite_vor(lade_ze_liste(pfad, cache_nutzen=False))
+
+    df = lese_snapshot(pfad, cache_verzeichnis, 'vorbereitet')
+    if df is not None:
+        return df
+
+    signatur = ze_snapshot.datei_signatur(pfad)
+    df = bereite_vor(lade_ze_liste(pfad, cache_verzeichnis))
+    try:
+        schreibe_snapshot(df, pfad, signatur, cache_verzeichnis, 'vorbereitet')
+    except OSError:
+        pass
+    return df
+
+
+def betrag_als_zahl(werte):
+    """
+    Wandelt Beträge im deutschen Format ('15.514,93 €') in Zahlen um.
+
+    Das Euro-Zeichen ist in der Excel-Datei teils falsch kodiert ('\\x80'),
+    daher werden Tausenderpunkte, Währungszeichen und Leerraum einfach
+    verworfen. Zahlen (z. B. aus einer numerisch formatierten Zelle) bleiben
+    unverändert. Umgewandelt wird nur jeder verschiedene Wert einmal.
+
+    :param werte: Beträge als Text oder Zahl.
+    :return: float64-Array, NaN für leere oder unlesbare Werte.
+    """
+    codes, eindeutig = pd.factorize(pd.Series(werte, dtype=object), use_na_sentinel=True)
+    texte = pd.Series([w if isinstance(w, str) else None for w in eindeutig], dtype=object)
+    zahlen = np.array(pd.to_numeric(texte.str.replace(BETRAG_FREMDZEICHEN, '', regex=True).str.replace(',', '.'),
+                                    errors='coerce'), dtype=np.float64)
+    ist_zahl = np.array([isinstance(w, (int, float, np.number)) and not isinstance(w, bool) for w in eindeutig],
+                        dtype=bool)
+    zahlen[ist_zahl] = np.asarray(eindeutig[ist_zahl], dtype=np.float64)
+    return np.append(zahlen, np.nan)[codes]
+
+
+def prozess_speicher():
+    """
+    Liefert den aktuell belegten Arbeitsspeicher (RSS) des Prozesses in Bytes.
+
+    :return: RSS in Bytes oder None, wenn das Betriebssystem ihn nicht bereitstellt.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
@@ -0,0 +1,1188 @@
+"""
+Vorberechneter Suchindex für die Textspalten der ZE-Liste.
+
+Alle durchsuchbaren Texte werden beim Laden einmal normalisiert (casefold,
+Umlaute und Akzente gefaltet, Leerraum zusammengefasst). Suchanfragen werden
+genauso normalisiert und nur noch gegen diese vorbereiteten Texte geprüft.
+
+Für Begriffe ab drei Zeichen hält jede Spalte zusätzlich einen invertierten
+Trigramm-Index: Zu jedem Trigramm ist die sortierte Liste der Zeilen abgelegt,
+in denen es vorkommt. Eine Suche schneidet die Listen der Trigramme des
+Begriffs und prüft nur die verbleibenden Kandidaten.
+
+Suchbegriffe werden standardmäßig wörtlich genommen. Daneben gibt es die
+Modi Wortanfang, ganzes Wort, regulärer Ausdruck und eine unscharfe Suche
+über die Handelsnamen, die Tippfehler toleriert (siehe ``MODI``). Der Modus
+OPS-Kode sucht nicht im Text, sondern in der sortierten Liste der OPS-Kodes
+(``OpsIndex``): exakt, nach Präfix oder über einen Bereich von Unterkodes.
+
+Alle Indizes lassen sich als NumPy-Arrays ablegen (``als_arrays``) und ohne
+Neuaufbau wieder öffnen (``aus_arrays``), z. B. aus einem Snapshot.
+
+Das Modul benötigt nur NumPy, damit es auch ohne pandas genutzt werden kann.
+"""
+import functools
+import re
+import sys
+import time
+import unicodedata
+
+import numpy as np
+
+from ze_snapshot import arrays_zu_text, text_zu_arrays
+
+try:
+    from re import _constants as _sre_konstanten, _parser as _sre_parser
+except ImportError:  # Python < 3.11
+    import sre_constants as _sre_konstanten
+    import sre_parse as _sre_parser
+
+# Trennzeichen zwischen den Zeilen im zusammenhängenden Suchtext. Es kann in
+# normalisierten Suchbegriffen nicht vorkommen, Treffer überspannen also nie
+# zwei Zeilen.
+TRENNER = '\x00'
+
+N_GRAMM = 3
+
+# Suchmodi
+LITERAL = 'literal'
+PRAEFIX = 'praefix'
+WORT = 'wort'
+REGEX = 'regex'
+FUZZY = 'fuzzy'
+OPS_KODE = 'ops'
+MODI = {
+    LITERAL: 'Enthält (wörtlich)',
+    PRAEFIX: 'Wortanfang',
+    WORT: 'Ganzes Wort',
+    REGEX: 'Regulärer Ausdruck',
+    FUZZY: 'Unscharf (Tippfehler im Handelsnamen)',
+    OPS_KODE: "OPS-Kode ('6-002.p1', '8-810.*', '6-002.p1..p9')",
+}
+
+MUSTER_CACHE_GROESSE = 256
+MAX_REGEX_LAENGE = 200
+REGEX_ZEITLIMIT = 0.5  # Sekunden pro Suche
+
+# Unscharfe Suche: Trennzeichen zwischen Handelsnamen, entfernte Markenzeichen,
+# maximaler Editierabstand und Länge des Präfixes für das Löschwörterbuch
+HANDELSNAMEN_TRENNER = re.compile(r'[|,;]')
+MARKENZEICHEN = re.compile('[®™©]')
+MAX_ABSTAND = 2
+PRAEFIX_LAENGE = 7
+FUZZY_TOP_K = 10
+
+# Spaltenname, unter dem die Synonyme eines Modells indiziert werden
+SYNONYMSPALTE = 'Synonym'
+
+# OPS-Kodes werden ohne Punkt, Bindestrich und Leerraum verglichen ('6-001.19' == '600119')
+OPS_FREMDZEICHEN = r'[^0-9a-z*]'
+OPS_BEREICH = '..'
+_OPS_FREMDZEICHEN = re.compile(OPS_FREMDZEICHEN)
+# Sieht die Eingabe wie ein OPS-Kode aus ('6-002', '6002p1', '8-810.*')?
+_OPS_FORM = re.compile(r'\s*\d-?\d{2}[0-9a-z](?:\.?[0-9a-z]{0,2})?\*?\s*(?:\.\..*)?$', re.IGNORECASE)
+# Größer als jedes Zeichen in einem Schlüssel, begrenzt Präfixbereiche
+_OPS_ENDE = '\U0010ffff'
+
+_KOMBINIEREND = re.compile('[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]')
+_SONDERLEERRAUM = re.compile(r'[^\S ]')
+_MEHRFACHLEER = re.compile('  +')
+
+
+def _normalisiere_block(text):
+    """
+    Normalisiert einen Block aus mehreren durch TRENNER getrennten Texten in einem Durchgang.
+    """
+    text = unicodedata.normalize('NFKD', text.casefold())
+    text = _KOMBINIEREND.sub('', text)
+    text = _MEHRFACHLEER.sub(' ', _SONDERLEERRAUM.sub(' ', text))
+    return text.replace(' ' + TRENNER, TRENNER).replace(TRENNER + ' ', TRENNER).strip(' ')
+
+
+def normalisiere(text):
+    """
+    Normalisiert einen Text für die Suche.
+
+    Groß-/Kleinschreibung wird per ``casefold`` aufgehoben (ß -> ss), Umlaute und
+    Akzente werden auf den Grundbuchstaben zurückgeführt (ä -> a) und Leerraum
+    wird zu einzelnen Leerzeichen zusammengefasst.
+
+    :param text: Eingabetext.
+    :return: Normalisierter Text.
+    """
+    return _normalisiere_block(text.replace(TRENNER, ' '))
+
+
+def normalisiere_alle(texte):
+    """
+    Normalisiert viele Texte auf einmal; gleichwertig zu ``[normalisiere(t) for t in texte]``.
+
+    :param texte: Liste von Texten.
+    :return: Liste normalisierter Texte.
+    """
+    if not texte:
+        return []
+    return _normalisiere_block(TRENNER.join(text.replace(TRENNER, ' ') for text in texte)).split(TRENNER)
+
+
+def als_text(wert):
+    """
+    Wandelt einen Zellwert in Text um; leere Zellen werden zu ''.
+    """
+    if isinstance(wert, str):
+        return wert
+    if isinstance(wert, (int, float, np.integer, np.floating)) and wert == wert:
+        return str(wert)
+    return ''
+
+
+class SuchFehler(ValueError):
+    """
+    Ungültige oder zu aufwendige Suchanfrage.
+    """
+
+
+_WIEDERHOLUNGEN = {getattr(_sre_konstanten, name) for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+                   if hasattr(_sre_konstanten, name)}
+
+
+def _verschachtelte_wiederholung(teilmuster, in_wiederholung=False):
+    """
+    Prüft ein geparstes Muster auf variable Wiederholungen innerhalb variabler
+    Wiederholungen, z. B. ``(a+)+``. Solche Muster können exponentiell lange laufen.
+    """
+    for op, argument in teilmuster:
+        if op in _WIEDERHOLUNGEN:
+            minimum, maximum, inhalt = argument
+            variabel = maximum != minimum and maximum > 1
+            if variabel and in_wiederholung:
+                return True
+            if _verschachtelte_wiederholung(inhalt, in_wiederholung or variabel):
+                return True
+        elif op is _sre_konstanten.SUBPATTERN:
+            if _verschachtelte_wiederholung(argument[-1], in_wiederholung):
+                return True
+        elif op is _sre_konstanten.BRANCH:
+            if any(_verschachtelte_wiederholung(zweig, in_wiederholung) for zweig in argument[1]):
+                return True
+        elif op in (_sre_konstanten.ASSERT, _sre_konstanten.ASSERT_NOT):
+            if _verschachtelte_wiederholung(argument[1], in_wiederholung):
+                return True
+        elif getattr(_sre_konstanten, 'ATOMIC_GROUP', None) is op:
+            if _verschachtelte_wiederholung(argument, in_wiederholung):
+                return True
+    return False
+
+
+def pruefe_regex(muster):
+    """
+    Weist reguläre Ausdrücke zurück, die den Server blockieren könnten.
+
+    :param muster: Regulärer Ausdruck des Benutzers.
+    :raises SuchFehler: Bei ungültigen, zu langen oder zu aufwendigen Mustern.
+    """
+    if len(muster) > MAX_REGEX_LAENGE:
+        raise SuchFehler(f"Der reguläre Ausdruck ist zu lang (max. {MAX_REGEX_LAENGE} Zeichen).")
+    try:
+        geparst = _sre_parser.parse(muster)
+    except re.error as e:
+        raise SuchFehler(f"Ungültiger regulärer Ausdruck: {e}") from None
+    if any(op in (_sre_konstanten.GROUPREF, _sre_konstanten.GROUPREF_EXISTS) for op, _ in _alle_knoten(geparst)):
+        raise SuchFehler("Rückverweise sind in regulären Ausdrücken nicht erlaubt.")
+    if _verschachtelte_wiederholung(geparst):
+        raise SuchFehler("Verschachtelte Wiederholungen wie '(a+)+' sind nicht erlaubt.")
+
+
+def _alle_knoten(teilmuster):
+    for op, argument in teilmuster:
+        yield op, argument
+        if isinstance(argument, _sre_parser.SubPattern):
+            yield from _alle_knoten(argument)
+        elif isinstance(argument, (tuple, list)):
+            for teil in argument:
+                if isinstance(teil, _sre_parser.SubPattern):
+                    yield from _alle_knoten(teil)
+                elif isinstance(teil, list):
+                    for zweig in teil:
+                        if isinstance(zweig, _sre_parser.SubPattern):
+                            yield from _alle_knoten(zweig)
+
+
+@functools.lru_cache(maxsize=MUSTER_CACHE_GROESSE)
+def kompiliere_muster(begriff, modus):
+    """
+    Übersetzt einen Suchbegriff in ein kompiliertes Muster (mit LRU-Cache).
+
+    Für Wortanfang und ganzes Wort wird der bereits normalisierte Begriff
+    maskiert. Reguläre Ausdrücke werden geprüft und wie die Texte von Umlauten
+    und Akzenten befreit, Groß-/Kleinschreibung wird ignoriert.
+
+    :param begriff: Suchbegriff (für PRAEFIX und WORT bereits normalisiert).
+    :param modus: PRAEFIX, WORT oder REGEX.
+    :return: Kompiliertes ``re.Pattern``.
+    :raises SuchFehler: Bei ungültigem Modus oder unzulässigem Muster.
+    """
+    if modus == PRAEFIX:
+        return re.compile(r'(?<!\w)' + re.escape(begriff))
+    if modus == WORT:
+        return re.compile(r'(?<!\w)' + re.escape(begriff) + r'(?!\w)')
+    if modus == REGEX:
+        pruefe_regex(begriff)
+        gefaltet = _KOMBINIEREND.sub('', unicodedata.normalize('NFKD', begriff)).replace('ß', 'ss')
+        return re.compile(gefaltet, re.IGNORECASE)
+    raise SuchFehler(f"Unbekannter Suchmodus: {modus}")
+
+
+def ops_schluessel(kode):
+    """
+    Vergleichsschlüssel eines OPS-Kodes: klein geschrieben, nur Ziffern, Buchstaben und '*'.
+    """
+    return _OPS_FREMDZEICHEN.sub('', als_text(kode).lower())
+
+
+def ist_ops_kode(begriff):
+    """
+    Prüft, ob eine Eingabe wie ein (Teil-)OPS-Kode aussieht, z. B. '6-002.p1', '8-810.*'.
+    """
+    return bool(_OPS_FORM.match(begriff))
+
+
+def trigramm_schluessel(ziffern, basis):
+    """
+    Bildet aus dicht nummerierten Zeichen die Schlüssel aller Trigramme.
+
+    :param ziffern: Zeichen als Ziffern 0 .. basis - 1 (int64-Array).
+    :param basis: Größe des Alphabets.
+    :return: int64-Array mit len(ziffern) - 2 Schlüsseln.
+    """
+    return (ziffern[:-2] * basis + ziffern[1:-1]) * basis + ziffern[2:]
+
+
+def _codepunkte(text):
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+
+class SpaltenIndex:
+    """
+    Normalisierte Texte einer Spalte samt zusammenhängendem Suchtext und Trigramm-Index.
+    """
+
+    def __init__(self, werte):
+        self.texte = normalisiere_alle([als_text(wert) for wert in werte])
+        self._gesamt = TRENNER.join(self.texte) + TRENNER
+        laengen = np.fromiter((len(text) + 1 for text in self.texte), dtype=np.int64, count=len(self.texte))
+        self._starts = np.zeros(len(self.texte) + 1, dtype=np.int64)
+        np.cumsum(laengen, out=self._starts[1:])
+        self._baue_trigramme(laengen)
+
+    def _baue_trigramme(self, laengen):
+        """
+        Baut die Posting-Listen vollständig vektorisiert auf.
+
+        Die vorkommenden Zeichen werden dicht durchnummeriert (Alphabet), sodass
+        Trigramm und Zeilennummer gemeinsam in einen int64-Wert passen. Ein
+        einziges ``np.sort`` liefert dann alle Posting-Listen auf einmal.
+        """
+        codepunkte = _codepunkte(self._gesamt)
+        vorhanden = np.zeros(0x110000, dtype=bool)
+        vorhanden[codepunkte] = True
+        vorhanden[0] = True  # TRENNER erhält immer die Ziffer 0
+        self._alphabet = np.flatnonzero(vorhanden).astype(np.uint32)
+        if len(codepunkte) < N_GRAMM:
+            self._schluessel = np.zeros(0, dtype=np.int64)
+            self._grenzen = np.zeros(1, dtype=np.int64)
+            self._postings = np.zeros(0, dtype=np.int32)
+            return
+
+        basis = len(self._alphabet)
+        ziffern = np.searchsorted(self._alphabet, codepunkte).astype(np.int64)
+        schluessel = trigramm_schluessel(ziffern, basis)
+        zeilen = np.repeat(np.arange(len(self.texte), dtype=np.int64), laengen)[:len(schluessel)]
+        # Trigramme, die über eine Zeilengrenze reichen, verwerfen
+        gueltig = (ziffern[:-2] != 0) & (ziffern[1:-1] != 0) & (ziffern[2:] != 0)
+        schluessel = schluessel[gueltig]
+        zeilen = zeilen[gueltig]
+
+        # Nach (Trigramm, Zeile) sortieren und Doppelte innerhalb einer Zeile entfernen
+        anzahl = max(len(self.texte), 1)
+        if basis ** 3 * anzahl < 2 ** 62:
+            kombiniert = np.sort(schluessel * anzahl + zeilen)
+            neu = np.ones(len(kombiniert), dtype=bool)
+            neu[1:] = kombiniert[1:] != kombiniert[:-1]
+            schluessel, zeilen = np.divmod(kombiniert[neu], anzahl)
+        else:
+            reihenfolge = np.lexsort((zeilen, schluessel))
+            schluessel = schluessel[reihenfolge]
+            zeilen = zeilen[reihenfolge]
+            neu = np.ones(len(schluessel), dtype=bool)
+            neu[1:] = (schluessel[1:] != schluessel[:-1]) | (zeilen[1:] != zeilen[:-1])
+            schluessel = schluessel[neu]
+            zeilen = zeilen[neu]
+        self._postings = zeilen.astype(np.int32)
+
+        # Posting-Liste i liegt in _postings[_grenzen[i]:_grenzen[i + 1]]
+        if len(schluessel):
+            anfaenge = np.concatenate(([0], np.flatnonzero(schluessel[1:] != schluessel[:-1]) + 1))
+        else:
+            anfaenge = np.zeros(0, dtype=np.int64)
+        self._schluessel = schluessel[anfaenge]
+        self._grenzen = np.append(anfaenge, len(schluessel)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.texte)
+
+    def als_arrays(self):
+        """
+        Der fertige Index als NumPy-Arrays (siehe ``aus_arrays``).
+        """
+        return {
+            'gesamt': np.frombuffer(self._gesamt.encode('utf-8'), dtype=np.uint8),
+            'starts': self._starts,
+            'alphabet': self._alphabet,
+            'schluessel': self._schluessel,
+            'grenzen': self._grenzen,
+            'postings': self._postings,
+        }
+
+    @classmethod
+    def aus_arrays(cls, arrays):
+        """
+        Öffnet einen mit ``als_arrays`` abgelegten Index ohne Neuaufbau.
+        """
+        index = cls.__new__(cls)
+        index._gesamt = bytes(arrays['gesamt']).decode('utf-8')
+        index.texte = index._gesamt.split(TRENNER)[:-1]
+        for name in ('starts', 'alphabet', 'schluessel', 'grenzen', 'postings'):
+            # Eingeblendete Arrays (np.memmap) als einfache Sichten, damit Treffer normale Arrays sind
+            setattr(index, '_' + name, np.asarray(arrays[name]))
+        return index
+
+    def kandidaten(self, begriff):
+        """
+        Liefert die Zeilen, die alle Trigramme des Begriffs enthalten.
+
+        :param begriff: Normalisierter Suchbegriff mit mindestens drei Zeichen.
+        :return: Aufsteigend sortierte Kandidatenzeilen (Obermenge der Treffer).
+        """
+        codepunkte = _codepunkte(begriff)
+        ziffern = np.searchsorted(self._alphabet, codepunkte)
+        # Zeichen, die in der Spalte nie vorkommen, schließen jeden Treffer aus
+        if np.any(ziffern >= len(self._alphabet)) or np.any(self._alphabet[ziffern] != codepunkte):
+            return np.zeros(0, dtype=np.int32)
+        gesucht = np.unique(trigramm_schluessel(ziffern.astype(np.int64), len(self._alphabet)))
+        positionen = np.searchsorted(self._schluessel, gesucht)
+        # Fehlt auch nur ein Trigramm im Index, kann es keinen Treffer geben
+        if np.any(positionen >= len(self._schluessel)) or np.any(self._schluessel[positionen] != gesucht):
+            return np.zeros(0, dtype=np.int32)
+
+        listen = sorted((self._postings[self._grenzen[p]:self._grenzen[p + 1]] for p in positionen), key=len)
+        ergebnis = listen[0]
+        for liste in listen[1:]:
+            if len(ergebnis) == 0:
+                break
+            ergebnis = np.intersect1d(ergebnis, liste, assume_unique=True)
+        return ergebnis
+
+    def finde(self, begriff):
+        """
+        Findet alle Zeilen, deren normalisierter Text den Begriff enthält.
+
+        :param begriff: Bereits normalisierter Suchbegriff.
+        :return: Aufsteigend sortierte Zeilennummern.
+        """
+        if not begriff:
+            return np.arange(len(self.texte), dtype=np.int64)
+        if len(begriff) >= N_GRAMM:
+            texte = self.texte
+            treffer = [zeile for zeile in self.kandidaten(begriff).tolist() if begriff in texte[zeile]]
+            return np.asarray(treffer, dtype=np.int64)
+        return self._durchsuche(begriff)
+
+    def enthaelt(self, zeilen, begriff):
+        """
+        Behält nur die Zeilen, deren normalisierter Text den Begriff enthält.
+
+        :param zeilen: Zu prüfende, aufsteigend sortierte Zeilennummern.
+        :param begriff: Normalisierter Suchbegriff.
+        :return: Aufsteigend sortierte Zeilennummern.
+        """
+        texte = self.texte
+        return np.asarray([zeile for zeile in zeilen.tolist() if begriff in texte[zeile]], dtype=np.int64)
+
+    def filtere(self, zeilen, muster, frist=None):
+        """
+        Behält nur die Zeilen, deren normalisierter Text auf das Muster passt.
+
+        :param zeilen: Zu prüfende Zeilennummern (Standard: alle).
+        :param muster: Kompiliertes ``re.Pattern``.
+        :param frist: Zeitpunkt (``time.monotonic``), nach dem abgebrochen wird.
+        :return: Aufsteigend sortierte Zeilennummern.
+        :raises SuchFehler: Wenn die Frist überschritten wird.
+        """
+        texte = self.texte
+        if zeilen is None:
+            zeilen = range(len(texte))
+        else:
+            zeilen = zeilen.tolist()
+        treffer = []
+        suche = muster.search
+        for i, zeile in enumerate(zeilen):
+            if frist is not None and i % 1024 == 0 and time.monotonic() > frist:
+                raise SuchFehler("Die Suche wurde wegen Zeitüberschreitung abgebrochen. Bitte das Muster eingrenzen.")
+            if suche(texte[zeile]):
+                treffer.append(zeile)
+        return np.asarray(treffer, dtype=np.int64)
+
+    def _durchsuche(self, begriff):
+        """
+        Linearer Durchlauf über den zusammenhängenden Suchtext (für kurze Begriffe).
+        """
+        positionen = [treffer.start() for treffer in re.finditer(re.escape(begriff), self._gesamt)]
+        zeilen = np.searchsorted(self._starts, np.asarray(positionen, dtype=np.int64), side='right') - 1
+        return np.unique(zeilen)
+
+    def speicherbedarf(self):
+        """
+        Schätzt den Speicherbedarf des Spaltenindex in Bytes.
+        """
+        return (sys.getsizeof(self._gesamt) + self._starts.nbytes + sum(sys.getsizeof(t) for t in self.texte)
+                + self._alphabet.nbytes + self._schluessel.nbytes + self._grenzen.nbytes + self._postings.nbytes)
+
+
+def editierabstand(a, b, grenze=MAX_ABSTAND):
+    """
+    Optimal-String-Alignment-Abstand (Levenshtein mit Vertauschung benachbarter Zeichen).
+
+    :param a: Erster Text.
+    :param b: Zweiter Text.
+    :param grenze: Ab diesem Abstand wird abgebrochen.
+    :return: Abstand oder ``grenze + 1``, wenn er größer als ``grenze`` ist.
+    """
+    if abs(len(a) - len(b)) > grenze:
+        return grenze + 1
+    vorvorige = None
+    vorige = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        aktuelle = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            kosten = a[i - 1] != b[j - 1]
+            wert = min(vorige[j] + 1, aktuelle[j - 1] + 1, vorige[j - 1] + kosten)
+            if vorvorige is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                wert = min(wert, vorvorige[j - 2] + 1)
+            aktuelle[j] = wert
+        if min(aktuelle) > grenze:
+            return grenze + 1
+        vorvorige, vorige = vorige, aktuelle
+    return vorige[-1] if vorige[-1] <= grenze else grenze + 1
+
+
+def _loeschungen(wort, abstand):
+    """
+    Alle Varianten eines Wortes, die durch Löschen von bis zu ``abstand`` Zeichen entstehen.
+    """
+    ergebnis = {wort}
+    ebene = {wort}
+    for _ in range(abstand):
+        ebene = {variante[:i] + variante[i + 1:] for variante in ebene for i in range(len(variante))}
+        ergebnis |= ebene
+    return ergebnis
+
+
+class FuzzyTreffer:
+    """
+    Ein Handelsname aus dem Vokabular mit Abstand zum Suchbegriff und den zugehörigen Zeilen.
+    """
+    __slots__ = ('name', 'abstand', 'zeilen')
+
+    def __init__(self, name, abstand, zeilen):
+        self.name = name
+        self.abstand = abstand
+        self.zeilen = zeilen
+
+    def __repr__(self):
+        return f"FuzzyTreffer({self.name!r}, abstand={self.abstand}, zeilen={len(self.zeilen)})"
+
+
+class FuzzyIndex:
+    """
+    Unscharfe Suche über das deduplizierte Handelsnamen-Vokabular (SymSpell-Verfahren).
+
+    Jeder Name wird an '|', ',' und ';' getrennt, normalisiert und von
+    Markenzeichen befreit. Ins Vokabular kommen der ganze Name und bei
+    mehrteiligen Namen zusätzlich jedes Wort ab vier Zeichen. Für jeden
+    Vokabeleintrag werden beim Aufbau alle Löschvarianten seines Präfixes
+    abgelegt; eine Suche erzeugt die Löschvarianten des Begriffs, schlägt sie
+    nach und berechnet den echten Abstand nur für diese wenigen Kandidaten.
+
+    :param werte: Zellwerte der Handelsnamen-Spalte(n), eine Liste pro Spalte.
+    """
+
+    def __init__(self, *werte):
+        zeilen_pro_name = {}
+        anzeige = {}
+        for spaltenwerte in werte:
+            for zeile, wert in enumerate(spaltenwerte):
+                for teil in HANDELSNAMEN_TRENNER.split(als_text(wert)):
+                    roh = MARKENZEICHEN.sub('', teil).strip()
+                    name = normalisiere(roh)
+                    if not name:
+                        continue
+                    begriffe = {name}
+                    woerter = re.findall(r'\w+', name)
+                    if len(woerter) > 1:
+                        begriffe.update(wort for wort in woerter if len(wort) >= 4)
+                    for begriff in begriffe:
+                        zeilen_pro_name.setdefault(begriff, set()).add(zeile)
+                        anzeige.setdefault(begriff, roh if begriff == name else begriff)
+
+        self.namen = sorted(zeilen_pro_name)
+        self.anzeige = [anzeige[name] for name in self.namen]
+        self.zeilen = [np.array(sorted(zeilen_pro_name[name]), dtype=np.int64) for name in self.namen]
+        self._woerterbuch = None
+
+    def __len__(self):
+        return len(self.namen)
+
+    @property
+    def _loeschwoerterbuch(self):
+        # Erst bei der ersten unscharfen Suche aufbauen
+        if self._woerterbuch is None:
+            woerterbuch = {}
+            for nummer, name in enumerate(self.namen):
+                for variante in _loeschungen(name[:PRAEFIX_LAENGE], MAX_ABSTAND):
+                    woerterbuch.setdefault(variante, []).append(nummer)
+            self._woerterbuch = woerterbuch
+        return self._woerterbuch
+
+    def als_arrays(self):
+        """
+        Vokabular und Zeilenlisten als NumPy-Arrays (siehe ``aus_arrays``).
+        """
+        arrays = {}
+        for name, texte in (('namen', self.namen), ('anzeige', self.anzeige)):
+            puffer, offsets, arten = text_zu_arrays(texte)
+            arrays.update({f'{name}.puffer': puffer, f'{name}.offsets': offsets, f'{name}.arten': arten})
+        laengen = np.array([len(z) for z in self.zeilen], dtype=np.int64)
+        arrays['zeilen.grenzen'] = np.concatenate(([0], np.cumsum(laengen)))
+        arrays['zeilen.werte'] = np.concatenate(self.zeilen) if self.zeilen else np.zeros(0, dtype=np.int64)
+        return arrays
+
+    @classmethod
+    def aus_arrays(cls, arrays):
+        """
+        Öffnet ein mit ``als_arrays`` abgelegtes Vokabular; das Löschwörterbuch entsteht bei Bedarf.
+        """
+        index = cls.__new__(cls)
+        index.namen = arrays_zu_text(arrays['namen.puffer'], arrays['namen.offsets'], arrays['namen.arten'])
+        index.anzeige = arrays_zu_text(arrays['anzeige.puffer'], arrays['anzeige.offsets'], arrays['anzeige.arten'])
+        grenzen = arrays['zeilen.grenzen']
+        werte = np.asarray(arrays['zeilen.werte'])
+        index.zeilen = [werte[grenzen[i]:grenzen[i + 1]] for i in range(len(index.namen))]
+        index._woerterbuch = None
+        return index
+
+    def suche(self, suchbegriff, k=FUZZY_TOP_K, max_abstand=None):
+        """
+        Liefert die k ähnlichsten Handelsnamen.
+
+        Sortiert wird nach Editierabstand, dann nach Längenunterschied und
+        zuletzt nach der Anzahl der zugehörigen ZE-Zeilen.
+
+        :param suchbegriff: Suchbegriff in beliebiger Schreibweise.
+        :param k: Anzahl der gewünschten Treffer.
+        :param max_abstand: Größter erlaubter Abstand (Standard: 1 bis 4 Zeichen, sonst 2).
+        :return: Liste von FuzzyTreffer.
+        """
+        begriff = normalisiere(MARKENZEICHEN.sub('', suchbegriff))
+        if not begriff:
+            return []
+        if max_abstand is None:
+            max_abstand = 1 if len(begriff) <= 4 else MAX_ABSTAND
+        max_abstand = min(max_abstand, MAX_ABSTAND)
+
+        kandidaten = set()
+        for variante in _loeschungen(begriff[:PRAEFIX_LAENGE], max_abstand):
+            kandidaten.update(self._loeschwoerterbuch.get(variante, ()))
+
+        bewertet = []
+        for nummer in kandidaten:
+            name = self.namen[nummer]
+            abstand = editierabstand(begriff, name, max_abstand)
+            if abstand <= max_abstand:
+                bewertet.append((abstand, abs(len(name) - len(begriff)), -len(self.zeilen[nummer]), name, nummer))
+        bewertet.sort()
+        return [FuzzyTreffer(self.anzeige[nummer], abstand, self.zeilen[nummer])
+                for abstand, _, _, _, nummer in bewertet[:k]]
+
+    def speicherbedarf(self):
+        """
+        Schätzt den Speicherbedarf des Vokabulars und Löschwörterbuchs in Bytes.
+        """
+        groesse = sum(sys.getsizeof(name) for name in self.namen) + sum(z.nbytes for z in self.zeilen)
+        if self._woerterbuch is not None:
+            groesse += sys.getsizeof(self._woerterbuch) + sum(sys.getsizeof(v) + sys.getsizeof(n)
+                                                              for v, n in self._woerterbuch.items())
+        return groesse
+
+
+class SuchIndex:
+    """
+    Suchindex über mehrere Spalten einer Tabelle.
+
+    :param tabelle: DataFrame oder Mapping Spaltenname -> Werte.
+    :param spalten: Zu indizierende Spalten; fehlende Spalten werden übergangen.
+    :param fuzzy_spalten: Handelsnamen-Spalten für die unscharfe Suche.
+    """
+
+    def __init__(self, tabelle, spalten, fuzzy_spalten=()):
+        self.spalten = {}
+        for spalte in spalten:
+            if spalte in tabelle:
+                self.spalten[spalte] = SpaltenIndex(list(tabelle[spalte]))
+        self.fuzzy = FuzzyIndex(*(list(tabelle[spalte]) for spalte in fuzzy_spalten if spalte in tabelle))
+
+    def als_arrays(self, praefix=''):
+        """
+        Alle Spaltenindizes und das Fuzzy-Vokabular als flaches Dictionary von NumPy-Arrays.
+
+        :param praefix: Vorangestellter Name, um mehrere Indizes in einem Snapshot abzulegen.
+        """
+        puffer, offsets, arten = text_zu_arrays(list(self.spalten))
+        arrays = {f'{praefix}spalten.puffer': puffer, f'{praefix}spalten.offsets': offsets,
+                  f'{praefix}spalten.arten': arten}
+        for i, index in enumerate(self.spalten.values()):
+            arrays.update({f'{praefix}{i}.{name}': array for name, array in index.als_arrays().items()})
+        arrays.update({f'{praefix}fuzzy.{name}': array for name, array in self.fuzzy.als_arrays().items()})
+        return arrays
+
+    @classmethod
+    def aus_arrays(cls, arrays, praefix=''):
+        """
+        Öffnet einen mit ``als_arrays`` abgelegten Suchindex ohne Neuaufbau.
+        """
+        index = cls.__new__(cls)
+        namen = arrays_zu_text(arrays[f'{praefix}spalten.puffer'], arrays[f'{praefix}spalten.offsets'],
+                               arrays[f'{praefix}spalten.arten'])
+        index.spalten = {name: SpaltenIndex.aus_arrays(_teil(arrays, f'{praefix}{i}.'))
+                         for i, name in enumerate(namen)}
+        index.fuzzy = FuzzyIndex.aus_arrays(_teil(arrays, f'{praefix}fuzzy.'))
+        return index
+
+    def fuzzy_treffer(self, suchbegriff, k=FUZZY_TOP_K):
+        """
+        Die k ähnlichsten Handelsnamen zum Suchbegriff (siehe ``FuzzyIndex.suche``).
+        """
+        return self.fuzzy.suche(suchbegriff, k)
+
+    def suche(self, suchbegriff, spalten=None, modus=LITERAL, zeitlimit=REGEX_ZEITLIMIT, kandidaten=None):
+        """
+        Sucht den Begriff in den angegebenen Spalten.
+
+        Im Modus LITERAL wird der Begriff als Teilzeichenkette gesucht. PRAEFIX
+        und WORT verlangen zusätzlich eine Wortgrenze vor bzw. vor und nach dem
+        Begriff; beide nutzen den Trigramm-Index für die Kandidaten. REGEX prüft
+        jede Zeile mit dem regulären Ausdruck und bricht nach ``zeitlimit``
+        Sekunden ab. FUZZY sucht unscharf in den Handelsnamen und liefert die
+        Zeilen nach Ähnlichkeit sortiert statt aufsteigend.
+
+        :param suchbegriff: Suchbegriff in beliebiger Schreibweise.
+        :param spalten: Zu durchsuchende Spalten (Standard: alle indizierten).
+        :param modus: Einer der Schlüssel aus ``MODI``.
+        :param zeitlimit: Maximale Laufzeit einer Regex-Suche in Sekunden.
+        :param kandidaten: Nur diese Zeilen prüfen (z. B. das Ergebnis einer vorherigen Suche).
+        :return: Aufsteigend sortierte Zeilennummern aller Treffer.
+        :raises SuchFehler: Bei unbekanntem Modus, unzulässigem Muster oder Zeitüberschreitung.
+        """
+        if modus not in MODI:
+            raise SuchFehler(f"Unbekannter Suchmodus: {modus}")
+        if modus == OPS_KODE:
+            raise SuchFehler("Die Suche nach OPS-Kodes braucht einen OpsIndex (siehe ModellIndex)")
+        indizes = [self.spalten[spalte] for spalte in (self.spalten if spalten is None else spalten)
+                   if spalte in self.spalten]
+
+        if modus == FUZZY:
+            zeilen = [treffer.zeilen for treffer in self.fuzzy_treffer(suchbegriff)]
+            if not zeilen:
+                return np.zeros(0, dtype=np.int64)
+            zeilen = np.concatenate(zeilen)
+            # Reihenfolge nach Rang erhalten, Doppelte entfernen
+            _, erste = np.unique(zeilen, return_index=True)
+            zeilen = zeilen[np.sort(erste)]
+            if kandidaten is not None:
+                zeilen = zeilen[np.isin(zeilen, kandidaten)]
+            return zeilen
+
+        if modus == REGEX:
+            muster = kompiliere_muster(suchbegriff, REGEX)
+            frist = time.monotonic() + zeitlimit
+            treffer = [index.filtere(kandidaten, muster, frist) for index in indizes]
+        else:
+            begriff = normalisiere(suchbegriff)
+            if kandidaten is None:
+                treffer = [index.finde(begriff) for index in indizes]
+            else:
+                treffer = [index.enthaelt(kandidaten, begriff) for index in indizes]
+            if modus != LITERAL and begriff:
+                muster = kompiliere_muster(begriff, modus)
+                treffer = [index.filtere(zeilen, muster) for index, zeilen in zip(indizes, treffer)]
+
+        if not treffer:
+            return np.zeros(0, dtype=np.int64)
+        if len(treffer) == 1:
+            return treffer[0]
+        return np.unique(np.concatenate(treffer))
+
+    def speicherbedarf(self):
+        """
+        Schätzt den Speicherbedarf des Index in Bytes.
+        """
+        return sum(index.speicherbedarf() for index in self.spalten.values()) + self.fuzzy.speicherbedarf()
+
+
+def index_konfiguration(suchspalten, fuzzy_spalten):
+    """
+    Beschreibt, für welche Spalten ein gespeicherter Modellindex aufgebaut wurde.
+    """
+    return [f'suche:{s}' for s in suchspalten] + [f'fuzzy:{s}' for s in fuzzy_spalten]
+
+
+def _teil(arrays, praefix):
+    return {name[len(praefix):]: array for name, array in arrays.items() if name.startswith(praefix)}
+
+
+class Synonymtabelle:
+    """
+    Integer-Verweise von Synonymen auf Zeilen der Stammtabelle.
+
+    :param zeilen: Stammzeile je Synonym (aufsteigend sortiert).
+    :param codes: Nummer des Namens je Synonym.
+    :param namen: Verschiedene Namen (Position = Nummer).
+    """
+
+    def __init__(self, zeilen, codes, namen):
+        self.zeilen = np.asarray(zeilen, dtype=np.int32)
+        self.codes = np.asarray(codes, dtype=np.int32)
+        self.namen = np.asarray(namen, dtype=object)
+        # Synonyme nach Namen gruppiert, für den Weg Name -> Stammzeilen
+        self._nach_name = np.argsort(self.codes, kind='stable')
+        self._grenzen = np.searchsorted(self.codes[self._nach_name], np.arange(len(self.namen) + 1))
+
+    def __len__(self):
+        return len(self.zeilen)
+
+    def stammzeilen(self, namen_ids, rangfolge=False):
+        """
+        Liefert die Stammzeilen zu einer Menge von Namen.
+
+        :param namen_ids: Nummern der Namen.
+        :param rangfolge: Reihenfolge der Namen beibehalten statt aufsteigend sortieren.
+        :return: Eindeutige Stammzeilen als int64-Array.
+        """
+        namen_ids = np.asarray(namen_ids, dtype=np.int64)
+        if not len(namen_ids):
+            return np.zeros(0, dtype=np.int64)
+        laengen = self._grenzen[namen_ids + 1] - self._grenzen[namen_ids]
+        starts = np.repeat(self._grenzen[namen_ids] - np.cumsum(laengen) + laengen, laengen)
+        positionen = starts + np.arange(laengen.sum())
+        zeilen = self.zeilen[self._nach_name[positionen]].astype(np.int64)
+        if not rangfolge:
+            return np.unique(zeilen)
+        _, erste = np.unique(zeilen, return_index=True)
+        return zeilen[np.sort(erste)]
+
+    def als_arrays(self):
+        """
+        Verweise und Namen als NumPy-Arrays (siehe ``aus_arrays``).
+        """
+        puffer, offsets, arten = text_zu_arrays(self.namen.tolist())
+        return {'zeilen': self.zeilen, 'codes': self.codes, 'namen.puffer': puffer, 'namen.offsets': offsets,
+                'namen.arten': arten}
+
+    @classmethod
+    def aus_arrays(cls, arrays):
+        """
+        Gegenstück zu ``als_arrays``.
+        """
+        namen = arrays_zu_text(arrays['namen.puffer'], arrays['namen.offsets'], arrays['namen.arten'])
+        return cls(arrays['zeilen'], arrays['codes'], namen)
+
+    def speicherbedarf(self):
+        """
+        Speicherbedarf der Verweise und Namen in Bytes.
+        """
+        return (self.zeilen.nbytes + self.codes.nbytes + self._nach_name.nbytes + self._grenzen.nbytes
+                + self.namen.nbytes + sum(sys.getsizeof(name) for name in self.namen))
+
+
+class OpsIndex:
+    """
+    Sortierte OPS-Kodes der Stammtabelle für Suchen nach Kode.
+
+    Die Schlüssel (siehe ``ops_schluessel``) liegen sortiert in einem Array;
+    jede Anfrage ist eine Binärsuche (``np.searchsorted``) statt eines
+    Vergleichs mit allen Zeilen. Durch die Sortierung liegen alle Unterkodes
+    eines Kodes ('6-002.p' -> '6-002.p1' ... '6-002.pz') zusammenhängend.
+    Kodes der ZE-Liste mit '*' ('6-001.4*') decken alle Kodes mit diesem
+    Anfang ab; sie werden für jede Länge des gesuchten Kodes einmal
+    nachgeschlagen, der Aufwand wächst also mit der Kodelänge, nicht mit der
+    Tabelle.
+
+    Anfragen:
+
+    * '6-002.p1': genau dieser Kode; gibt es ihn nicht, alle Kodes darunter
+      (so findet '6-002' bzw. '6-002.p' die ganze Gruppe),
+    * '8-810.*': alle Kodes mit diesem Anfang,
+    * '6-002.p1..p9' oder '6-002.p1..6-002.p9': alle Kodes im Bereich,
+      einschließlich der Unterkodes der Obergrenze. Eine verkürzte Obergrenze
+      ersetzt das Ende der Untergrenze.
+
+    :param kodes: OPS-Kode je Stammzeile (leere Zellen erlaubt).
+    """
+
+    def __init__(self, kodes):
+        schluessel = [ops_schluessel(kode) for kode in kodes]
+        zeilen = [zeile for zeile, s in enumerate(schluessel) if s]
+        stern = np.array([schluessel[zeile].endswith('*') for zeile in zeilen], dtype=bool)
+        self._setze(np.array([schluessel[zeile].rstrip('*') for zeile in zeilen], dtype=str),
+                    np.asarray(zeilen, dtype=np.int32), stern)
+
+    def _setze(self, schluessel, zeilen, stern):
+        reihenfolge = np.argsort(schluessel, kind='stable')
+        self.schluessel = schluessel[reihenfolge]
+        self.zeilen = zeilen[reihenfolge]
+        self.stern = stern[reihenfolge]
+        self._stern_schluessel = self.schluessel[self.stern]
+        self._stern_zeilen = self.zeilen[self.stern]
+
+    def __len__(self):
+        return len(self.zeilen)
+
+    def _bereich(self, von, bis, rechts='right'):
+        start = np.searchsorted(self.schluessel, von, 'left')
+        ende = np.searchsorted(self.schluessel, bis, rechts)
+        return self.zeilen[start:ende]
+
+    def _abdeckend(self, schluessel):
+        """
+        Zeilen der '*'-Kodes, deren Anfang ein Präfix von ``schluessel`` ist.
+        """
+        treffer = []
+        for laenge in range(1, len(schluessel) + 1):
+            praefix = schluessel[:laenge]
+            start = np.searchsorted(self._stern_schluessel, praefix, 'left')
+            ende = np.searchsorted(self._stern_schluessel, praefix, 'right')
+            if ende > start:
+                treffer.append(self._stern_zeilen[start:ende])
+        return treffer
+
+    def exakt(self, kode):
+        """
+        Zeilen mit genau diesem Kode, einschließlich der '*'-Kodes, die ihn abdecken.
+        """
+        schluessel = ops_schluessel(kode).rstrip('*')
+        if not schluessel:
+            return np.zeros(0, dtype=np.int64)
+        return _vereinige([self._bereich(schluessel, schluessel)] + self._abdeckend(schluessel))
+
+    def praefix(self, kode):
+        """
+        Zeilen aller Kodes, die mit ``kode`` beginnen oder von einem '*'-Kode abgedeckt werden.
+        """
+        schluessel = ops_schluessel(kode).rstrip('*')
+        if not schluessel:
+            return np.zeros(0, dtype=np.int64)
+        return _vereinige([self._bereich(schluessel, schluessel + _OPS_ENDE, 'left')] + self._abdeckend(schluessel))
+
+    def bereich(self, von, bis):
+        """
+        Zeilen aller Kodes von ``von`` bis einschließlich ``bis`` samt dessen Unterkodes.
+
+        :raises SuchFehler: Wenn eine Grenze leer ist oder die Untergrenze über der Obergrenze liegt.
+        """
+        von, bis = ops_schluessel(von).rstrip('*'), ops_schluessel(bis).rstrip('*')
+        if len(bis) < len(von):
+            bis = von[:len(von) - len(bis)] + bis
+        if not von or not bis:
+            raise SuchFehler("Ein OPS-Bereich braucht zwei Kodes, z. B. '6-002.p1..p9'")
+        if von > bis:
+            raise SuchFehler(f"Ungültiger OPS-Bereich: Untergrenze liegt über der Obergrenze ({von} > {bis})")
+        return _vereinige([self._bereich(von, bis + _OPS_ENDE, 'left')] + self._abdeckend(von)
+                          + self._abdeckend(bis))
+
+    def suche(self, begriff):
+        """
+        Sucht nach Kode, Präfix ('*') oder Bereich ('..'), siehe Klassenbeschreibung.
+
+        :return: Aufsteigend sortierte Zeilennummern der Stammtabelle.
+        :raises SuchFehler: Bei ungültigen Bereichen.
+        """
+        if OPS_BEREICH in begriff:
+            von, _, bis = begriff.partition(OPS_BEREICH)
+            return self.bereich(von, bis)
+        if begriff.strip().endswith('*'):
+            return self.praefix(begriff)
+        zeilen = self.exakt(begriff)
+        return zeilen if len(zeilen) else self.praefix(begriff)
+
+    def als_arrays(self):
+        """
+        Schlüssel, Zeilen und '*'-Markierung als NumPy-Arrays (siehe ``aus_arrays``).
+        """
+        puffer, offsets, arten = text_zu_arrays(self.schluessel.tolist())
+        return {'schluessel.puffer': puffer, 'schluessel.offsets': offsets, 'schluessel.arten': arten,
+                'zeilen': self.zeilen, 'stern': self.stern}
+
+    @classmethod
+    def aus_arrays(cls, arrays):
+        """
+        Gegenstück zu ``als_arrays``.
+        """
+        index = cls.__new__(cls)
+        schluessel = arrays_zu_text(arrays['schluessel.puffer'], arrays['schluessel.offsets'],
+                                    arrays['schluessel.arten'])
+        index._setze(np.array(schluessel, dtype=str), np.asarray(arrays['zeilen'], dtype=np.int32),
+                     np.asarray(arrays['stern'], dtype=bool))
+        return index
+
+    def speicherbedarf(self):
+        """
+        Speicherbedarf der sortierten Arrays in Bytes.
+        """
+        return (self.schluessel.nbytes + self.zeilen.nbytes + self.stern.nbytes + self._stern_schluessel.nbytes
+                + self._stern_zeilen.nbytes)
+
+
+def _vereinige(teile):
+    teile = [teil for teil in teile if len(teil)]
+    if not teile:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate(teile).astype(np.int64))
+
+
+class ModellIndex:
+    """
+    Suche über Stammtabelle und Synonymtabelle, ohne die Tabelle selbst.
+
+    ``suche`` hat dieselbe Signatur wie ``SuchIndex.suche``; ein Modellindex
+    kann daher überall eingesetzt werden, wo ein Suchindex erwartet wird (z. B.
+    in ``InkrementelleSuche``). Die Trefferzeilen verweisen auf die
+    Stammtabelle, die der Aufrufer hält (siehe ``ze_modell.ZeModell``).
+
+    :param index: SuchIndex über die Spalten der Stammtabelle.
+    :param synonyme: Synonymtabelle, deren Zeilen auf die Stammtabelle verweisen.
+    :param synonymspalte: Name, unter dem die Synonyme gesucht werden.
+    :param namen_index: Fertiger SuchIndex über die Synonymnamen (Standard: neu aufbauen).
+    :param ops: OpsIndex über die OPS-Kodes der Stammtabelle (optional, für den Modus OPS_KODE).
+    """
+
+    def __init__(self, index, synonyme, synonymspalte, namen_index=None, ops=None):
+        self.index = index
+        self.synonyme = synonyme
+        self.synonymspalte = synonymspalte
+        if namen_index is None:
+            namen_index = SuchIndex({SYNONYMSPALTE: synonyme.namen}, [SYNONYMSPALTE], [SYNONYMSPALTE])
+        self.namen_index = namen_index
+        self.ops = ops
+
+    @property
+    def spalten(self):
+        """
+        Alle durchsuchbaren Spalten (Stammtabelle und, falls vorhanden, Synonyme).
+        """
+        spalten = list(self.index.spalten)
+        if len(self.synonyme):
+            spalten.append(self.synonymspalte)
+        return spalten
+
+    def suche(self, suchbegriff, spalten=None, modus=LITERAL, zeitlimit=REGEX_ZEITLIMIT, kandidaten=None):
+        """
+        Sucht in Spalten der Stammtabelle und/oder in den Synonymen.
+
+        Im Modus OPS_KODE wird unabhängig von ``spalten`` im OpsIndex gesucht.
+
+        :param suchbegriff: Suchbegriff.
+        :param spalten: Spaltenname oder Liste von Spalten (Standard: alle durchsuchbaren).
+        :param modus: Suchmodus aus ``MODI``.
+        :param zeitlimit: Zeitlimit für reguläre Ausdrücke in Sekunden.
+        :param kandidaten: Optionale Zeilen, auf die die Suche beschränkt wird.
+        :return: Eindeutige Zeilennummern der Stammtabelle; aufsteigend, im Modus FUZZY nach Rang.
+        :raises SuchFehler: Bei ungültigen regulären Ausdrücken oder OPS-Bereichen.
+        """
+        if modus == OPS_KODE:
+            if self.ops is None:
+                return np.zeros(0, dtype=np.int64)
+            zeilen = self.ops.suche(suchbegriff)
+            return zeilen[np.isin(zeilen, kandidaten)] if kandidaten is not None else zeilen
+        if isinstance(spalten, str):
+            spalten = [spalten]
+        if spalten is None:
+            spalten = self.spalten
+        teile = []
+        stamm_spalten = [s for s in spalten if s != self.synonymspalte]
+        if stamm_spalten:
+            teile.append(self.index.suche(suchbegriff, stamm_spalten, modus, zeitlimit, kandidaten))
+        if self.synonymspalte in spalten:
+            namen_ids = self.namen_index.suche(suchbegriff, modus=modus, zeitlimit=zeitlimit)
+            zeilen = self.synonyme.stammzeilen(namen_ids, rangfolge=modus == FUZZY)
+            if kandidaten is not None:
+                zeilen = zeilen[np.isin(zeilen, kandidaten)]
+            teile.append(zeilen)
+
+        if not teile:
+            return np.zeros(0, dtype=np.int64)
+        if len(teile) == 1:
+            return teile[0]
+        zeilen = np.concatenate(teile)
+        if modus != FUZZY:
+            return np.unique(zeilen)
+        _, erste = np.unique(zeilen, return_index=True)
+        return zeilen[np.sort(erste)]
+
+    def fuzzy_treffer(self, suchbegriff, k=FUZZY_TOP_K):
+        """
+        Die k ähnlichsten Handelsnamen aus Stammtabelle und Synonymen.
+
+        :return: Liste von FuzzyTreffer, deren Zeilen auf die Stammtabelle verweisen.
+        """
+        treffer = list(self.index.fuzzy_treffer(suchbegriff, k))
+        for name in self.namen_index.fuzzy_treffer(suchbegriff, k):
+            treffer.append(FuzzyTreffer(name.name, name.abstand, self.synonyme.stammzeilen(name.zeilen)))
+        treffer.sort(key=lambda t: (t.abstand, -len(t.zeilen)))
+        eindeutig = {}
+        for t in treffer:
+            eindeutig.setdefault(t.name.casefold(), t)
+        return list(eindeutig.values())[:k]
+
+    def als_arrays(self, praefix=''):
+        """
+        Beide Suchindizes und die Synonymtabelle als flaches Dictionary von NumPy-Arrays.
+
+        :param praefix: Vorangestellter Name, z. B. für die Ablage im Snapshot.
+        """
+        puffer, offsets, arten = text_zu_arrays([self.synonymspalte])
+        arrays = {f'{praefix}synonymspalte.puffer': puffer, f'{praefix}synonymspalte.offsets': offsets,
+                  f'{praefix}synonymspalte.arten': arten}
+        arrays.update(self.index.als_arrays(f'{praefix}stamm.'))
+        arrays.update(self.namen_index.als_arrays(f'{praefix}namen.'))
+        arrays.update({f'{praefix}synonyme.{name}': array for name, array in self.synonyme.als_arrays().items()})
+        if self.ops is not None:
+            arrays.update({f'{praefix}ops.{name}': array for name, array in self.ops.als_arrays().items()})
+        return arrays
+
+    @classmethod
+    def aus_arrays(cls, arrays, praefix=''):
+        """
+        Öffnet einen mit ``als_arrays`` abgelegten Modellindex ohne Neuaufbau.
+
+        :return: ModellIndex oder None, wenn die Arrays keinen Modellindex enthalten.
+        """
+        arrays = _teil(arrays, praefix)
+        if 'synonymspalte.puffer' not in arrays:
+            return None
+        (synonymspalte,) = arrays_zu_text(arrays['synonymspalte.puffer'], arrays['synonymspalte.offsets'],
+                                          arrays['synonymspalte.arten'])
+        ops = OpsIndex.aus_arrays(_teil(arrays, 'ops.')) if 'ops.zeilen' in arrays else None
+        return cls(SuchIndex.aus_arrays(arrays, 'stamm.'), Synonymtabelle.aus_arrays(_teil(arrays, 'synonyme.')),
+                   synonymspalte, SuchIndex.aus_arrays(arrays, 'namen.'), ops)
+
+    def speicherbedarf(self):
+        """
+        Speicherbedarf der Synonymtabelle und der Suchindizes in Bytes.
+        """
+        return (self.synonyme.speicherbedarf() + self.index.speicherbedarf() + self.namen_index.speicherbedarf()
+                + (self.ops.speicherbedarf() if self.ops is not None else 0))
+
+
+def interniere(modell_index, pool):
+    """
+    Ersetzt gleiche Texte in Synonymtabelle und Suchindizes durch ein gemeinsames Objekt aus ``pool``.
+
+    Werden mehrere Versionen der ZE-Liste nebeneinander gehalten, liegen
+    Namen und normalisierte Texte, die in allen Versionen vorkommen, so nur
+    einmal im Speicher. Die Listen werden an Ort und Stelle geändert; gleiche
+    Texte bleiben gleich, laufende Suchen sind davon nicht betroffen.
+
+    :param modell_index: ModellIndex (bzw. ZeModell).
+    :param pool: Dictionary Text -> geteiltes Textobjekt; wird ergänzt.
+    :return: Tupel (Anzahl ersetzter Texte, dabei frei gewordene Bytes).
+    """
+    behaelter = [modell_index.synonyme.namen]
+    for index in (modell_index.index, modell_index.namen_index):
+        behaelter += [index.fuzzy.namen, index.fuzzy.anzeige]
+        behaelter += [spalte.texte for spalte in index.spalten.values()]
+    ersetzt = frei = 0
+    for texte in behaelter:
+        for i, text in enumerate(texte):
+            geteilt = pool.setdefault(text, text)
+            if geteilt is not text:
+                texte[i] = geteilt
+                ersetzt += 1
+                frei += sys.getsizeof(text)
+    return ersetzt, frei
+
+
+class InkrementelleSuche:
+    """
+    Suche-während-der-Eingabe für eine Sitzung.
+
+    Merkt sich den letzten Begriff und dessen Treffer. Verlängert der neue
+    Begriff den alten so, dass jeder neue Treffer auch ein alter sein muss
+    (z. B. "vanc" -> "vanco"), werden nur die bisherigen Treffer geprüft statt
+    der ganzen Tabelle. Eine unveränderte Anfrage wird gar nicht erst neu
+    ausgeführt.
+
+    :param index: SuchIndex, auf dem gesucht wird.
+    :param spalten: Zu durchsuchende Spalten (Standard: alle indizierten).
+    """
+
+    def __init__(self, index, spalten=None):
+        self.index = index
+        self.spalten = spalten
+        self._letzte = None  # (begriff, modus, zeilen)
+
+    @staticmethod
+    def verfeinert(alt, neu, modus):
+        """
+        Prüft, ob jeder Treffer für ``neu`` zwingend auch ein Treffer für ``alt`` ist.
+        """
+        if not alt:
+            return False
+        if modus == LITERAL:
+            return alt in neu
+        if modus == PRAEFIX:
+            return neu.startswith(alt)
+        if modus == OPS_KODE:
+            # Nur Präfixanfragen grenzen sich beim Weitertippen ein ('6-00*' -> '6-002*')
+            return alt.endswith('*') and neu.endswith('*') and neu.startswith(alt[:-1]) \
+                and OPS_BEREICH not in neu
+        return False
+
+    def suche(self, suchbegriff, modus=LITERAL, index=None):
+        """
+        Sucht den Begriff und nutzt dabei, wenn möglich, das vorherige Ergebnis.
+
+        :param suchbegriff: Suchbegriff wie eingegeben.
+        :param modus: Suchmodus.
+        :param index: Neuer SuchIndex, falls sich der Datenbestand geändert hat.
+        :return: Zeilennummern wie bei ``SuchIndex.suche``.
+        :raises SuchFehler: Wie ``SuchIndex.suche``.
+        """
+        if index is not None and index is not self.index:
+            self.index = index
+            self._letzte = None
+        begriff = suchbegriff if modus == REGEX else normalisiere(suchbegriff)
+
+        kandidaten = None
+        if self._letzte is not None:
+            alt, alter_modus, alte_zeilen = self._letzte
+            if alt == begriff and alter_modus == modus:
+                return alte_zeilen
+            if alter_modus == modus and self.verfeinert(alt, begriff, modus):
+                kandidaten = alte_zeilen
+
+        zeilen = self.index.suche(begriff, self.spalten, modus, kandidaten=kandidaten)
+        self._letzte = (begriff, modus, zeilen)
+        return zeilen
+
+    def zuruecksetzen(self):
+        self._letzte = None
@@ -0,0 +1,296 @@
+"""
+Mehrere Versionen der ZE-Liste nebeneinander (z. B. 2024, 2025).
+
+Abgerechnet wird nach der ZE-Liste, die am Aufnahmetag gilt. Der Katalog
+hält daher je Version eine eigene ``SuchMaschine`` (Daten, Indizes,
+Ergebnis-Cache, Dateiwächter) und wählt sie per Name oder per Datum aus::
+
+    katalog = Katalog.aus_verzeichnis('.')        # 'ZE Liste 2024.xlsx', 'ZE Liste 2025.xlsx', ...
+    katalog.maschine('2024').ergebnisse('gemcitabin')
+    katalog.version_fuer(datetime.date(2025, 3, 1))  # -> '2025'
+    katalog.diff('2024', '2025')                     # neue/entfallene ZE, geänderte Beträge
+
+Geladen wird jede Version erst, wenn sie gebraucht wird; eine fehlende oder
+fehlerhafte Version betrifft nur Anfragen an diese Version. Sobald eine
+Version (neu) geladen ist, werden ihre Texte mit den übrigen geladenen
+Versionen geteilt (``ze_index.interniere``) und die Unterschiede zu den
+geladenen Nachbarversionen einmal berechnet. Abfragen der Unterschiede
+kosten danach nichts mehr. Wird eine Version ersetzt, entsteht der Pool der
+geteilten Texte aus den aktuell geladenen Versionen neu, damit Texte
+entfernter Zeilen nicht im Speicher bleiben.
+"""
+import glob
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from ze_daten import betrag_als_zahl
+from ze_index import interniere
+from ze_suche import SuchMaschine
+
+# Dateien, die als Versionen der ZE-Liste erkannt werden
+KATALOG_MUSTER = 'ZE Liste*.xlsx'
+# Version ohne Jahreszahl im Dateinamen (z. B. 'ZE Liste.xlsx'); gilt als neueste
+AKTUELL = 'aktuell'
+_JAHR = re.compile(r'(?<!\d)(20\d{2})(?!\d)')
+
+NEU = 'neu'
+ENTFALLEN = 'entfallen'
+BETRAG_GEAENDERT = 'Betrag geändert'
+DIFF_SPALTEN = ['ZE', 'Änderung', 'Betrag alt', 'Betrag neu', 'Differenz', 'OPS-Text']
+
+
+def _reihenfolge(name):
+    # Jahrgänge aufsteigend, danach Versionen ohne Jahreszahl
+    jahr = _JAHR.fullmatch(name)
+    return (0, int(name), '') if jahr else (1, 0, name)
+
+
+def finde_versionen(verzeichnis='.', muster=KATALOG_MUSTER):
+    """
+    Sucht die Versionen der ZE-Liste in einem Verzeichnis.
+
+    Der Name einer Version ist die Jahreszahl im Dateinamen ('ZE Liste 2025.xlsx'
+    -> '2025'), sonst der Rest des Dateinamens bzw. 'aktuell'.
+
+    :return: Dictionary Versionsname -> Pfad, älteste Version zuerst.
+    """
+    versionen = {}
+    for pfad in glob.glob(os.path.join(verzeichnis, muster)):
+        datei = os.path.basename(pfad)
+        if datei.startswith('~$'):  # Sperrdatei einer in Excel geöffneten Mappe
+            continue
+        jahr = _JAHR.search(datei)
+        rest = os.path.splitext(datei)[0][len('ZE Liste'):].strip(' _-')
+        versionen[jahr.group(1) if jahr else rest or AKTUELL] = os.path.normpath(pfad)
+    return {name: versionen[name] for name in sorted(versionen, key=_reihenfolge)}
+
+
+def ze_uebersicht(stamm):
+    """
+    Eine Zeile je ZE: erster vorhandener Betrag (als Zahl) und erster OPS-Text.
+
+    Folgezeilen derselben ZE (weitere Handelsnamen, ohne Betrag) fallen dabei zusammen.
+    """
+    spalten = {'ZE': stamm['ZE'].astype(object),
+               'Betrag': betrag_als_zahl(stamm['Betrag']) if 'Betrag' in stamm.columns else np.nan}
+    if 'OPS-Text' in stamm.columns:
+        spalten['OPS-Text'] = stamm['OPS-Text'].astype(object)
+    uebersicht = pd.DataFrame(spalten).dropna(subset=['ZE'])
+    return uebersicht.groupby('ZE', sort=False).first()
+
+
+def vergleiche(alt, neu):
+    """
+    Unterschiede zwischen zwei Stammtabellen: neue und entfallene ZE sowie geänderte Beträge.
+
+    :param alt: Stammtabelle der älteren Version.
+    :param neu: Stammtabelle der neueren Version.
+    :return: DataFrame mit den Spalten ``DIFF_SPALTEN``, nach Art der Änderung und ZE sortiert.
+    """
+    zusammen = pd.merge(ze_uebersicht(alt), ze_uebersicht(neu), how='outer', left_index=True, right_index=True,
+                        suffixes=(' alt', ' neu'), indicator=True)
+    in_alt = (zusammen['_merge'] != 'right_only').to_numpy()
+    in_neu = (zusammen['_merge'] != 'left_only').to_numpy()
+    betrag_alt = zusammen['Betrag alt'].to_numpy(dtype=np.float64)
+    betrag_neu = zusammen['Betrag neu'].to_numpy(dtype=np.float64)
+    # Zwei fehlende Beträge gelten als gleich, ein fehlender und ein vorhandener nicht
+    geaendert = ~((betrag_alt == betrag_neu) | (np.isnan(betrag_alt) & np.isnan(betrag_neu)))
+    aenderung = np.select([~in_alt, ~in_neu, geaendert], [NEU, ENTFALLEN, BETRAG_GEAENDERT], '')
+    text = zusammen['OPS-Text neu'].fillna(zusammen['OPS-Text alt']) if 'OPS-Text neu' in zusammen.columns \
+        else pd.Series(None, index=zusammen.index, dtype=object)
+
+    diff = pd.DataFrame({
+        'ZE': zusammen.index.astype(str),
+        'Änderung': aenderung,
+        'Betrag alt': betrag_alt,
+        'Betrag neu': betrag_neu,
+        'Differenz': (betrag_neu - betrag_alt).round(2),
+        'OPS-Text': text.to_numpy(),
+    })
+    diff['Änderung'] = pd.Categorical(diff['Änderung'], categories=[NEU, ENTFALLEN, BETRAG_GEAENDERT, ''])
+    diff = diff[diff['Änderung'] != ''].sort_values(['Änderung', 'ZE'], ignore_index=True)
+    diff['Änderung'] = diff['Änderung'].astype(str)
+    return diff
+
+
+class Katalog:
+    """
+    Versionen der ZE-Liste mit je eigener Suchmaschine, geteilten Texten und vorberechneten Unterschieden.
+
+    :param pfade: Dictionary Versionsname -> Pfad der Excel-Datei.
+    :param cache_verzeichnis: Abweichendes Snapshot-Verzeichnis.
+    """
+
+    def __init__(self, pfade, cache_verzeichnis=None):
+        if not pfade:
+            raise FileNotFoundError("Keine ZE-Liste gefunden")
+        self.maschinen = {name: SuchMaschine(pfade[name], cache_verzeichnis) for name in sorted(pfade, key=_reihenfolge)}
+        self.pool = {}
+        self.geteilt = {}  # Versionsname -> (ersetzte Texte, frei gewordene Bytes)
+        self.fehler = {}  # Versionsname -> Ausnahme beim letzten Laden über ``aktualisiere``
+        self._stand = {}  # Versionsname -> Datenbestand, der interniert und verglichen wurde
+        self._diffs = {}  # (alt, neu) -> (Bestandsversion alt, Bestandsversion neu, DataFrame)
+        self._sperre = threading.Lock()
+
+    @classmethod
+    def aus_verzeichnis(cls, verzeichnis='.', muster=KATALOG_MUSTER, cache_verzeichnis=None):
+        """
+        Katalog aus allen Versionen der ZE-Liste in einem Verzeichnis (siehe ``finde_versionen``).
+
+        :raises FileNotFoundError: Wenn keine passende Datei gefunden wird.
+        """
+        return cls(finde_versionen(verzeichnis, muster), cache_verzeichnis)
+
+    @property
+    def versionen(self):
+        return list(self.maschinen)
+
+    @property
+    def neueste(self):
+        return self.versionen[-1]
+
+    def vorgaenger(self, version):
+        """
+        Die nächstältere Version oder None.
+        """
+        position = self.versionen.index(self._pruefe(version))
+        return self.versionen[position - 1] if position > 0 else None
+
+    def maschine(self, version=None):
+        """
+        Die Suchmaschine einer Version (Standard: die neueste).
+
+        :raises KeyError: Bei unbekannter Version.
+        """
+        return self.maschinen[self._pruefe(version)]
+
+    def bestand(self, version=None):
+        """
+        Der aktuelle Datenbestand einer Version; lädt nur diese Version bei Bedarf.
+
+        Ist der Bestand neu, werden seine Texte geteilt und die Unterschiede zu
+        den geladenen Nachbarversionen berechnet.
+
+        :raises KeyError: Bei unbekannter Version.
+        :raises FileNotFoundError: Wenn die Excel-Datei der Version nicht existiert.
+        """
+        version = self._pruefe(version)
+        bestand = self.maschinen[version].bestand()
+        if self._stand.get(version) is not bestand:
+            with self._sperre:
+                self._uebernimm(version, bestand)
+        return bestand
+
+    def version_fuer(self, datum):
+        """
+        Die Version, die an einem Datum gilt: der letzte Jahrgang bis zu diesem Jahr.
+
+        Versionen ohne Jahreszahl gelten als neueste; liegt das Datum vor dem
+        ältesten Jahrgang, wird dieser verwendet.
+
+        :param datum: date, datetime oder Text, den ``pandas.Timestamp`` versteht.
+        """
+        jahr = pd.Timestamp(datum).year
+        jahrgaenge = [name for name in self.versionen if _JAHR.fullmatch(name)]
+        if not jahrgaenge:
+            return self.neueste
+        passend = [name for name in jahrgaenge if int(name) <= jahr]
+        if not passend:
+            return jahrgaenge[0]
+        # Nach dem letzten Jahrgang gilt eine Version ohne Jahreszahl, falls vorhanden
+        return self.neueste if int(passend[-1]) < jahr and passend[-1] == jahrgaenge[-1] else passend[-1]
+
+    def aktualisiere(self):
+        """
+        Lädt alle Versionen vorab (z. B. beim Start eines Servers) wie ``bestand``.
+
+        Fehler einer Version halten die übrigen nicht auf; sie stehen danach in ``fehler``.
+
+        :return: Dictionary Versionsname -> Ausnahme für die Versionen, die nicht geladen werden konnten.
+        """
+        fehler = {}
+        for version in self.versionen:
+            try:
+                self.bestand(version)
+            except Exception as e:
+                fehler[version] = e
+        self.fehler = fehler
+        return fehler
+
+    def diff(self, alt=None, neu=None):
+        """
+        Unterschiede zwischen zwei Versionen (Standard: vorletzte und neueste).
+
+        Für aufeinanderfolgende Versionen beim Laden berechnet, für andere Paare
+        beim ersten Aufruf; danach aus dem Zwischenspeicher. Geladen werden nur
+        die beiden beteiligten Versionen.
+
+        :return: DataFrame wie ``vergleiche``.
+        :raises KeyError: Bei unbekannter Version.
+        :raises FileNotFoundError: Wenn eine der beiden Excel-Dateien nicht existiert.
+        """
+        neu = self._pruefe(neu)
+        alt = self._pruefe(alt) if alt is not None else self.vorgaenger(neu)
+        if alt is None:
+            return pd.DataFrame(columns=DIFF_SPALTEN)
+        self.bestand(alt)
+        self.bestand(neu)
+        with self._sperre:
+            return self._diff(alt, neu)
+
+    def beobachte(self):
+        """
+        Startet für jede Version den Dateiwächter (siehe ``ze_suche.DateiWaechter``).
+        """
+        for maschine in self.maschinen.values():
+            maschine.beobachte()
+
+    def speicherbedarf(self):
+        """
+        Bytes je Version (wie ``Datenbestand.speicherbedarf``) und die durch geteilte Texte gesparten Bytes.
+        """
+        return {'versionen': {name: bestand.speicherbedarf() for name, bestand in self._stand.items()},
+                'geteilt': sum(frei for _, frei in self.geteilt.values())}
+
+    def _uebernimm(self, version, bestand):
+        # Unter der Sperre: neuen Bestand einer Version teilen und mit den geladenen Nachbarn vergleichen
+        if self._stand.get(version) is bestand:
+            return
+        ersetzt = version in self._stand
+        self._stand[version] = bestand
+        if ersetzt:
+            self._baue_pool_neu(version)
+        else:
+            self.geteilt[version] = interniere(bestand.modell, self.pool)
+        for alt, neu in zip(self.versionen, self.versionen[1:]):
+            if version in (alt, neu) and alt in self._stand and neu in self._stand:
+                self._diff(alt, neu)
+
+    def _baue_pool_neu(self, version):
+        # Pool nur aus den aktuell geladenen Beständen, damit Texte des ersetzten Bestands frei werden.
+        # Die übrigen Versionen zuerst: ihre Texte sind bereits geteilt, gezählt wird nur die neue.
+        self.pool = {}
+        for name, bestand in self._stand.items():
+            if name != version:
+                interniere(bestand.modell, self.pool)
+        self.geteilt[version] = interniere(self._stand[version].modell, self.pool)
+
+    def _diff(self, alt, neu):
+        bestand_alt, bestand_neu = self._stand[alt], self._stand[neu]
+        gespeichert = self._diffs.get((alt, neu))
+        if gespeichert is None or gespeichert[0] is not bestand_alt or gespeichert[1] is not bestand_neu:
+            gespeichert = (bestand_alt, bestand_neu, vergleiche(bestand_alt.df, bestand_neu.df))
+            self._diffs[(alt, neu)] = gespeichert
+        return gespeichert[2]
+
+    def _pruefe(self, version):
+        if version is None:
+            return self.neueste
+        version = str(version)
+        if version not in self.maschinen:
+            raise KeyError(f"Unbekannte Version der ZE-Liste: {version} (vorhanden: {', '.join(self.versionen)})")
+        return version
@@ -0,0 +1,179 @@
+"""
+Normalisiertes Datenmodell der ZE-Liste.
+
+Statt die Handelsnamen per ``explode`` in eigene Zeilen aufzuteilen (und
+dabei alle übrigen Spalten je Synonym zu kopieren), besteht das Modell aus
+
+* einer Stammtabelle mit genau einer Zeile pro ZE/OPS-Eintrag und
+* einer schmalen Synonymtabelle aus zwei Integer-Arrays (Stammzeile,
+  Namens-Nummer) und der Liste der verschiedenen Namen.
+
+Gesucht wird in den Namen; die Trefferzeilen ergeben sich über die
+Zeilennummern der Synonymtabelle und sind damit von vornherein eindeutig.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+import ze_daten
+import ze_snapshot
+from ze_daten import HANDELSNAMEN_SPALTE, HANDELSNAMEN_TRENNZEICHEN
+from ze_index import SYNONYMSPALTE, ModellIndex, OpsIndex, SuchIndex, Synonymtabelle, index_konfiguration
+
+
+def synonyme_aus_spalte(codes, werte, trennzeichen=HANDELSNAMEN_TRENNZEICHEN):
+    """
+    Baut die Synonymtabelle aus einer faktorisierten Handelsnamen-Spalte.
+
+    Leere Teile (leere Zellen, doppelte Trennzeichen) werden nicht aufgenommen.
+
+    :param codes: Codes der Spalte (siehe ``ze_daten.bereinige_spalten``).
+    :param werte: Bereinigte, eindeutige Werte der Spalte.
+    :param trennzeichen: Trennzeichen zwischen mehreren Handelsnamen.
+    :return: Synonymtabelle.
+    """
+    zeilen, teil_codes, teil_werte = ze_daten.teile_auf(codes, werte, trennzeichen)
+    leer = np.array([not isinstance(w, str) or w == '' for w in teil_werte], dtype=bool)
+    behalten = (teil_codes >= 0) & ~np.append(leer, True)[teil_codes]
+    # Nur tatsächlich verwendete Namen behalten und neu durchnummerieren
+    neue_codes, namen = pd.factorize(teil_werte[teil_codes[behalten]])
+    return Synonymtabelle(zeilen[behalten], neue_codes, np.asarray(namen, dtype=object))
+
+
+def synonyme_als_dataframe(synonyme):
+    """
+    Die Synonymtabelle als schmaler DataFrame (Stammzeile, Synonym).
+    """
+    return pd.DataFrame({'Zeile': synonyme.zeilen, SYNONYMSPALTE: synonyme.namen[synonyme.codes]})
+
+
+class ZeModell(ModellIndex):
+    """
+    Stammtabelle plus Synonymtabelle samt Suchindizes.
+
+    Die Suche selbst steckt in ``ze_index.ModellIndex`` und kommt ohne pandas
+    aus; das Modell ergänzt die Stammtabelle für die Anzeige der Treffer.
+
+    :param stamm: DataFrame mit einer Zeile pro ZE/OPS-Eintrag.
+    :param synonyme: Synonymtabelle, deren Zeilen auf ``stamm`` verweisen.
+    :param suchspalten: Spalten der Stammtabelle, die durchsucht werden können.
+    :param synonymspalte: Name, unter dem die Synonyme gesucht werden.
+    :param fuzzy_spalten: Spalten der Stammtabelle für die unscharfe Suche (die
+        Synonyme sind immer unscharf durchsuchbar).
+    """
+
+    def __init__(self, stamm, synonyme, suchspalten=('OPS-Text',), synonymspalte=HANDELSNAMEN_SPALTE,
+                 fuzzy_spalten=()):
+        index = SuchIndex(stamm, [s for s in suchspalten if s != synonymspalte],
+                          [s for s in fuzzy_spalten if s != synonymspalte])
+        ops = OpsIndex(stamm['OPS'].tolist()) if 'OPS' in stamm.columns else None
+        super().__init__(index, synonyme, synonymspalte, ops=ops)
+        self.stamm = stamm
+
+    @classmethod
+    def mit_index(cls, stamm, modell_index):
+        """
+        Verbindet eine Stammtabelle mit einem fertigen (z. B. gespeicherten) Modellindex.
+        """
+        modell = cls.__new__(cls)
+        ModellIndex.__init__(modell, modell_index.index, modell_index.synonyme, modell_index.synonymspalte,
+                             modell_index.namen_index, modell_index.ops)
+        modell.stamm = stamm
+        return modell
+
+    def eintraege(self, zeilen):
+        """
+        Die Stammzeilen zu Trefferzeilen als DataFrame.
+        """
+        return self.stamm.iloc[zeilen]
+
+    def speicherbedarf(self):
+        """
+        Speicherbedarf von Stamm- und Synonymtabelle samt Suchindizes in Bytes.
+        """
+        return int(self.stamm.memory_usage(index=True, deep=True).sum()) + super().speicherbedarf()
+
+
+def _texte_als_arrays(name, texte):
+    puffer, offsets, arten = ze_snapshot.text_zu_arrays(texte)
+    return {f'{name}.puffer': puffer, f'{name}.offsets': offsets, f'{name}.arten': arten}
+
+
+def _lese_texte(zusatz, name):
+    if f'{name}.puffer' not in zusatz:
+        return None
+    return ze_snapshot.arrays_zu_text(zusatz[f'{name}.puffer'], zusatz[f'{name}.offsets'], zusatz[f'{name}.arten'])
+
+
+def baue_modell(df, spalte=HANDELSNAMEN_SPALTE, trennzeichen=HANDELSNAMEN_TRENNZEICHEN, suchspalten=('OPS-Text',),
+                fuzzy_spalten=()):
+    """
+    Baut das normalisierte Modell aus der eingelesenen Tabelle.
+
+    Die Stammtabelle ist bereinigt wie bei ``ze_daten.bereite_vor``, aber
+    nicht aufgeteilt; die Handelsnamen-Spalte bleibt dort als Gesamttext zur
+    Anzeige erhalten.
+
+    :param df: DataFrame wie aus der Excel-Datei gelesen.
+    :param spalte: Spalte mit mehreren Handelsnamen pro Zelle.
+    :param trennzeichen: Trennzeichen zwischen den Handelsnamen.
+    :param suchspalten: Durchsuchbare Spalten der Stammtabelle.
+    :param fuzzy_spalten: Spalten der Stammtabelle für die unscharfe Suche.
+    :return: ZeModell.
+    """
+    spalten = ze_daten.bereinige_spalten(df)
+    stamm = ze_daten.baue_dataframe(spalten, df.index)
+    if isinstance(spalten.get(spalte), tuple):
+        synonyme = synonyme_aus_spalte(*spalten[spalte], trennzeichen)
+    else:
+        synonyme = Synonymtabelle([], [], [])
+    return ZeModell(stamm, synonyme, suchspalten, spalte, fuzzy_spalten)
+
+
+def lade_modell(pfad, cache_verzeichnis=None, cache_nutzen=True, spalte=HANDELSNAMEN_SPALTE,
+                trennzeichen=HANDELSNAMEN_TRENNZEICHEN, suchspalten=('OPS-Text',), fuzzy_spalten=()):
+    """
+    Lädt die ZE-Liste als normalisiertes Modell, bevorzugt aus dem Snapshot.
+
+    Stammtabelle, Synonymtabelle und die fertigen Suchindizes liegen gemeinsam
+    in ``.ze_cache/<Datei>.modell.zesnap``. Wurden die Indizes dort für andere
+    Spalten abgelegt, werden sie aus der Stammtabelle neu aufgebaut.
+
+    :param pfad: Pfad zur Excel-Datei.
+    :param cache_verzeichnis: Abweichendes Cache-Verzeichnis.
+    :param cache_nutzen: Bei False wird immer neu gelesen.
+    :param spalte: Spalte mit mehreren Handelsnamen pro Zelle.
+    :param trennzeichen: Trennzeichen zwischen den Handelsnamen.
+    :param suchspalten: Durchsuchbare Spalten der Stammtabelle.
+    :param fuzzy_spalten: Spalten der Stammtabelle für die unscharfe Suche.
+    :return: ZeModell.
+    :raises FileNotFoundError: Wenn die Excel-Datei nicht existiert.
+    """
+    if not os.path.exists(pfad):
+        raise FileNotFoundError(pfad)
+    if not cache_nutzen:
+        return baue_modell(ze_daten.lade_ze_liste(pfad, cache_nutzen=False), spalte, trennzeichen, suchspalten,
+                           fuzzy_spalten)
+
+    gelesen = ze_daten.lese_snapshot(pfad, cache_verzeichnis, 'modell', mit_zusatz=True)
+    if gelesen is not None:
+        stamm, zusatz = gelesen
+        modell_index = ModellIndex.aus_arrays(zusatz, 'index.')
+        # Nur verwenden, wenn der Snapshot mit derselben Aufteilung erstellt wurde
+        if modell_index is not None and _lese_texte(zusatz, 'aufteilung') == [spalte, trennzeichen]:
+            if _lese_texte(zusatz, 'konfiguration') == index_konfiguration(suchspalten, fuzzy_spalten):
+                return ZeModell.mit_index(stamm, modell_index)
+            return ZeModell(stamm, modell_index.synonyme, suchspalten, spalte, fuzzy_spalten)
+
+    signatur = ze_snapshot.datei_signatur(pfad)
+    modell = baue_modell(ze_daten.lade_ze_liste(pfad, cache_verzeichnis), spalte, trennzeichen, suchspalten,
+                         fuzzy_spalten)
+    zusatz = modell.als_arrays('index.')
+    zusatz.update(_texte_als_arrays('aufteilung', [spalte, trennzeichen]))
+    zusatz.update(_texte_als_arrays('konfiguration', index_konfiguration(suchspalten, fuzzy_spalten)))
+    try:
+        ze_daten.schreibe_snapshot(modell.stamm, pfad, signatur, cache_verzeichnis, 'modell', zusatz)
+    except OSError:
+        pass
+    return modell
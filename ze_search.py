@@ -0,0 +1,181 @@
+"""
+Schnelle Einmal-Suche in der ZE-Liste von der Kommandozeile.
+
+Aufruf::
+
+    python ze_search.py "vancomycin"
+    python ze_search.py --modus praefix --spalte OPS-Text "gem"
+    python ze_search.py --modus ops "6-002.p1..p9"
+
+Liegt ein aktueller Modell-Snapshot vor (siehe ``ze_modell.lade_modell``),
+werden Stammtabelle und fertige Suchindizes direkt daraus eingeblendet. Dafür
+genügen NumPy, ``ze_snapshot`` und ``ze_index``; pandas wird nur importiert,
+wenn der Snapshot fehlt oder veraltet ist und das Modell einmal neu gebaut
+werden muss. Die Startzeit misst ``benchmarks/bench_startup.py``.
+"""
+import argparse
+import os
+import sys
+
+import ze_snapshot
+from ze_index import FUZZY, LITERAL, MODI, ModellIndex, SuchFehler, index_konfiguration
+from ze_suche import FUZZYSPALTEN, RELEVANTE_SPALTEN, SUCHSPALTEN
+
+STANDARD_DATEI = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ZE Liste.xlsx')
+
+
+class SnapshotTabelle:
+    """
+    Nur-Lese-Sicht auf die Stammtabelle eines Modell-Snapshots.
+
+    Dekodiert nur die angefragten Zellen, ein DataFrame wird nie aufgebaut.
+
+    :param spalten: Spaltenbeschreibungen aus dem Snapshot-Kopf.
+    :param arrays: Eingeblendete Arrays des Snapshots.
+    """
+
+    def __init__(self, spalten, arrays):
+        self.spalten = [spalte['name'] for spalte in spalten]
+        self._lage = {spalte['name']: (i, spalte['art']) for i, spalte in enumerate(spalten)}
+        self._arrays = arrays
+
+    def zellen(self, spalte, zeilen):
+        """
+        Die Werte einer Spalte für die angegebenen Zeilen; leere Zellen sind None.
+        """
+        i, art = self._lage[spalte]
+        arrays = self._arrays
+        if art == 'kategorie':
+            kategorien = ze_snapshot.arrays_zu_text(arrays[f'{i}.puffer'], arrays[f'{i}.offsets'],
+                                                    arrays[f'{i}.arten'])
+            return [kategorien[code] if code >= 0 else None for code in arrays[f'{i}.codes'][zeilen].tolist()]
+        if art == 'zahl':
+            return [None if wert != wert else wert for wert in arrays[f'{i}.werte'][zeilen].tolist()]
+        if art == 'zeit':
+            return [str(wert) for wert in arrays[f'{i}.werte'][zeilen].view('datetime64[ns]')]
+        return ze_snapshot.arrays_zu_text(arrays[f'{i}.puffer'], arrays[f'{i}.offsets'], arrays[f'{i}.arten'],
+                                          zeilen=list(zeilen))
+
+
+class DataFrameTabelle:
+    """
+    Dieselbe Sicht auf eine bereits geladene Stammtabelle (Rückfall ohne Snapshot).
+    """
+
+    def __init__(self, df):
+        self.spalten = list(df.columns)
+        self._df = df
+
+    def zellen(self, spalte, zeilen):
+        werte = self._df[spalte].iloc[zeilen].tolist()
+        return [None if isinstance(wert, float) and wert != wert else wert for wert in werte]
+
+
+def oeffne_snapshot(pfad, cache_verzeichnis=None):
+    """
+    Blendet Stammtabelle und Modellindex aus dem Modell-Snapshot ein, ohne pandas.
+
+    :param pfad: Pfad zur Excel-Datei.
+    :param cache_verzeichnis: Abweichendes Cache-Verzeichnis.
+    :return: Tupel (SnapshotTabelle, ModellIndex) oder None, wenn kein passender Snapshot vorliegt.
+    """
+    gelesen = ze_snapshot.lese_snapshot(ze_snapshot.snapshot_pfad(pfad, cache_verzeichnis, 'modell'))
+    if gelesen is None:
+        return None
+    kopf, arrays = gelesen
+    if kopf.get('version') != ze_snapshot.SNAPSHOT_VERSION \
+            or not ze_snapshot.signatur_passt(kopf.get('quelle'), pfad):
+        return None
+    konfiguration = [arrays.get(f'zusatz.konfiguration.{teil}') for teil in ('puffer', 'offsets', 'arten')]
+    if any(teil is None for teil in konfiguration) \
+            or ze_snapshot.arrays_zu_text(*konfiguration) != index_konfiguration(SUCHSPALTEN, FUZZYSPALTEN):
+        return None
+    modell_index = ModellIndex.aus_arrays(arrays, 'zusatz.index.')
+    if modell_index is None:
+        return None
+    return SnapshotTabelle(kopf['spalten'], arrays), modell_index
+
+
+def lade(pfad, cache_verzeichnis=None):
+    """
+    Öffnet die ZE-Liste für eine einzelne Suche, bevorzugt aus dem Snapshot.
+
+    :return: Tupel (Tabelle, Modellindex).
+    :raises FileNotFoundError: Wenn die Excel-Datei nicht existiert.
+    """
+    if not os.path.exists(pfad):
+        raise FileNotFoundError(pfad)
+    geoeffnet = oeffne_snapshot(pfad, cache_verzeichnis)
+    if geoeffnet is not None:
+        return geoeffnet
+    # Snapshot fehlt oder ist veraltet: einmal über die Suchmaschine bauen (importiert pandas)
+    from ze_suche import SuchMaschine
+
+    modell = SuchMaschine(pfad, cache_verzeichnis).bestand().modell
+    return oeffne_snapshot(pfad, cache_verzeichnis) or (DataFrameTabelle(modell.stamm), modell)
+
+
+def zeige_treffer(tabelle, zeilen, ausgabe=None):
+    """
+    Gibt die Trefferzeilen als Blöcke "Spalte: Wert" aus; leere Zellen entfallen.
+
+    :param ausgabe: Ziel der Ausgabe (Standard: sys.stdout).
+    """
+    ausgabe = ausgabe or sys.stdout
+    spalten = [spalte for spalte in RELEVANTE_SPALTEN if spalte in tabelle.spalten]
+    werte = [tabelle.zellen(spalte, zeilen) for spalte in spalten]
+    breite = max((len(spalte) for spalte in spalten), default=0) + 1
+    for nummer in range(len(zeilen)):
+        print(file=ausgabe)
+        for spalte, spaltenwerte in zip(spalten, werte):
+            if spaltenwerte[nummer] is not None:
+                print(f"{spalte + ':':<{breite}} {spaltenwerte[nummer]}", file=ausgabe)
+
+
+def main(argumente=None):
+    parser = argparse.ArgumentParser(description="Sucht einmalig in der ZE-Liste (OPS-Text und Handelsnamen).")
+    parser.add_argument('suchbegriff', help="Teil des OPS-Textes oder Handelsnamens")
+    parser.add_argument('--datei', default=STANDARD_DATEI, help="Pfad zur Excel-Datei (Standard: %(default)s)")
+    parser.add_argument('--modus', choices=list(MODI), default=LITERAL, help="Suchmodus (Standard: %(default)s)")
+    parser.add_argument('--spalte', action='append', dest='spalten',
+                        help="Nur in dieser Spalte suchen (mehrfach möglich)")
+    args = parser.parse_args(argumente)
+
+    try:
+        tabelle, modell_index = lade(args.datei)
+    except FileNotFoundError:
+        print(f"Die Datei wurde nicht gefunden: {args.datei}", file=sys.stderr)
+        return 2
+    except Exception as e:
+        print(f"Fehler beim Laden der Datei: {e}", file=sys.stderr)
+        return 2
+
+    spalten = args.spalten or modell_index.spalten
+    unbekannt = [spalte for spalte in spalten if spalte not in modell_index.spalten]
+    if unbekannt:
+        print(f"Nicht durchsuchbare Spalten: {', '.join(unbekannt)} "
+              f"(verfügbar: {', '.join(modell_index.spalten)})", file=sys.stderr)
+        return 2
+
+    try:
+        zeilen = modell_index.suche(args.suchbegriff, spalten, args.modus)
+        if not len(zeilen) and args.modus == LITERAL:
+            # Kein wörtlicher Treffer: ähnliche Handelsnamen vorschlagen (Tippfehler)
+            vorschlaege = [treffer.name for treffer in modell_index.fuzzy_treffer(args.suchbegriff)]
+            if vorschlaege:
+                print(f"Meinten Sie: {', '.join(vorschlaege)}?")
+                zeilen = modell_index.suche(args.suchbegriff, spalten, FUZZY)
+    except SuchFehler as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    if not len(zeilen):
+        print("Keine passenden Einträge gefunden.")
+        return 1
+    print(f"{len(zeilen)} Treffer für \"{args.suchbegriff}\":")
+    zeige_treffer(tabelle, zeilen)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,258 @@
+"""
+Binäres Snapshot-Format für die ZE-Liste.
+
+Ein Snapshot ist eine einzelne Datei, die mehrere NumPy-Arrays hintereinander
+ablegt. Vorne steht ein JSON-Kopf mit der Signatur der Quelldatei und der Lage
+aller Arrays, danach folgen die Rohdaten. Beim Lesen werden die Arrays per
+``np.memmap`` eingeblendet, es wird also nichts geparst oder kopiert. Texte
+liegen als Puffer mit Offsets vor; wer sie als Python-Strings braucht
+(``arrays_zu_text``), dekodiert sie dabei vollständig.
+
+Das Modul benötigt nur NumPy (kein pandas), damit auch schlanke Einstiegspunkte
+einen Snapshot öffnen können.
+"""
+import json
+import os
+import struct
+import uuid
+
+import numpy as np
+
+MAGIC = b'ZESNAP01'
+AUSRICHTUNG = 64
+CACHE_VERZEICHNIS = '.ze_cache'
+# Version der im Kopf beschriebenen Tabellenablage (siehe ze_daten)
+SNAPSHOT_VERSION = 3
+
+# Zellarten für Textspalten
+ART_LEER = 0
+ART_TEXT = 1
+ART_GANZZAHL = 2
+ART_KOMMAZAHL = 3
+
+
+def snapshot_pfad(pfad, cache_verzeichnis=None, stufe=None):
+    """
+    Liefert den Pfad des Snapshots zu einer Excel-Datei.
+
+    :param pfad: Pfad zur Excel-Datei.
+    :param cache_verzeichnis: Abweichendes Cache-Verzeichnis (Standard: '.ze_cache' neben der Datei).
+    :param stufe: Verarbeitungsstufe (z. B. 'vorbereitet'); None für die Rohdaten.
+    :return: Pfad der Snapshot-Datei.
+    """
+    if cache_verzeichnis is None:
+        cache_verzeichnis = os.path.join(os.path.dirname(os.path.abspath(pfad)), CACHE_VERZEICHNIS)
+    endung = '.zesnap' if stufe is None else f'.{stufe}.zesnap'
+    return os.path.join(cache_verzeichnis, os.path.basename(pfad) + endung)
+
+
+def datei_hash(pfad, blockgroesse=1 << 20):
+    """
+    Berechnet den SHA-256-Hash einer Datei.
+
+    :param pfad: Pfad zur Datei.
+    :param blockgroesse: Größe der gelesenen Blöcke in Bytes.
+    :return: Hexadezimaler Hash.
+    """
+    # Erst hier importieren: der Hash wird nur bei geänderter Änderungszeit gebraucht
+    import hashlib
+
+    h = hashlib.sha256()
+    with open(pfad, 'rb') as f:
+        for block in iter(lambda: f.read(blockgroesse), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def datei_signatur(pfad, mit_hash=True):
+    """
+    Ermittelt Änderungszeit, Größe und (optional) Hash einer Datei.
+
+    :param pfad: Pfad zur Datei.
+    :param mit_hash: Ob der SHA-256-Hash mitberechnet werden soll.
+    :return: Dictionary mit 'mtime_ns', 'groesse' und ggf. 'sha256'.
+    """
+    stat = os.stat(pfad)
+    signatur = {'mtime_ns': stat.st_mtime_ns, 'groesse': stat.st_size}
+    if mit_hash:
+        signatur['sha256'] = datei_hash(pfad)
+    return signatur
+
+
+def signatur_passt(gespeichert, pfad):
+    """
+    Prüft, ob eine gespeicherte Signatur noch zur Datei passt.
+
+    Stimmen Änderungszeit und Größe überein, wird der Snapshot ohne Hash
+    akzeptiert. Hat sich nur die Änderungszeit geändert (z. B. nach einem
+    Kopiervorgang), entscheidet der Hash.
+
+    :param gespeichert: Signatur aus dem Snapshot-Kopf.
+    :param pfad: Pfad zur Quelldatei.
+    :return: True, wenn der Snapshot weiterverwendet werden kann.
+    """
+    if not gespeichert:
+        return False
+    aktuell = datei_signatur(pfad, mit_hash=False)
+    if aktuell['groesse'] != gespeichert.get('groesse'):
+        return False
+    if aktuell['mtime_ns'] == gespeichert.get('mtime_ns'):
+        return True
+    return datei_hash(pfad) == gespeichert.get('sha256')
+
+
+def text_zu_arrays(werte, leer_maske=None):
+    """
+    Kodiert eine Folge von Zellwerten als Zeichenpuffer, Offsets und Zellarten.
+
+    Zahlen in Textspalten werden über ihre ``repr`` abgelegt und beim Lesen
+    wieder in ``int``/``float`` zurückverwandelt.
+
+    :param werte: Iterierbare Zellwerte (str, Zahl oder leer).
+    :param leer_maske: Optionale Maske leerer Zellen (z. B. aus ``isna()``).
+    :return: Tupel (puffer, offsets, arten) als NumPy-Arrays.
+    """
+    teile = []
+    arten = []
+    for i, wert in enumerate(werte):
+        if (leer_maske is not None and leer_maske[i]) or wert is None \
+                or (isinstance(wert, float) and wert != wert):
+            teile.append('')
+            arten.append(ART_LEER)
+        elif isinstance(wert, str):
+            teile.append(wert)
+            arten.append(ART_TEXT)
+        elif isinstance(wert, (bool, np.bool_)):
+            teile.append(str(wert))
+            arten.append(ART_TEXT)
+        elif isinstance(wert, (int, np.integer)):
+            teile.append(repr(int(wert)))
+            arten.append(ART_GANZZAHL)
+        elif isinstance(wert, (float, np.floating)):
+            teile.append(repr(float(wert)))
+            arten.append(ART_KOMMAZAHL)
+        else:
+            teile.append(str(wert))
+            arten.append(ART_TEXT)
+
+    offsets = np.zeros(len(teile) + 1, dtype=np.int64)
+    np.cumsum([len(t) for t in teile], out=offsets[1:])
+    puffer = np.frombuffer(''.join(teile).encode('utf-8'), dtype=np.uint8)
+    return puffer, offsets, np.asarray(arten, dtype=np.int8)
+
+
+def arrays_zu_text(puffer, offsets, arten, leer=None, zeilen=None):
+    """
+    Gegenstück zu :func:`text_zu_arrays`.
+
+    :param puffer: UTF-8-Zeichenpuffer.
+    :param offsets: Zeichen-Offsets (Länge n + 1).
+    :param arten: Zellarten (Länge n).
+    :param leer: Wert für leere Zellen.
+    :param zeilen: Nur diese Zellen dekodieren (Standard: alle).
+    :return: Liste der Zellwerte.
+    """
+    text = bytes(puffer).decode('utf-8')
+    grenzen = offsets.tolist()
+    arten = arten.tolist()
+    werte = []
+    for i in range(len(arten)) if zeilen is None else zeilen:
+        art = arten[i]
+        if art == ART_LEER:
+            werte.append(leer)
+            continue
+        wert = text[grenzen[i]:grenzen[i + 1]]
+        if art == ART_GANZZAHL:
+            wert = int(wert)
+        elif art == ART_KOMMAZAHL:
+            wert = float(wert)
+        werte.append(wert)
+    return werte
+
+
+def schreibe_snapshot(ziel, arrays, kopf):
+    """
+    Schreibt Arrays und Kopfdaten atomar in eine Snapshot-Datei.
+
+    Die Datei wird zunächst neben dem Ziel angelegt und dann per
+    ``os.replace`` umbenannt, sodass Leser nie einen halben Snapshot sehen.
+
+    :param ziel: Pfad der Snapshot-Datei.
+    :param arrays: Dictionary Name -> NumPy-Array (keine Objekt-Arrays).
+    :param kopf: JSON-serialisierbare Zusatzdaten.
+    """
+    eintraege = {}
+    position = 0
+    daten = []
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.hasobject:
+            raise TypeError(f"Objekt-Arrays können nicht gespeichert werden: {name}")
+        position = -(-position // AUSRICHTUNG) * AUSRICHTUNG
+        eintraege[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': position}
+        daten.append((position, array))
+        position += array.nbytes
+
+    kopf_bytes = json.dumps({'kopf': kopf, 'arrays': eintraege}, ensure_ascii=False).encode('utf-8')
+    start = -(-(len(MAGIC) + 8 + len(kopf_bytes)) // AUSRICHTUNG) * AUSRICHTUNG
+
+    verzeichnis = os.path.dirname(os.path.abspath(ziel))
+    os.makedirs(verzeichnis, exist_ok=True)
+    # Wie mkstemp, aber mit 0666: der Kernel wendet die umask an, die Datei ist also wie jede normal
+    # angelegte Datei für andere Benutzer des Checkouts lesbar (mkstemp legt sie mit 0600 an)
+    tmp = os.path.join(verzeichnis, f'.{os.path.basename(ziel)}.{uuid.uuid4().hex}.tmp')
+    fd = os.open(tmp, os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', len(kopf_bytes)))
+            f.write(kopf_bytes)
+            for offset, array in daten:
+                f.seek(start + offset)
+                f.write(array.tobytes())
+        os.replace(tmp, ziel)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def lese_kopf(pfad):
+    """
+    Liest nur den JSON-Kopf eines Snapshots.
+
+    :param pfad: Pfad der Snapshot-Datei.
+    :return: Tupel (kopf, array_eintraege, datenstart) oder None bei ungültiger Datei.
+    """
+    try:
+        with open(pfad, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None
+            (laenge,) = struct.unpack('<Q', f.read(8))
+            inhalt = json.loads(f.read(laenge).decode('utf-8'))
+    except (OSError, ValueError, struct.error):
+        return None
+    start = -(-(len(MAGIC) + 8 + laenge) // AUSRICHTUNG) * AUSRICHTUNG
+    return inhalt['kopf'], inhalt['arrays'], start
+
+
+def lese_snapshot(pfad):
+    """
+    Öffnet einen Snapshot und blendet alle Arrays schreibgeschützt ein.
+
+    :param pfad: Pfad der Snapshot-Datei.
+    :return: Tupel (kopf, arrays) oder None bei ungültiger Datei.
+    """
+    gelesen = lese_kopf(pfad)
+    if gelesen is None:
+        return None
+    kopf, eintraege, start = gelesen
+    arrays = {}
+    for name, eintrag in eintraege.items():
+        dtype = np.dtype(eintrag['dtype'])
+        shape = tuple(eintrag['shape'])
+        if dtype.itemsize == 0 or 0 in shape:
+            arrays[name] = np.empty(shape, dtype=dtype)
+        else:
+            arrays[name] = np.memmap(pfad, dtype=dtype, mode='r', offset=start + eintrag['offset'], shape=shape)
+    return kopf, arrays
@@ -0,0 +1,452 @@
+"""
+Such-Kern der ZE-Liste ohne Oberfläche.
+
+Alle Front-Ends (Streamlit, Tkinter, Kommandozeile) laden, indizieren und
+durchsuchen die ZE-Liste ausschließlich über ``SuchMaschine``. Das Modul
+importiert weder Streamlit noch tkinter und kann daher für sich allein
+getestet, gemessen und wiederverwendet werden. Jede Verbesserung an Laden,
+Index oder Cache wirkt so in allen Einstiegspunkten zugleich.
+
+Typische Nutzung::
+
+    maschine = SuchMaschine('ZE Liste.xlsx')
+    ergebnisse = maschine.ergebnisse('gemcitabin')
+
+pandas (über ``ze_modell``) wird erst beim ersten Laden importiert, damit
+schlanke Einstiegspunkte wie ``ze_search.py`` die Konstanten ohne diese
+Importzeit nutzen können.
+"""
+import io
+import json
+import threading
+import time
+import weakref
+from dataclasses import dataclass, field
+
+from ze_cache import ErgebnisCache
+from ze_index import FUZZY_TOP_K, LITERAL, InkrementelleSuche
+from ze_snapshot import datei_signatur
+
+# Spalten der Stammtabelle mit Suchindex; die durch '|' getrennten Synonyme
+# (HANDELSNAMEN_SPALTE) durchsucht das Modell über seine Synonymtabelle.
+SUCHSPALTEN = ['OPS-Text', 'Handelsnamen']
+# Spalten, deren Namen in die unscharfe Suche (Tippfehler) eingehen
+FUZZYSPALTEN = ['Handelsnamen']
+# Spalten, die die Front-Ends standardmäßig anzeigen
+RELEVANTE_SPALTEN = ['ZE', 'OPS', 'OPS-Text', 'Handelsnamen', 'Wirkstoffklasse', 'Infos', 'Betrag']
+# Zeilen pro Block beim schrittweisen Erzeugen von CSV- und XLSX-Ausgaben
+CSV_BLOCKZEILEN = 1000
+# Sekunden zwischen zwei Prüfungen der Excel-Datei durch den DateiWaechter
+WAECHTER_INTERVALL = 2.0
+
+
+@dataclass(frozen=True, eq=False)
+class Datenbestand:
+    """
+    Unveränderlicher, prozessweit geteilter Stand der ZE-Liste.
+
+    Der DataFrame darf von Front-Ends nur gelesen werden; Ergebnisse werden
+    immer als neue Teil-DataFrames erzeugt. Das Modell samt Suchindizes wird
+    zusammen mit den Daten aufgebaut und gehört fest zu dieser Version.
+    ``signatur`` (Änderungszeit und Größe der Excel-Datei vor dem Laden)
+    zeigt dem ``DateiWaechter``, ob die Datei seitdem geändert wurde.
+    """
+    version: int
+    pfad: str
+    modell: 'ze_modell.ZeModell'
+    geladen_um: float = field(default_factory=time.time)
+    signatur: dict = None
+
+    @property
+    def df(self):
+        return self.modell.stamm
+
+    @property
+    def index(self):
+        return self.modell
+
+    def speicherbedarf(self):
+        """
+        Schätzt den Speicherbedarf dieses Stands (Daten und Indizes) in Bytes.
+        """
+        return self.modell.speicherbedarf()
+
+
+class Datenregister:
+    """
+    Hält den aktuellen ``Datenbestand`` einer Excel-Datei für den ganzen Prozess.
+
+    Jedes (Neu-)Laden erzeugt einen neuen Bestand mit höherer Versionsnummer,
+    der erst nach vollständigem Laden ausgetauscht wird. Sitzungen, die noch
+    einen älteren Bestand halten, arbeiten ungestört damit weiter. ``aktuell``
+    wartet nach dem ersten Laden nie auf ein laufendes Neuladen.
+    """
+
+    def __init__(self, pfad, cache_verzeichnis=None):
+        self.pfad = pfad
+        self.cache_verzeichnis = cache_verzeichnis
+        self.waechter = None
+        self._bestand = None
+        self._version = 0
+        self._lade_sperre = threading.Lock()
+        self._versionen = weakref.WeakValueDictionary()
+
+    def aktuell(self):
+        """
+        Liefert den aktuellen Datenbestand und lädt ihn beim ersten Aufruf.
+
+        :return: Datenbestand.
+        :raises FileNotFoundError: Wenn die Excel-Datei nicht existiert.
+        """
+        bestand = self._bestand
+        if bestand is None:
+            with self._lade_sperre:
+                if self._bestand is None:
+                    self._tausche(self._lade())
+                bestand = self._bestand
+        return bestand
+
+    def neu_laden(self):
+        """
+        Lädt die Excel-Datei erneut und tauscht den Bestand atomar aus.
+
+        :return: Der neue Datenbestand.
+        """
+        with self._lade_sperre:
+            self._tausche(self._lade())
+            return self._bestand
+
+    def speicher_pro_version(self):
+        """
+        Speicherbedarf aller Versionen, die noch von irgendeiner Sitzung gehalten werden.
+
+        :return: Dictionary Version -> Bytes.
+        """
+        return {version: bestand.speicherbedarf() for version, bestand in sorted(self._versionen.items())}
+
+    def beobachte(self, intervall=WAECHTER_INTERVALL):
+        """
+        Startet (einmal pro Register) den DateiWaechter, der die Excel-Datei bei Änderungen neu lädt.
+
+        :return: DateiWaechter.
+        """
+        with self._lade_sperre:
+            if self.waechter is None:
+                self.waechter = DateiWaechter(self, intervall).starte()
+            return self.waechter
+
+    def _lade(self):
+        from ze_modell import lade_modell
+
+        # Signatur vor dem Lesen: ändert sich die Datei währenddessen, lädt der Wächter erneut
+        signatur = datei_signatur(self.pfad, mit_hash=False)
+        modell = lade_modell(self.pfad, self.cache_verzeichnis, suchspalten=SUCHSPALTEN, fuzzy_spalten=FUZZYSPALTEN)
+        return Datenbestand(version=self._version + 1, pfad=self.pfad, modell=modell, signatur=signatur)
+
+    def _tausche(self, bestand):
+        self._version = bestand.version
+        self._versionen[bestand.version] = bestand
+        self._bestand = bestand
+
+
+class DateiWaechter:
+    """
+    Lädt die Excel-Datei eines Datenregisters neu, sobald sie sich ändert.
+
+    Ein Hintergrund-Thread vergleicht alle ``intervall`` Sekunden Änderungszeit
+    und Größe der Datei mit der Signatur des aktuellen Bestands (Polling statt
+    inotify: funktioniert auch auf Netzlaufwerken und unter Windows). Neu
+    geladen wird erst, wenn die neue Signatur bei zwei Prüfungen in Folge
+    gleich bleibt, damit eine Datei, die gerade noch gespeichert wird, nicht
+    halb gelesen wird.
+
+    Das Neuladen selbst ist ``Datenregister.neu_laden``: Daten und alle Indizes
+    entstehen in diesem Thread, ausgetauscht wird erst der fertige Bestand.
+    Suchen laufen währenddessen auf dem alten Bestand weiter. Schlägt das
+    Laden fehl, bleibt der alte Bestand aktiv, der Fehler steht in
+    ``letzter_fehler`` und dieselbe Dateiversion wird nicht erneut versucht.
+
+    :param register: Datenregister, dessen Datei beobachtet wird.
+    :param intervall: Sekunden zwischen zwei Prüfungen.
+    """
+
+    def __init__(self, register, intervall=WAECHTER_INTERVALL):
+        self.register = register
+        self.intervall = intervall
+        self.neu_geladen = 0
+        self.letzter_fehler = None
+        self._fehlerhafte_signatur = None
+        self._stopp = threading.Event()
+        self._thread = threading.Thread(target=self._laufe, name='ze-dateiwaechter', daemon=True)
+
+    def starte(self):
+        self._thread.start()
+        return self
+
+    def stoppe(self):
+        self._stopp.set()
+        self._thread.join()
+
+    def pruefe(self, kandidat=None):
+        """
+        Eine Prüfung; lädt neu, wenn sich die Datei seit der letzten Prüfung nicht mehr geändert hat.
+
+        :param kandidat: Signatur aus der vorherigen Prüfung, die noch nicht geladen wurde.
+        :return: Die geänderte, noch nicht geladene Signatur (für die nächste Prüfung) oder None.
+        """
+        bestand = self.register._bestand
+        if bestand is None:
+            return None  # Noch nie geladen: das übernimmt der erste Aufruf von ``aktuell``
+        try:
+            signatur = datei_signatur(self.register.pfad, mit_hash=False)
+        except OSError:
+            return None  # Datei wird gerade ersetzt
+        if signatur == bestand.signatur or signatur == self._fehlerhafte_signatur:
+            return None
+        if signatur != kandidat:
+            return signatur
+        try:
+            self.register.neu_laden()
+            self.neu_geladen += 1
+            self.letzter_fehler = None
+        except Exception as e:
+            self.letzter_fehler = e
+            self._fehlerhafte_signatur = signatur
+        return None
+
+    def _laufe(self):
+        kandidat = None
+        while not self._stopp.wait(self.intervall):
+            kandidat = self.pruefe(kandidat)
+
+
+def _als_tupel(spalten):
+    return None if spalten is None else tuple(spalten)
+
+
+def teile_spalten(ergebnisse, relevante_spalten=RELEVANTE_SPALTEN):
+    """
+    Trennt die gewünschten Anzeigespalten in vorhandene und fehlende.
+
+    :param ergebnisse: DataFrame mit Suchergebnissen.
+    :param relevante_spalten: Gewünschte Spalten in Anzeigereihenfolge.
+    :return: Tupel (vorhandene_spalten, fehlende_spalten).
+    """
+    vorhandene = [spalte for spalte in relevante_spalten if spalte in ergebnisse.columns]
+    fehlende = [spalte for spalte in relevante_spalten if spalte not in ergebnisse.columns]
+    return vorhandene, fehlende
+
+
+class SuchMaschine:
+    """
+    Einheitliche Lade-, Index- und Such-Schnittstelle für alle Front-Ends.
+
+    Hält ein ``Datenregister`` (Daten, Modell und Indizes einmal pro Prozess)
+    und einen ``ErgebnisCache`` (Trefferzeilen und CSV-Bytes je Suche).
+
+    :param pfad: Pfad zur Excel-Datei.
+    :param cache_verzeichnis: Abweichendes Snapshot-Verzeichnis.
+    :param ergebnis_cache: Eigener ErgebnisCache (Standard: ein neuer).
+    """
+
+    def __init__(self, pfad, cache_verzeichnis=None, ergebnis_cache=None):
+        self.register = Datenregister(pfad, cache_verzeichnis)
+        self.cache = ergebnis_cache if ergebnis_cache is not None else ErgebnisCache()
+
+    @property
+    def pfad(self):
+        return self.register.pfad
+
+    def bestand(self):
+        """
+        Der aktuelle Datenbestand; lädt beim ersten Aufruf.
+
+        :raises FileNotFoundError: Wenn die Excel-Datei nicht existiert.
+        """
+        return self.register.aktuell()
+
+    def neu_laden(self):
+        """
+        Lädt die Excel-Datei neu; der Ergebnis-Cache verwirft alte Versionen selbst.
+        """
+        return self.register.neu_laden()
+
+    def beobachte(self, intervall=WAECHTER_INTERVALL):
+        """
+        Lädt die Excel-Datei künftig automatisch neu, sobald sie geändert wird (siehe ``DateiWaechter``).
+        """
+        return self.register.beobachte(intervall)
+
+    def fehlende_spalten(self, spalten, bestand=None):
+        """
+        Liefert die Suchspalten, die im Datenbestand nicht durchsuchbar sind.
+        """
+        bestand = bestand or self.bestand()
+        return [spalte for spalte in spalten if spalte not in bestand.modell.spalten]
+
+    def suche(self, suchbegriff, spalten=None, modus=LITERAL, inkrementell=None, bestand=None):
+        """
+        Sucht über den Ergebnis-Cache; nur bei einem Fehlgriff wird der Index befragt.
+
+        :param suchbegriff: Suchbegriff wie eingegeben.
+        :param spalten: Zu durchsuchende Spalten (Standard: alle durchsuchbaren).
+        :param modus: Suchmodus aus ``ze_index.MODI``.
+        :param inkrementell: InkrementelleSuche (siehe ``live_suche``), die bei
+            einem Fehlgriff das vorherige Ergebnis weiter eingrenzt; muss über
+            dieselben ``spalten`` suchen.
+        :param bestand: Fester Datenbestand (Standard: der aktuelle).
+        :return: CacheEintrag mit den Trefferzeilen der Stammtabelle.
+        :raises ze_index.SuchFehler: Bei ungültigen regulären Ausdrücken.
+        :raises ValueError: Wenn ``inkrementell`` andere Spalten durchsucht.
+        """
+        # Das Ergebnis landet unter ``spalten`` im gemeinsamen Cache und muss dazu passen
+        if inkrementell is not None and _als_tupel(inkrementell.spalten) != _als_tupel(spalten):
+            raise ValueError(f"Die Live-Suche durchsucht {inkrementell.spalten}, angefragt sind {spalten}")
+        bestand = bestand or self.bestand()
+        eintrag = self.cache.hole(bestand.version, suchbegriff, modus, spalten)
+        if eintrag is None:
+            if inkrementell is not None:
+                zeilen = inkrementell.suche(suchbegriff, modus, bestand.modell)
+            else:
+                zeilen = bestand.modell.suche(suchbegriff, spalten, modus)
+            eintrag = self.cache.lege_ab(bestand.version, suchbegriff, modus, zeilen, spalten)
+        return eintrag
+
+    def ergebnisse(self, suchbegriff, spalten=None, modus=LITERAL, inkrementell=None, bestand=None):
+        """
+        Wie ``suche``, liefert aber direkt die Trefferzeilen als DataFrame.
+        """
+        bestand = bestand or self.bestand()
+        eintrag = self.suche(suchbegriff, spalten, modus, inkrementell, bestand)
+        return bestand.modell.eintraege(eintrag.zeilen)
+
+    def vorschlaege(self, suchbegriff, k=FUZZY_TOP_K, bestand=None):
+        """
+        Ähnliche Handelsnamen zu einem (vermutlich falsch geschriebenen) Suchbegriff.
+
+        :return: Liste von Namen, die ähnlichsten zuerst.
+        """
+        bestand = bestand or self.bestand()
+        return [treffer.name for treffer in bestand.modell.fuzzy_treffer(suchbegriff, k)]
+
+    def live_suche(self, spalten=None, bestand=None):
+        """
+        Neue InkrementelleSuche für Suche-während-der-Eingabe.
+
+        Wird ihr bei ``suche`` ein neuerer Bestand übergeben, setzt sie sich selbst zurück.
+        """
+        bestand = bestand or self.bestand()
+        return InkrementelleSuche(bestand.modell, spalten)
+
+    def csv(self, eintrag, spalten=None, bestand=None):
+        """
+        CSV-Bytes der Treffer; werden pro Suche und Spaltenauswahl nur einmal erzeugt und im Cache gehalten.
+
+        :param eintrag: CacheEintrag aus ``suche``.
+        :param spalten: Auszugebende Spalten (Standard: die vorhandenen RELEVANTE_SPALTEN).
+        """
+        spalten = self._ausgabe_spalten(spalten, bestand)
+        if eintrag.ausgabe('csv', spalten) is None:
+            # Erzeugt blockweise über csv_bloecke, das die fertigen Bytes im Cache ablegt
+            for _ in self.csv_bloecke(eintrag, spalten, bestand):
+                pass
+        return eintrag.ausgabe('csv', spalten)
+
+    def csv_bloecke(self, eintrag, spalten=None, bestand=None, blockzeilen=CSV_BLOCKZEILEN):
+        """
+        Wie ``csv``, liefert die Bytes aber in Blöcken, sodass große Ergebnisse
+        gestreamt werden können, bevor die ganze Ausgabe erzeugt ist.
+
+        Liegt die CSV noch nicht im Cache, wird sie nach dem letzten Block dort abgelegt.
+
+        :return: Generator von Bytes-Blöcken (Kopfzeile im ersten Block).
+        """
+        spalten = self._ausgabe_spalten(spalten, bestand)
+        fertig = eintrag.ausgabe('csv', spalten)
+        if fertig is not None:
+            for start in range(0, len(fertig), 64 * 1024):
+                yield fertig[start:start + 64 * 1024]
+            return
+        bloecke = []
+        for block in self._bloecke(eintrag, spalten, bestand, blockzeilen):
+            bloecke.append(block.to_csv(index=False, header=not bloecke).encode('utf-8'))
+            yield bloecke[-1]
+        self.cache.setze_ausgabe(eintrag, 'csv', spalten, b''.join(bloecke))
+
+    def xlsx(self, eintrag, spalten=None, bestand=None, blockzeilen=CSV_BLOCKZEILEN):
+        """
+        XLSX-Bytes der Treffer (ein Tabellenblatt), erst auf Anfrage erzeugt und dann je Spaltenauswahl im Cache gehalten.
+
+        Geschrieben wird mit openpyxl im Nur-Schreiben-Modus, Block für Block;
+        es entsteht also nie ein Zellobjekt pro Treffer oder ein DataFrame aller Treffer.
+
+        :param eintrag: CacheEintrag aus ``suche``.
+        :param spalten: Auszugebende Spalten (Standard: die vorhandenen RELEVANTE_SPALTEN).
+        """
+        spalten = self._ausgabe_spalten(spalten, bestand)
+        if eintrag.ausgabe('xlsx', spalten) is None:
+            from openpyxl import Workbook
+
+            mappe = Workbook(write_only=True)
+            blatt = mappe.create_sheet('Ergebnisse')
+            for nummer, block in enumerate(self._bloecke(eintrag, spalten, bestand, blockzeilen)):
+                if nummer == 0:
+                    blatt.append(list(block.columns))
+                daten = block.astype(object)
+                for zeile in daten.where(daten.notna(), None).to_numpy().tolist():
+                    blatt.append(zeile)
+            puffer = io.BytesIO()
+            mappe.save(puffer)
+            self.cache.setze_ausgabe(eintrag, 'xlsx', spalten, puffer.getvalue())
+        return eintrag.ausgabe('xlsx', spalten)
+
+    def _ausgabe_spalten(self, spalten, bestand):
+        # Standard ausdrücklich machen, damit er denselben Cache-Platz wie eine gleiche Angabe belegt
+        if spalten is None:
+            spalten, _ = teile_spalten((bestand or self.bestand()).modell.stamm)
+        return list(spalten)
+
+    def _bloecke(self, eintrag, spalten, bestand, blockzeilen):
+        """
+        Die Treffer als Folge kleiner DataFrames; der erste Block ist auch bei null Treffern da (Kopfzeile).
+        """
+        modell = (bestand or self.bestand()).modell
+        for start in range(0, max(len(eintrag.zeilen), 1), blockzeilen):
+            yield modell.eintraege(eintrag.zeilen[start:start + blockzeilen])[spalten]
+
+    def json(self, eintrag, spalten=None, bestand=None):
+        """
+        JSON-Bytes der Treffer als Liste von Objekten (Spalte -> Wert, leere Zellen als null).
+
+        Werden wie ``csv`` pro Suche und Spaltenauswahl nur einmal erzeugt und im Cache gehalten.
+
+        :param eintrag: CacheEintrag aus ``suche``.
+        :param spalten: Auszugebende Spalten (Standard: die vorhandenen RELEVANTE_SPALTEN).
+        """
+        spalten = self._ausgabe_spalten(spalten, bestand)
+        if eintrag.ausgabe('json', spalten) is None:
+            daten = (bestand or self.bestand()).modell.eintraege(eintrag.zeilen)[spalten].astype(object)
+            datensaetze = daten.where(daten.notna(), None).to_dict('records')
+            self.cache.setze_ausgabe(eintrag, 'json', spalten,
+                                     json.dumps(datensaetze, ensure_ascii=False).encode('utf-8'))
+        return eintrag.ausgabe('json', spalten)
+
+    def speicherinfo(self):
+        """
+        Kennzahlen für Statusanzeigen.
+
+        :return: Dictionary mit Version, Ladezeitpunkt, Bytes je gehaltener Version, RSS,
+            Cache-Statistik und dem letzten Fehler beim automatischen Neuladen.
+        """
+        from ze_daten import prozess_speicher
+
+        bestand = self.bestand()
+        waechter = self.register.waechter
+        return {
+            'version': bestand.version,
+            'geladen_um': bestand.geladen_um,
+            'ladefehler': waechter.letzter_fehler if waechter is not None else None,
+            'versionen': self.register.speicher_pro_version(),
+            'rss': prozess_speicher(),
+            'cache': self.cache.statistik(),
+        }